@@ -24,6 +24,58 @@ def dialog_arguments_parser():
                         help="Threshold of confidence above which -- and below"
                              " alpha -- above which the slot is explicitly "
                              "confirmed before being accepted", dest='beta')
+    parser.add_argument('--ensemble-mode', nargs='?', type=str,
+                        default="fused", const="fused",
+                        help="The way the models of each ensemble are run. Can "
+                             "take values among ['separate', 'fused', "
+                             "'numpy']. Defaults to 'fused', where all models "
+                             "of an ensemble are run with a single session "
+                             "call. 'numpy' runs the models exported with "
+                             "`parser.export` without Tensorflow.",
+                        dest='ensemble_mode')
+    parser.add_argument('--slot-pool-size', nargs='?', type=int,
+                        default=4, const=4,
+                        help="Number of threads onto which the ensembles for "
+                             "the four slots are dispatched when parsing "
+                             "free-form utterances. Set to 1 to run them one "
+                             "after another.", dest='slot_pool_size')
+    parser.add_argument('--member-pool-size', nargs='?', type=int,
+                        default=1, const=1,
+                        help="Number of threads onto which the models of each "
+                             "ensemble are dispatched. Set to 1 to run them "
+                             "one after another. Not used with the 'fused' "
+                             "ensemble mode.",
+                        dest='member_pool_size')
+    parser.add_argument('--prediction-cache-size', nargs='?', type=int,
+                        default=0, const=0,
+                        help="Maximum number of averaged predictions cached "
+                             "by the four ensembles together. Set to 0 to "
+                             "disable caching.",
+                        dest='prediction_cache_size')
+    parser.add_argument('--prediction-cache-ttl', nargs='?', type=float,
+                        default=None,
+                        help="Number of seconds after which a cached "
+                             "prediction expires. By default, predictions "
+                             "only leave the cache when evicted.",
+                        dest='prediction_cache_ttl')
+    parser.add_argument('--warm-up-log-directory', nargs='?', type=str,
+                        default=None,
+                        help="Directory of Turk experiment logs whose "
+                             "free-form utterances are parsed into the "
+                             "prediction cache when the parsers are loaded.",
+                        dest='warm_up_log_directory')
+    parser.add_argument('--cascade', action='store_true',
+                        help="Evaluate the models of each ensemble one after "
+                             "another, and stop once the top-1 confidence of "
+                             "the full ensemble is known to lie on the same "
+                             "side of alpha and beta. Requires the separate "
+                             "ensemble mode.", dest='cascade')
+    parser.add_argument('--latency-budget', nargs='?', type=float,
+                        default=None,
+                        help="Number of seconds a cascaded prediction of an "
+                             "ensemble may take. By default, the cascade is "
+                             "only stopped by alpha and beta.",
+                        dest='latency_budget')
     # Following are required only when running the dialog system against the
     # simulated user using `simulated_user.run_pipeline`
     parser.add_argument('--use-full-test-set', action='store_true',
@@ -1,3 +1,6 @@
+from parser.constants import EnsembleMode
+
+
 class DialogConfiguration(object):
     # Threshold over which the slot is deemed as confidently-filled without a
     # need for confirmation.
@@ -7,3 +10,33 @@ class DialogConfiguration(object):
     beta = 0.25
 
     assert (alpha >= beta)
+
+    # The way the models of each of the parser's ensembles are run.
+    ensemble_mode = EnsembleMode.fused
+    # Number of threads onto which the four ensembles of the parser are
+    # dispatched when parsing free-form utterances. With 1, the ensembles are
+    # run one after another.
+    slot_pool_size = 4
+    # Number of threads onto which the models of each ensemble are dispatched.
+    # With 1, the models are run one after another. Does not affect
+    # `EnsembleMode.fused`, since fused ensembles run all their models with a
+    # single session call.
+    member_pool_size = 1
+    # Maximum number of averaged predictions cached by the four ensembles
+    # together. With 0, predictions are not cached.
+    prediction_cache_size = 0
+    # Number of seconds after which a cached prediction expires. With `None`,
+    # predictions only leave the cache when evicted.
+    prediction_cache_ttl = None
+    # Directory of Turk experiment logs whose free-form utterances are parsed
+    # into the prediction cache when the parsers are loaded. With `None`, the
+    # cache starts empty.
+    warm_up_log_directory = None
+    # Set to `True` to evaluate the models of each ensemble in a cascade, which
+    # stops once the top-1 confidence of the full ensemble is known to lie on
+    # the same side of `alpha` and `beta`. It requires `ensemble_mode` to be
+    # `EnsembleMode.separate`.
+    cascade = False
+    # Number of seconds a cascaded prediction of an ensemble may take. With
+    # `None`, the cascade is only stopped by `alpha` and `beta`.
+    latency_budget = None
@@ -4,7 +4,9 @@ engage in a conversation with a user through terminal.
 
 from __future__ import absolute_import
 
+import glob
 import logging
+from multiprocessing.pool import ThreadPool
 
 from dialog.argument_parser import dialog_arguments_parser
 from dialog.configs import DialogConfiguration
@@ -17,7 +19,9 @@ from dialog.intention import Intention
 from dialog.utterance_parser import UtteranceParser
 from parser.action_channel_model import ActionChannelModel
 from parser.action_function_model import ActionFunctionModel
+from parser.cache import LRUCache
 from parser.combined_model import CombinedModel
+from parser.constants import EnsembleMode
 from parser.keyword_model import KeywordModel
 from parser.trigger_function_model import TriggerFunctionModel
 from parser.trigger_channel_model import TriggerChannelModel
@@ -28,51 +32,174 @@ def parse_arguments():
     args = dialog_arguments_parser().parse_args()
     logging.basicConfig(level=getattr(logging, args.log_level.upper()),
                         format='%(levelname)s: %(asctime)s: %(message)s')
+    configure_dialog(args)
 
+
+def configure_dialog(args):
+    """Copies the command-line arguments into `DialogConfiguration`.
+
+    Args:
+        args (Namespace): Arguments parsed by `dialog_arguments_parser`.
+
+    Raises:
+        KeyError: If the ensemble mode is illegal.
+        ValueError: If the cascade is enabled with an ensemble mode other than
+            `EnsembleMode.separate`.
+    """
     assert(args.alpha >= args.beta)
     DialogConfiguration.alpha = args.alpha
     DialogConfiguration.beta = args.beta
-
-
-def load_trigger_channel_parser():
+    try:
+        DialogConfiguration.ensemble_mode = EnsembleMode[args.ensemble_mode]
+    except KeyError:
+        logging.error("Illegal ensemble mode: %s", args.ensemble_mode)
+        raise
+    if args.cascade and \
+            DialogConfiguration.ensemble_mode is not EnsembleMode.separate:
+        logging.error("The cascade requires the ensemble mode %s.",
+                      EnsembleMode.separate.name)
+        raise ValueError
+    DialogConfiguration.slot_pool_size = args.slot_pool_size
+    DialogConfiguration.member_pool_size = args.member_pool_size
+    DialogConfiguration.prediction_cache_size = args.prediction_cache_size
+    DialogConfiguration.prediction_cache_ttl = args.prediction_cache_ttl
+    DialogConfiguration.warm_up_log_directory = args.warm_up_log_directory
+    DialogConfiguration.cascade = args.cascade
+    DialogConfiguration.latency_budget = args.latency_budget
+
+
+def load_trigger_channel_parser(pool=None, cache=None):
     args = CombinedModel.t_channel_args
-    return CombinedModel.create_ensemble(args, TriggerChannelModel)
+    return CombinedModel.create_ensemble(args, TriggerChannelModel,
+                                         DialogConfiguration.ensemble_mode,
+                                         pool, cache)
 
 
-def load_action_channel_parser():
+def load_action_channel_parser(pool=None, cache=None):
     args = CombinedModel.a_channel_args
-    return CombinedModel.create_ensemble(args, ActionChannelModel)
+    return CombinedModel.create_ensemble(args, ActionChannelModel,
+                                         DialogConfiguration.ensemble_mode,
+                                         pool, cache)
 
 
-def load_trigger_fn_parser():
+def load_trigger_fn_parser(pool=None, cache=None):
     args = CombinedModel.t_fn_args
-    return CombinedModel.create_ensemble(args, TriggerFunctionModel)
+    return CombinedModel.create_ensemble(args, TriggerFunctionModel,
+                                         DialogConfiguration.ensemble_mode,
+                                         pool, cache)
 
 
-def load_action_fn_parser():
+def load_action_fn_parser(pool=None, cache=None):
     args = CombinedModel.a_fn_args
-    return CombinedModel.create_ensemble(args, ActionFunctionModel)
+    return CombinedModel.create_ensemble(args, ActionFunctionModel,
+                                         DialogConfiguration.ensemble_mode,
+                                         pool, cache)
 
 
 def load_keyword_parser():
     return KeywordModel()
 
 
+def create_thread_pool(num_threads):
+    """Creates a pool of `num_threads` threads.
+
+    Args:
+        num_threads (int): Number of threads in the pool.
+
+    Returns:
+        `multiprocessing.pool.ThreadPool`: The pool, or `None` if `num_threads`
+        is at most 1, in which case the work is to be done sequentially.
+    """
+    if num_threads <= 1:
+        return None
+    return ThreadPool(num_threads)
+
+
+def create_prediction_cache():
+    """Creates the cache of averaged predictions shared by the four ensembles,
+    as configured in `DialogConfiguration`.
+
+    Returns:
+        `parser.cache.LRUCache`: The cache, or `None` if predictions are not to
+        be cached.
+    """
+    if DialogConfiguration.prediction_cache_size <= 0:
+        return None
+    return LRUCache(DialogConfiguration.prediction_cache_size,
+                    DialogConfiguration.prediction_cache_ttl)
+
+
+def warm_up_parsers(parsers, log_directory):
+    """Fills the prediction cache of the ensembles with the free-form
+    utterances -- the first user-utterance of each conversation -- of the Turk
+    experiment logs in `log_directory`.
+
+    Args:
+        parsers (`list` of `parser.ensembled_model.EnsembledModel`): The
+            ensembles.
+        log_directory (str): Directory of the log files.
+    """
+    # Importing the log analysis reads the label maps, so it is only done when
+    # the logs are needed.
+    from log_analysis.training_data_from_dialog import build_log_summaries
+    log_summaries = build_log_summaries(glob.glob(log_directory + "/*.log"))
+    utterances = [conversation.user_utterances[0]
+                  for log_summary in log_summaries
+                  for conversation in log_summary.conversations
+                  if conversation.user_utterances]
+    logging.info("Warming up the parsers with %s utterances.", len(utterances))
+    for parser in parsers:
+        parser.warm_up(utterances)
+
+
+def configure_cascade(parsers):
+    """Enables or disables the cascade of the ensembles, as configured in
+    `DialogConfiguration`.
+
+    The thresholds of the cascade are those of the dialog policy.
+
+    Args:
+        parsers (`list` of `parser.ensembled_model.EnsembledModel`): The
+            ensembles.
+    """
+    for parser in parsers:
+        if DialogConfiguration.cascade:
+            parser.enable_cascade(
+                [DialogConfiguration.beta, DialogConfiguration.alpha],
+                DialogConfiguration.latency_budget)
+        else:
+            parser.disable_cascade()
+
+
 def load_parsers():
     logging.debug("Loading parsers.")
-    trigger_channel_parser = load_trigger_channel_parser()
-    action_channel_parser = load_action_channel_parser()
-    trigger_fn_parser = load_trigger_fn_parser()
-    action_fn_parser = load_action_fn_parser()
+    # The pool of model threads is shared by all the ensembles. It is separate
+    # from the pool onto which the ensembles themselves are dispatched, so
+    # that an ensemble waiting on its models never holds the threads its
+    # models need.
+    member_pool = create_thread_pool(DialogConfiguration.member_pool_size)
+    # The cache is keyed by the fingerprint of each ensemble, so that a single
+    # size bound covers all four.
+    cache = create_prediction_cache()
+    trigger_channel_parser = load_trigger_channel_parser(member_pool, cache)
+    action_channel_parser = load_action_channel_parser(member_pool, cache)
+    trigger_fn_parser = load_trigger_fn_parser(member_pool, cache)
+    action_fn_parser = load_action_fn_parser(member_pool, cache)
     keyword_parser = load_keyword_parser()
     logging.info("All parsers loaded.")
+    configure_cascade([trigger_channel_parser, action_channel_parser,
+                       trigger_fn_parser, action_fn_parser])
+    if cache is not None and DialogConfiguration.warm_up_log_directory:
+        warm_up_parsers([trigger_channel_parser, action_channel_parser,
+                         trigger_fn_parser, action_fn_parser],
+                        DialogConfiguration.warm_up_log_directory)
     return (trigger_channel_parser, action_channel_parser, trigger_fn_parser,
             action_fn_parser, keyword_parser)
 
 
 def create_dialog_agent(trigger_channel_parser, action_channel_parser,
                         trigger_fn_parser, action_fn_parser, keyword_parser,
-                        istream, ostream):
+                        istream, ostream, pool=None):
     logging.info("Initializing dialog agent.")
     label_description = LabelDescription()
     parser = UtteranceParser(trigger_channel_model=trigger_channel_parser,
@@ -80,7 +207,8 @@ def create_dialog_agent(trigger_channel_parser, action_channel_parser,
                              trigger_fn_model=trigger_fn_parser,
                              action_fn_model=action_fn_parser,
                              keyword_model=keyword_parser,
-                             label_description=label_description)
+                             label_description=label_description,
+                             pool=pool)
     intention = Intention
     dialog_policy = DialogPolicy(DialogConfiguration)
     dialog_state = DialogState()
@@ -97,14 +225,18 @@ def main():
     parse_arguments()
     t_channel_parser, a_channel_parser, t_fn_parser, a_fn_parser, \
         keyword_parser = load_parsers()
+    slot_pool = create_thread_pool(DialogConfiguration.slot_pool_size)
     while True:
         dialog_agent = create_dialog_agent(
             trigger_channel_parser=t_channel_parser,
             trigger_fn_parser=t_fn_parser,
             action_channel_parser=a_channel_parser,
             action_fn_parser=a_fn_parser,
-            keyword_parser=keyword_parser, istream=Input(), ostream=Output())
+            keyword_parser=keyword_parser, istream=Input(), ostream=Output(),
+            pool=slot_pool)
         dialog_agent.start_session()
+        if t_channel_parser.cache is not None:
+            logging.info("Prediction cache: %s", t_channel_parser.cache)
 
 
 if __name__ == '__main__':
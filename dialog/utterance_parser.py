@@ -1,4 +1,7 @@
 import logging
+import time
+
+import numpy as np
 
 from dialog.constants import Confirmation, Slot, ID
 from dialog.constants import NO_UTTERANCES, YES_UTTERANCES
@@ -33,6 +36,9 @@ class UtteranceParser(object):
             uses flavors of keyword matching.
         label_description(`label_description.LabelDescription`): Mapping from
             labels -- Channels and Functions -- to their descriptions.
+        pool (`multiprocessing.pool.ThreadPool`): Pool of threads onto which
+            the four models parsing free-form utterances are dispatched. `None`
+            if they are run one after another.
 
     Args:
         trigger_channel_model (`parser.ensembled_model.EnsembledModel`): Model
@@ -48,11 +54,15 @@ class UtteranceParser(object):
             uses flavors of keyword matching.
         label_description (`label_description.LabelDescription`): Mapping from
             labels -- Channels and Functions -- to their descriptions.
+        pool (`multiprocessing.pool.ThreadPool`, optional): Pool of threads
+            onto which the four models parsing free-form utterances are
+            dispatched. Defaults to `None`, in which case the models are run one
+            after another.
     """
 
     def __init__(self, trigger_channel_model, action_channel_model,
                  trigger_fn_model, action_fn_model, keyword_model,
-                 label_description):
+                 label_description, pool=None):
         self.trigger_channel_model = trigger_channel_model
         self.action_channel_model = action_channel_model
         self.trigger_fn_model = trigger_fn_model
@@ -60,6 +70,7 @@ class UtteranceParser(object):
 
         self.keyword_model = keyword_model
         self.label_description = label_description
+        self.pool = pool
 
     def parse_utterance(self, utterance, intention_type, state):
         """Parses utterance by selecting the right model based on the intention
@@ -109,10 +120,117 @@ class UtteranceParser(object):
                           self.parse_utterance.__name__, intention_type)
             raise TypeError
 
+    def parse_many(self, requests):
+        """Parses many utterances, each by the right model based on its
+        intention, as `parse_utterance` would.
+
+        The free-form utterances, and the utterances parsed for Functions based
+        on the Channel in their dialog state, are batched per model, so that
+        each model runs a single forward pass for all of them. The batches are
+        dispatched onto `pool`, if any. The other utterances, whose parsing
+        does not involve the RNN-based models, are parsed one by one.
+
+        Args:
+            requests (`list` of (str, `intention.IntentionType`,
+                `dialog_state.DialogState`)): The utterances to be parsed, each
+                with its intention and the state of the dialog agent, as
+                accepted by `parse_utterance`.
+
+        Returns:
+            `list` of dict: The parse of each utterance, in the order of
+            `requests`, as returned by `parse_utterance`.
+        """
+        start_time = time.time()
+        parses = [{} for _ in requests]
+        free_form, trigger_fns, action_fns = [], [], []
+        for i, (utterance, intention_type, state) in enumerate(requests):
+            if intention_type is IntentionType.free_form:
+                free_form.append(i)
+            elif intention_type is IntentionType.trigger_fn:
+                trigger_fns.append(i)
+            elif intention_type is IntentionType.action_fn:
+                action_fns.append(i)
+            else:
+                parses[i] = self.parse_utterance(utterance, intention_type,
+                                                 state)
+
+        # Each batch is a tuple of the slot it parses, the indices of its
+        # requests, the model, the utterances and the Channels in context.
+        batches = []
+        if free_form:
+            # Tokenize and stem the utterances only once for all the models.
+            utterances = self.trigger_channel_model.preprocessed_inputs(
+                [requests[i][0] for i in free_form])
+            for slot, model in [
+                    (Slot.trigger_channel, self.trigger_channel_model),
+                    (Slot.action_channel, self.action_channel_model),
+                    (Slot.trigger_fn, self.trigger_fn_model),
+                    (Slot.action_fn, self.action_fn_model)]:
+                batches.append((slot, free_form, model, utterances, None))
+        if trigger_fns:
+            channels = [requests[i][2].trigger[ID] for i in trigger_fns]
+            names = [self.label_description.trigger_channel_description(
+                channel) for channel in channels]
+            utterances = [requests[i][0] + " on " + name
+                          for i, name in zip(trigger_fns, names)]
+            batches.append((Slot.trigger_fn, trigger_fns,
+                            self.trigger_fn_model, utterances, channels))
+        if action_fns:
+            channels = [requests[i][2].action[ID] for i in action_fns]
+            names = [self.label_description.action_channel_description(
+                channel) for channel in channels]
+            utterances = [requests[i][0] + " on " + name
+                          for i, name in zip(action_fns, names)]
+            batches.append((Slot.action_fn, action_fns, self.action_fn_model,
+                            utterances, channels))
+
+        if self.pool is None:
+            batch_preds = [self._parse_batch(*batch[2:]) for batch in batches]
+        else:
+            results = [self.pool.apply_async(self._parse_batch, batch[2:])
+                       for batch in batches]
+            batch_preds = [result.get() for result in results]
+        for (slot, indices, _, _, _), preds in zip(batches, batch_preds):
+            for i, pred in zip(indices, preds):
+                parses[i][slot] = pred
+        logging.info("Parsed %s utterances in %.4f seconds.", len(requests),
+                     time.time() - start_time)
+        return parses
+
+    def _parse_batch(self, model, utterances, channels):
+        """Parses a slot from each of the utterances `utterances` with a single
+        forward pass of `model`.
+
+        Args:
+            model (`parser.ensembled_model.EnsembledModel`): Model parsing the
+                slot.
+            utterances (`list` of `str` or
+                `parser.dataset.PreprocessedInputs`): The user-utterances to be
+                parsed.
+            channels (`list` of `str`): The Channel in context of each
+                utterance, if the slot is a Function to be parsed based on it,
+                as in `_parse_fn_based_on_channel`. `None` if the slot is
+                parsed from free-form utterances.
+
+        Returns:
+            `list` of (`str`, `float`): The parsed label of each utterance, and
+            model's confidence in the parse.
+        """
+        if channels is None:
+            return [preds[0] for preds in model.predict_batch(utterances, k=1)]
+        masks = np.array([self._compatible_mask(model, channel)
+                          for channel in channels])
+        all_preds = model.predict_batch(utterances, k=0, label_masks=masks)
+        return [self._rescaled_compatible_predictions(preds, channel)[0]
+                for preds, channel in zip(all_preds, channels)]
+
     def _parse_everything(self, utterance):
         """Assumes the utterance `utterance` to be free-form, and parses values
         for all slots.
 
+        The slots are parsed by independent models, which are dispatched onto
+        `pool`, if any.
+
         Args:
             utterance (str): The user-utterance to be parsed.
 
@@ -122,26 +240,54 @@ class UtteranceParser(object):
             indicating the parsed Channel/Function and model's confidence in
             the parse.
         """
-        predictions = {}
-        trigger_channel_pred = self._parse_trigger_channel(utterance)
-        predictions.update(trigger_channel_pred)
+        start_time = time.time()
+        # Tokenize and stem the utterance only once for all the models.
+        utterance = self.trigger_channel_model.preprocessed_inputs([utterance])
+        slot_parsers = [self._parse_trigger_channel,
+                        self._parse_action_channel, self._parse_trigger_fn,
+                        self._parse_action_fn]
+        if self.pool is None:
+            slot_preds = [self._timed_parse(slot_parser, utterance)
+                          for slot_parser in slot_parsers]
+        else:
+            results = [self.pool.apply_async(self._timed_parse,
+                                             (slot_parser, utterance))
+                       for slot_parser in slot_parsers]
+            slot_preds = [result.get() for result in results]
 
-        action_channel_pred = self._parse_action_channel(utterance)
-        predictions.update(action_channel_pred)
+        predictions = {}
+        for slot_pred in slot_preds:
+            predictions.update(slot_pred)
+        logging.info("Parsed free-form utterance in %.4f seconds.",
+                     time.time() - start_time)
+        return predictions
 
-        trigger_fn_preds = self._parse_trigger_fn(utterance)
-        predictions.update(trigger_fn_preds)
+    @staticmethod
+    def _timed_parse(slot_parser, utterance):
+        """Parses the utterance `utterance` using `slot_parser`, and logs the
+        time taken.
 
-        action_fn_preds = self._parse_action_fn(utterance)
-        predictions.update(action_fn_preds)
+        Args:
+            slot_parser (function): One of the methods parsing a single slot
+                from a free-form utterance, such as `_parse_trigger_channel`.
+            utterance (str or `parser.dataset.PreprocessedInputs`): The
+                user-utterance to be parsed.
 
-        return predictions
+        Returns:
+            dict: The parse returned by `slot_parser`.
+        """
+        start_time = time.time()
+        preds = slot_parser(utterance)
+        logging.debug("%s took %.4f seconds.", slot_parser.__name__,
+                      time.time() - start_time)
+        return preds
 
     def _parse_trigger_channel(self, utterance):
         """Parses Trigger Channel from the utterance `utterance`.
 
         Args:
-            utterance (str): The user-utterance to be parsed.
+            utterance (str or `parser.dataset.PreprocessedInputs`): The
+                user-utterance to be parsed.
 
         Returns:
             dict: Mapping of the Trigger Channel slot (`Slot.trigger_channel`)
@@ -158,7 +304,8 @@ class UtteranceParser(object):
         """Parses Action Channel from the utterance `utterance`.
 
         Args:
-            utterance (str): The user-utterance to be parsed.
+            utterance (str or `parser.dataset.PreprocessedInputs`): The
+                user-utterance to be parsed.
 
         Returns:
             dict: Mapping of the Action Channel slot (`Slot.action_channel`)
@@ -175,7 +322,8 @@ class UtteranceParser(object):
         """Parses Trigger Function from the utterance `utterance`.
 
         Args:
-            utterance (str): The user-utterance to be parsed.
+            utterance (str or `parser.dataset.PreprocessedInputs`): The
+                user-utterance to be parsed.
 
         Returns:
             dict: Mapping of the Trigger Function slot (`Slot.trigger_fn`)
@@ -191,7 +339,8 @@ class UtteranceParser(object):
         """Parses Action Function from the utterance `utterance`.
 
         Args:
-            utterance (str): The user-utterance to be parsed.
+            utterance (str or `parser.dataset.PreprocessedInputs`): The
+                user-utterance to be parsed.
 
         Returns:
             dict: Mapping of the Action Function slot (`Slot.action_fn`)
@@ -271,9 +420,41 @@ class UtteranceParser(object):
         # the Functions that are compatible with the `channel`.
         # The top-k among them will be returned with their confidences
         # re-weighted so that they sum to 1 among themselves.
-        action_fn_preds = model.predict(input=utterance, k=0)
-        compatible_preds = self._compatible_predictions(action_fn_preds,
-                                                        channel)
+        action_fn_preds = model.predict(
+            input=utterance, k=0,
+            label_mask=self._compatible_mask(model, channel))
+        return self._rescaled_compatible_predictions(action_fn_preds, channel)
+
+    def _compatible_mask(self, model, channel):
+        """Returns the mask of the Functions of `model` that are associated
+        with the Channel `channel`, letting a cascade of `model` bound the
+        confidences of `_rescaled_compatible_predictions`.
+
+        Args:
+            model (`parser.ensembled_model.EnsembledModel`): Model parsing the
+                Function.
+            channel (str): Channel in context.
+
+        Returns:
+            numpy.ndarray: Mask of the compatible Functions, as returned by
+            `parser.ensembled_model.EnsembledModel.label_mask`.
+        """
+        return model.label_mask(lambda fn: self._is_compatible(fn, channel))
+
+    def _rescaled_compatible_predictions(self, predictions, channel):
+        """Returns the predicted Functions that are associated with the Channel
+        `channel`, with their confidences re-weighted so that they sum to 1.
+
+        Args:
+            predictions (`list` of (`str`, `float`)): All the predicted
+                Functions, sorted by decreasing confidence.
+            channel (str): Channel in context.
+
+        Returns:
+            `list` of (`str`, `float`): The compatible Functions, sorted by
+            decreasing confidence.
+        """
+        compatible_preds = self._compatible_predictions(predictions, channel)
         # Recalculate confidences
         confidences = [conf for _, conf in compatible_preds]
         remaining_prob_mass = 1. - sum(confidences)
@@ -290,11 +471,15 @@ class UtteranceParser(object):
     def _compatible_predictions(self, predictions, desired_channel):
         compatible_preds = []
         for fn, conf in predictions:
-            channel = fn.split('.')[0]
-            if channel == desired_channel:
+            if self._is_compatible(fn, desired_channel):
                 compatible_preds.append((fn, conf))
         return compatible_preds
 
+    @staticmethod
+    def _is_compatible(fn, desired_channel):
+        channel = fn.split('.')[0]
+        return channel == desired_channel
+
     def _parse_trigger_channel_keyword(self, utterance):
         """Parses Trigger Channel from the utterance `utterance` using the
         keyword-based model `self.keyword_model`.
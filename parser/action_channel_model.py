@@ -23,29 +23,19 @@ class ActionChannelModel(Model):
         self._load_label_maps(ACTION_CHANNEL_LABELS_PATH)
         logging.info("Number of classes = %s", len(self.labels_map))
 
-    def _convert_to_one_hot(self, labels):
-        """Converts the label keywords to one-hot vectors.
+    def _convert_to_ids(self, labels):
+        """Converts the label keywords to their ids.
 
-        For example, a label "dummy" with id 1 is converted to the following
-        vector, assuming there are a total of 5 distinct label classes:
-        [0,1,0,0,0]
+        For example, a label "dummy" with id 1 is converted to 1.
 
         Args:
             labels (`list` of `label.Label`): Labels.
 
         Returns:
-            numpy.ndarray: 2D array, with rows representing one-hot vector for
-            labels.
+            numpy.ndarray: 1D `int32` array of the ids of the labels.
         """
-        indices = []
-        for label in labels:
-            indices.append(self.labels_map[label.action_channel])
-
-        m, n = len(indices), len(self.labels_map)
-        indices = np.array(indices)
-        one_hot = np.zeros((m, n))
-        one_hot[np.arange(m), indices] = 1.
-        return one_hot
+        ids = [self.labels_map[label.action_channel] for label in labels]
+        return np.array(ids, dtype=np.int32)
 
 
 def main():
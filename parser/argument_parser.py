@@ -34,7 +34,8 @@ def training_arguments_parser():
                         dest='retrain')
     parser.add_argument('--saved-model-path', nargs='?', type=str,
                         default="", const="",
-                        help="Path of the saved model to be loaded.",
+                        help="Path of the saved model to be loaded. Defaults "
+                             "to the best checkpoint of the experiment.",
                         dest='saved_model_path')
     parser.add_argument('--use-train-set', action='store_true',
                         help="Use data from training set for training.",
@@ -48,6 +49,18 @@ def training_arguments_parser():
     parser.add_argument('--use-synthetic-recipes', action='store_true',
                         help="Use data from synthetic recipes for training.",
                         dest='use_synthetic_recipes')
+    parser.add_argument('--synthetic-recipes-per-epoch', nargs='?', type=int,
+                        default=0, const=0,
+                        help="Number of synthetic recipes drawn afresh at "
+                             "every epoch. Defaults to 0, in which case all "
+                             "synthetic recipes are used at every epoch. "
+                             "Relevant only with --use-synthetic-recipes.",
+                        dest='synthetic_recipes_per_epoch')
+    parser.add_argument('--synthetic-recipes-seed', nargs='?', type=int,
+                        default=0, const=0,
+                        help="Seed of the synthetic recipes drawn for the "
+                             "first epoch. Defaults to 0.",
+                        dest='synthetic_recipes_seed')
     parser.add_argument('--external-train-csv', nargs='?', type=str,
                         default="", const="",
                         help="Path of a CSV file from which train set is to be "
@@ -58,6 +71,66 @@ def training_arguments_parser():
     parser.add_argument('--use-names-descriptions', action='store_true',
                         help="Use both names and descriptions of recipes.",
                         dest='use_names_descriptions')
+    parser.add_argument('--num-workers', nargs='?', type=int,
+                        default=0, const=0,
+                        help="Number of worker processes that compute the "
+                             "gradients of each mini-batch together with the "
+                             "training process. Defaults to 0, i.e., no "
+                             "workers.", dest='num_workers')
+    parser.add_argument('--snapshot-cycles', nargs='?', type=int,
+                        default=0, const=0,
+                        help="Number of cycles of a cyclic learning rate, "
+                             "each ending with a snapshot of the model, that "
+                             "make up the epochs of training. The snapshots "
+                             "form an ensemble. Defaults to 0, i.e., a "
+                             "constant learning rate.",
+                        dest='snapshot_cycles')
+    parser.add_argument('--training-state-steps', nargs='?', type=int,
+                        default=0, const=0,
+                        help="Number of training steps after which a "
+                             "full-state checkpoint, from which training can "
+                             "be resumed exactly, is written. One is also "
+                             "written at the end of every epoch. Defaults to "
+                             "0, i.e., no full-state checkpoints.",
+                        dest='training_state_steps')
+    parser.add_argument('--resume', action='store_true',
+                        help="Resume training from the latest full-state "
+                             "checkpoint of the experiment, with the state of "
+                             "the optimizer, the counters, the random number "
+                             "generators and the position in the epoch. "
+                             "--saved-model-path and --retrain are ignored. "
+                             "Relevant only with --load-and-train option.",
+                        dest='resume')
+    parser.add_argument('--batch-size', nargs='?', type=int,
+                        default=0, const=0,
+                        help="Size of the mini-batches. A size larger than "
+                             "that of the configuration trains in large-batch "
+                             "mode, with the learning rate scaled by "
+                             "--learning-rate-scaling. Defaults to 0, i.e., "
+                             "the size of the configuration.",
+                        dest='batch_size')
+    parser.add_argument('--learning-rate-scaling', nargs='?', type=str,
+                        default="sqrt", const="sqrt",
+                        choices=["linear", "sqrt", "none"],
+                        help="Rule by which the learning rate is scaled with "
+                             "--batch-size. Can take values among ['linear', "
+                             "'sqrt', 'none']. Defaults to 'sqrt'.",
+                        dest='learning_rate_scaling')
+    parser.add_argument('--warmup-epochs', nargs='?', type=int,
+                        default=None,
+                        help="Number of epochs over which the learning rate "
+                             "is increased linearly at the beginning of "
+                             "training. Defaults to that of the "
+                             "configuration.", dest='warmup_epochs')
+    parser.add_argument('--learning-rate-decay', nargs='?', type=str,
+                        default=None,
+                        choices=["constant", "exponential", "linear",
+                                 "cosine"],
+                        help="Decay of the learning rate after the warmup. "
+                             "Can take values among ['constant', "
+                             "'exponential', 'linear', 'cosine']. Ignored "
+                             "with --snapshot-cycles. Defaults to that of the "
+                             "configuration.", dest='learning_rate_decay')
 
     return parser
 
@@ -81,7 +154,9 @@ def testing_arguments_parser():
                         help="Name of the experiment that was used for "
                              "training", dest='experiment_name')
     parser.add_argument('--saved-model-path', nargs='*', type=str,
-                        help="Path of the saved model to be tested.",
+                        help="Paths of the saved models to be tested, one "
+                             "per experiment. Defaults to the best checkpoint "
+                             "of each experiment.",
                         dest='saved_model_path')
     parser.add_argument('--external-test-csv', nargs='?', type=str,
                         default="", const="",
@@ -110,6 +185,83 @@ def testing_arguments_parser():
     parser.add_argument('--use-names-descriptions', action='store_true',
                         help="Use both names and descriptions of recipes.",
                         dest='use_names_descriptions')
+    parser.add_argument('--use-snapshots', action='store_true',
+                        help="Use every snapshot of each experiment, saved "
+                             "with --snapshot-cycles, as a member of the "
+                             "ensemble. --saved-model-path is ignored.",
+                        dest='use_snapshots')
+
+    return parser
+
+
+def ensemble_comparison_arguments_parser():
+    """Parses command-line arguments for comparing a snapshot ensemble with an
+    ensemble of independently trained models.
+
+    Returns:
+        argparse.ArgumentParser: Argument parser for comparing ensembles.
+    """
+    parser = testing_arguments_parser()
+    parser.add_argument('--snapshot-experiment-name', nargs=1, type=str,
+                        help="Name of the experiment trained with "
+                             "--snapshot-cycles, whose snapshots form the "
+                             "snapshot ensemble. --experiment-name gives the "
+                             "independently trained models.",
+                        dest='snapshot_experiment_name')
+
+    return parser
+
+
+def ensemble_training_arguments_parser():
+    """Parses command-line arguments for training the members of an ensemble.
+
+    Returns:
+        argparse.ArgumentParser: Argument parser for training an ensemble.
+    """
+    parser = training_arguments_parser()
+    parser.add_argument('--num-members', nargs='?', type=int,
+                        default=10, const=10,
+                        help="Number of members of the ensemble. Defaults to "
+                             "10.", dest='num_members')
+    parser.add_argument('--num-processes', nargs='?', type=int,
+                        default=None,
+                        help="Number of groups of members trained "
+                             "concurrently, each in its own process. Defaults "
+                             "to the number of CPU cores.",
+                        dest='num_processes')
+    parser.add_argument('--threads-per-member', nargs='?', type=int,
+                        default=None,
+                        help="Number of threads Tensorflow may use for each "
+                             "member. Defaults to the number of CPU cores "
+                             "divided by --num-processes.",
+                        dest='threads_per_member')
+    parser.add_argument('--members-per-graph', nargs='?', type=int,
+                        default=1, const=1,
+                        help="Number of members trained together in a single "
+                             "Tensorflow graph, with their weights stacked. "
+                             "Defaults to 1, i.e., each member is trained in "
+                             "its own graph.", dest='members_per_graph')
+    parser.add_argument('--seed', nargs='?', type=int, default=0, const=0,
+                        help="Seed of the first member. Member i is seeded "
+                             "with seed + i. Defaults to 0.", dest='seed')
+
+    return parser
+
+
+def batch_size_report_arguments_parser():
+    """Parses command-line arguments for reporting the throughput and accuracy
+    of training with several batch sizes.
+
+    Returns:
+        argparse.ArgumentParser: Argument parser for the batch size report.
+    """
+    parser = training_arguments_parser()
+    parser.add_argument('--batch-sizes', nargs='*', type=int,
+                        default=[32, 64, 128, 256, 512],
+                        help="Sizes of the mini-batches to be compared. "
+                             "--batch-size is ignored. Defaults to 32, 64, "
+                             "128, 256 and 512.",
+                        dest='batch_sizes')
 
     return parser
 
@@ -133,7 +285,71 @@ def prediction_arguments_parser():
                         help="Name of the experiment that was used for "
                              "training", dest='experiment_name')
     parser.add_argument('--saved-model-path', nargs='*', type=str,
-                        help="Path of the saved model to be tested.",
+                        help="Paths of the saved models to be tested, one "
+                             "per experiment. Defaults to the best checkpoint "
+                             "of each experiment.",
                         dest='saved_model_path')
 
     return parser
+
+
+def benchmark_arguments_parser():
+    """Parses command-line arguments for benchmarking the network.
+
+    Returns:
+        argparse.ArgumentParser: Argument parser for benchmarking.
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--log-level', nargs='?', type=str,
+                        default="INFO", const="INFO",
+                        help="Logging level. Can take values among ['DEBUG',"
+                             "'INFO', 'WARNING', 'ERROR', 'CRITICAL']",
+                        dest='log_level')
+    parser.add_argument('--num-classes', nargs='*', type=int,
+                        default=[250, 900],
+                        help="Numbers of label classes to benchmark with. "
+                             "Defaults to sizes similar to those of the "
+                             "Channel and Function models.",
+                        dest='num_classes')
+    parser.add_argument('--batch-size', nargs='?', type=int,
+                        default=32, const=32,
+                        help="Size of the mini-batches used for training "
+                             "steps. Defaults to 32.", dest='batch_size')
+    parser.add_argument('--eval-size', nargs='?', type=int,
+                        default=4000, const=4000,
+                        help="Number of examples evaluated in a single run. "
+                             "Defaults to 4000.", dest='eval_size')
+    parser.add_argument('--num-steps', nargs='?', type=int,
+                        default=50, const=50,
+                        help="Number of timed runs of each kind. Defaults to "
+                             "50.", dest='num_steps')
+    parser.add_argument('--preprocessing', action='store_true',
+                        help="Benchmark pre-processing of the synthetic "
+                             "recipes, with and without the stem cache, "
+                             "instead of the network.",
+                        dest='preprocessing')
+    parser.add_argument('--input-pipeline', action='store_true',
+                        help="Benchmark training epochs over --eval-size "
+                             "random examples, with and without prefetching "
+                             "of mini-batches, instead of single steps.",
+                        dest='input_pipeline')
+
+    return parser
+
+
+def export_arguments_parser():
+    """Parses command-line arguments for exporting an ensemble to an artifact.
+
+    Returns:
+        argparse.ArgumentParser: Argument parser for exporting.
+    """
+    parser = prediction_arguments_parser()
+    parser.add_argument('--artifact-path', nargs='?', type=str,
+                        default=None,
+                        help="Path of the artifact to be written. Defaults to "
+                             "the artifact file in the directory of the "
+                             "ensemble, where it is looked for when loading "
+                             "the ensemble.", dest='artifact_path')
+
+    return parser
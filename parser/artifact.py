@@ -0,0 +1,199 @@
+"""
+Single-file artifact packaging all the models of an ensemble.
+
+An artifact holds, for every model of an ensemble, the variables of its network,
+its vocabulary, and its label map, along with the configuration the models were
+trained with. It is laid out as follows (all integers are little-endian):
+
+    magic          8 bytes   `MAGIC`
+    version        uint32    `VERSION`
+    header CRC32   uint32    CRC32 of the header bytes
+    header length  uint64    Number of bytes in the header
+    header         JSON, UTF-8 encoded
+    padding        Zeros up to a multiple of `ALIGNMENT`
+    data           Raw arrays and vocabulary dumps, each starting at a
+                   multiple of `ALIGNMENT` from the start of the data
+
+The header records the configuration, the SHA-256 digest of the data, and, for
+every model, the offset, size, dtype, and shape of each of its arrays within
+the data. The arrays are stored in C order and loaded as read-only views of a
+memory-mapped file, so that processes loading the same artifact share its pages
+through the page cache instead of holding private copies.
+"""
+
+import hashlib
+import json
+import logging
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"NL2CART\x00"
+"""str: Bytes identifying an artifact."""
+VERSION = 1
+"""int: Version of the layout written by `write_artifact`."""
+ALIGNMENT = 64
+"""int: Alignment, in bytes, of the data and of each array within it."""
+_PREAMBLE = struct.Struct("<8sIIQ")
+"""`struct.Struct`: Layout of the magic, version, header CRC32, and header
+length."""
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_artifact(path, config, members):
+    """Writes an artifact packaging the models of an ensemble.
+
+    Args:
+        path (str): Path of the artifact.
+        config: A configuration class, similar to `configs.PaperConfigurations`,
+            that the models were trained with.
+        members (`list` of dict): One `dict` per model, with the keys
+            "variables" (`dict` mapping un-scoped variable names to
+            `numpy.ndarray`s, as returned by `model.Model.variable_values`),
+            "vocabulary_dump" (`str` contents of the vocabulary pickle dump),
+            "labels_reverse_map" (`dict` mapping `int` ids to `str` labels),
+            and "stem" (bool).
+    """
+    blobs = []
+    data_size = [0]
+
+    def add_blob(blob):
+        offset = _aligned(data_size[0])
+        blobs.append((offset, blob))
+        data_size[0] = offset + len(blob)
+        return {"offset": offset, "size": len(blob)}
+
+    header_members = []
+    for member in members:
+        variables = {}
+        for name in sorted(member["variables"]):
+            value = np.ascontiguousarray(member["variables"][name])
+            entry = add_blob(value.tostring())
+            entry["dtype"] = value.dtype.str
+            entry["shape"] = list(value.shape)
+            variables[name] = entry
+        header_members.append({
+            "stem": bool(member["stem"]),
+            "labels": sorted(member["labels_reverse_map"].items()),
+            "vocabulary": add_blob(member["vocabulary_dump"]),
+            "variables": variables})
+
+    data = bytearray(data_size[0])
+    for offset, blob in blobs:
+        data[offset:offset + len(blob)] = blob
+    header = json.dumps({
+        "config": {name: getattr(config, name) for name in dir(config)
+                   if not name.startswith("_")},
+        "data_sha256": hashlib.sha256(data).hexdigest(),
+        "members": header_members}, sort_keys=True).encode("utf-8")
+
+    preamble = _PREAMBLE.pack(MAGIC, VERSION, zlib.crc32(header) & 0xffffffff,
+                              len(header))
+    data_offset = _aligned(len(preamble) + len(header))
+    with open(path, 'wb') as f:
+        f.write(preamble)
+        f.write(header)
+        f.write(b"\x00" * (data_offset - len(preamble) - len(header)))
+        f.write(data)
+    logging.info("Artifact with %s models written to %s", len(members), path)
+
+
+class ModelArtifact(object):
+    """Memory-mapped artifact written by `write_artifact`.
+
+    Args:
+        path (str): Path of the artifact.
+        verify (bool, optional): Set to `True` if the digest of the data is to
+            be checked, which reads the whole artifact once. The header is
+            always checked. Defaults to `True`.
+
+    Attributes:
+        path (str): Path of the artifact.
+        version (int): Version of the layout of the artifact.
+        num_members (int): Number of models in the artifact.
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        self._mmap = np.memmap(path, dtype=np.uint8, mode='r')
+        """`numpy.memmap`: Read-only map of the whole artifact."""
+        if len(self._mmap) < _PREAMBLE.size:
+            logging.error("%s is too short to be an artifact.", path)
+            raise ValueError
+        magic, self.version, header_crc, header_size = _PREAMBLE.unpack(
+            self._mmap[:_PREAMBLE.size].tostring())
+        if magic != MAGIC:
+            logging.error("%s is not an artifact.", path)
+            raise ValueError
+        if self.version != VERSION:
+            logging.error("Artifact %s has version %s; only version %s is "
+                          "supported.", path, self.version, VERSION)
+            raise ValueError
+        header = self._mmap[_PREAMBLE.size:
+                            _PREAMBLE.size + header_size].tostring()
+        if len(header) != header_size or \
+                zlib.crc32(header) & 0xffffffff != header_crc:
+            logging.error("Header of artifact %s is corrupt.", path)
+            raise ValueError
+        self._header = json.loads(header.decode("utf-8"))
+        """dict: The decoded header."""
+        self._data_offset = _aligned(_PREAMBLE.size + header_size)
+        """int: Offset of the data in the artifact."""
+        self.num_members = len(self._header["members"])
+
+        if verify:
+            digest = hashlib.sha256(self._mmap[self._data_offset:]).hexdigest()
+            if digest != self._header["data_sha256"]:
+                logging.error("Data of artifact %s is corrupt.", path)
+                raise ValueError
+        logging.info("Artifact with %s models loaded from %s",
+                     self.num_members, path)
+
+    def configuration(self):
+        """Returns the configuration the models were trained with.
+
+        Returns:
+            A configuration class, similar to `configs.PaperConfigurations`.
+        """
+        return type("ArtifactConfiguration", (object,),
+                    {str(name): value for name, value
+                     in self._header["config"].items()})
+
+    def stem(self, i):
+        """Returns `True` if the `i`-th model stems its input descriptions."""
+        return self._header["members"][i]["stem"]
+
+    def labels_reverse_map(self, i):
+        """Returns the mapping of `int` ids to `str` labels of the `i`-th
+        model."""
+        return {label_id: str(label)
+                for label_id, label in self._header["members"][i]["labels"]}
+
+    def vocabulary_dump(self, i):
+        """Returns the contents of the vocabulary pickle dump of the `i`-th
+        model."""
+        return self._blob(self._header["members"][i]["vocabulary"]).tostring()
+
+    def variables(self, i):
+        """Returns the variables of the network of the `i`-th model.
+
+        Args:
+            i (int): Index of the model.
+
+        Returns:
+            dict: Maps un-scoped variable names to read-only `numpy.ndarray`s
+            backed by the memory-mapped artifact.
+        """
+        variables = {}
+        for name, entry in self._header["members"][i]["variables"].items():
+            variables[str(name)] = self._blob(entry).view(
+                np.dtype(str(entry["dtype"]))).reshape(entry["shape"])
+        return variables
+
+    def _blob(self, entry):
+        start = self._data_offset + entry["offset"]
+        return self._mmap[start:start + entry["size"]]
@@ -0,0 +1,181 @@
+"""
+Report the throughput and accuracy of training with several batch sizes.
+
+A model is trained with each batch size of `--batch-sizes`, in large-batch
+mode (see `configs.large_batch_configuration`), with the learning rate scaled
+by `--learning-rate-scaling` and the schedule given by `--warmup-epochs` and
+`--learning-rate-decay`. The run of batch size `b` of experiment `name` lives
+in "name/name-batch-b", and is trained in a fresh process, so that no
+Tensorflow session of an earlier run exists when the gradient workers of
+`--num-workers` are forked. The throughput of the training steps, the
+wall-clock time of training, and the validation error and loss of the best
+checkpoint of each run are then logged side by side, and written to
+`REPORT_FILE` in the experiment directory. The largest batch size whose best
+validation error is close to that of the smallest one is the one to train
+with.
+"""
+
+import copy
+import json
+import logging
+import multiprocessing
+
+from parser.action_channel_model import ActionChannelModel
+from parser.action_function_model import ActionFunctionModel
+from parser.argument_parser import batch_size_report_arguments_parser
+from parser.constants import BEST_CHECKPOINT_MANIFEST, CHECKPOINTS_DIRECTORY
+from parser.constants import RNN_EXPT_DIRECTORY, TRAINING_SUMMARY
+from parser.train import train_model
+from parser.trigger_function_model import TriggerFunctionModel
+from parser.trigger_channel_model import TriggerChannelModel
+from parser import utils
+
+REPORT_FILE = "batch-size-report.json"
+"""str: Name of the report, in the experiment directory."""
+
+
+def parse_args():
+    """Parses and logs command-line arguments.
+
+    Returns:
+        Namespace: Namespace containing parsed arguments.
+    """
+    args = batch_size_report_arguments_parser().parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format='%(levelname)s: %(asctime)s: %(message)s')
+    logging.info("Log Level: %s", args.log_level)
+    logging.info("Experiment Name: %s", args.experiment_name[0])
+    logging.info("Model: %s", args.model[0])
+    logging.info("Batch Sizes: %s", args.batch_sizes)
+    logging.info("Learning Rate Scaling: %s", args.learning_rate_scaling)
+    logging.info("Warmup Epochs: %s", args.warmup_epochs)
+    logging.info("Learning Rate Decay: %s", args.learning_rate_decay)
+    logging.info("Number of Workers: %s", args.num_workers)
+    logging.info("Use Train Set: %s", args.use_train_set)
+    logging.info("Use Triggers API: %s", args.use_triggers_api)
+    logging.info("Use Actions API: %s", args.use_actions_api)
+    logging.info("Use Synthetic Recipes: %s", args.use_synthetic_recipes)
+    logging.info("Use Names and Descriptions: %s", args.use_names_descriptions)
+
+    return args
+
+
+def run_experiment_name(experiment_name, batch_size):
+    """Returns the name of the experiment of the run with `batch_size`.
+
+    Args:
+        experiment_name (str): Name of the report's experiment.
+        batch_size (int): Size of the mini-batches of the run.
+
+    Returns:
+        str: Name of the run's experiment.
+    """
+    return "{0}/{0}-batch-{1}".format(experiment_name, batch_size)
+
+
+def run_report(experiment_name):
+    """Returns the throughput and accuracy of a training run, as recorded in
+    its training summary and best checkpoint manifest.
+
+    Args:
+        experiment_name (str): Name of the run's experiment.
+
+    Returns:
+        dict: The batch size, learning rate, throughput, wall-clock seconds
+        and epochs of training, and the best epoch with its validation error
+        and loss.
+    """
+    path = RNN_EXPT_DIRECTORY + experiment_name + "/"
+    try:
+        with open(path + TRAINING_SUMMARY, 'r') as f:
+            summary = json.load(f)
+        with open(path + CHECKPOINTS_DIRECTORY + BEST_CHECKPOINT_MANIFEST,
+                  'r') as f:
+            manifest = json.load(f)
+    except (IOError, ValueError) as e:
+        logging.error("Unable to read the results of %s: %s", experiment_name,
+                      e)
+        raise
+    return {"batch_size": summary["batch_size"],
+            "learning_rate": summary["learning_rate"],
+            "examples_per_second": summary["examples_per_second"],
+            "wall_seconds": summary["wall_seconds"],
+            "epochs": summary["epochs"],
+            "best_epoch": manifest["epoch"],
+            "validation_error": manifest["validation_error"],
+            "validation_loss": manifest["validation_loss"]}
+
+
+def report_batch_sizes(args, model_class):
+    """Trains a model with each batch size of `args.batch_sizes`, and reports
+    the throughput and accuracy of each run. The speedup of each run is
+    relative to the smallest batch size.
+
+    Args:
+        args (Namespace): Namespace containing parsed arguments.
+        model_class (:obj:`Model`): One of the child classes of the `Model`
+            class.
+    """
+    experiment_name = args.experiment_name[0]
+    reports = []
+    for batch_size in sorted(args.batch_sizes):
+        name = run_experiment_name(experiment_name, batch_size)
+        utils.create_experiment_directory(name)
+        run_args = copy.copy(args)
+        run_args.batch_size = batch_size
+        logging.info("Training with batch size %s.", batch_size)
+        process = multiprocessing.Process(
+            target=train_model,
+            args=(run_args, model_class, RNN_EXPT_DIRECTORY + name + "/"))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            logging.error("Training with batch size %s failed.", batch_size)
+            raise RuntimeError
+        reports.append(run_report(name))
+
+    baseline = reports[0]
+    logging.info("Batch size | Learning rate | Examples/s | Speedup | Wall "
+                 "time (s) | Best epoch | Validation error | Validation loss")
+    for report in reports:
+        logging.info("%10d | %13.5f | %10.0f | %6.2fx | %13.0f | %10d | "
+                     "%16.4f | %15.4f", report["batch_size"],
+                     report["learning_rate"], report["examples_per_second"],
+                     report["examples_per_second"] /
+                     baseline["examples_per_second"], report["wall_seconds"],
+                     report["best_epoch"], report["validation_error"],
+                     report["validation_loss"])
+    path = RNN_EXPT_DIRECTORY + experiment_name + "/" + REPORT_FILE
+    with open(path, 'w') as f:
+        json.dump(reports, f, indent=2, sort_keys=True)
+    logging.info("Report written to %s", path)
+
+
+def main():
+    args = parse_args()
+    if args.load_and_train:
+        logging.error("--load-and-train is not supported for the report.")
+        return
+    if args.snapshot_cycles > 0:
+        logging.error("--snapshot-cycles is not supported for the report.")
+        return
+    utils.create_experiment_directory(args.experiment_name[0])
+
+    if args.model[0] == "TriggerFunctionModel":
+        model_class = TriggerFunctionModel
+    elif args.model[0] == "ActionFunctionModel":
+        model_class = ActionFunctionModel
+    elif args.model[0] == "TriggerChannelModel":
+        model_class = TriggerChannelModel
+    elif args.model[0] == "ActionChannelModel":
+        model_class = ActionChannelModel
+    else:
+        logging.error("Illegal model class %s", args.model[0])
+        return
+
+    report_batch_sizes(args, model_class)
+
+
+if __name__ == '__main__':
+    main()
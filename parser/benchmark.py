@@ -0,0 +1,217 @@
+"""
+Benchmark training steps and evaluation of the network on random inputs, the
+training input pipeline, or pre-processing of the synthetic recipes.
+"""
+
+import logging
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from parser.argument_parser import benchmark_arguments_parser
+from parser.cache import LRUCache
+from parser import configs
+from parser.constants import STEM_CACHE_SIZE, TrainVariables
+from parser.dataset import Dataset
+from parser.minibatches import prefetched_minibatches
+from parser.rnn import LatentAttentionNetwork
+from parser.synthetic_dataset import SyntheticDataset
+
+
+class ScanPredictionNetwork(LatentAttentionNetwork):
+    """`rnn.LatentAttentionNetwork` with its former prediction layer, which
+    multiplies the weights with the output representation of one example at a
+    time using `tf.scan`. It serves as the baseline of the benchmark.
+    """
+
+    def prediction_layer(self):
+        p = tf.get_variable(name="p",
+                            shape=[self._num_classes, 2 * self._hidden_size],
+                            dtype=tf.float32, initializer=self._initializer)
+        initializer = tf.zeros([self._num_classes, 1])
+        pred = tf.scan(lambda a, o: tf.matmul(p, o), self.output_representation,
+                       initializer=initializer)
+        return tf.reshape(pred, shape=[-1, self._num_classes],
+                          name="log_predictions")
+
+
+def parse_args():
+    """Parses and logs command-line arguments.
+
+    Returns:
+        Namespace: Namespace containing parsed arguments.
+    """
+    args = benchmark_arguments_parser().parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format='%(levelname)s: %(asctime)s: %(message)s')
+    logging.info("Log Level: %s", args.log_level)
+    logging.info("Number of Classes: %s", args.num_classes)
+    logging.info("Batch Size: %s", args.batch_size)
+    logging.info("Evaluation Size: %s", args.eval_size)
+    logging.info("Number of Steps: %s", args.num_steps)
+    logging.info("Pre-processing: %s", args.preprocessing)
+    logging.info("Input Pipeline: %s", args.input_pipeline)
+
+    return args
+
+
+def random_feed_dictionary(network, config, num_classes, num_examples):
+    """Creates a feed dictionary of random inputs and labels.
+
+    Args:
+        network (`rnn.LatentAttentionNetwork`): Network to be fed.
+        config: A configuration class, similar to `configs.PaperConfigurations`.
+        num_classes (int): Total number of label classes.
+        num_examples (int): Number of examples in the feed.
+
+    Returns:
+        dict: Feed dictionary for `network`.
+    """
+    inputs = np.random.randint(config.vocab_size,
+                               size=(num_examples, config.sent_size))
+    labels = np.random.randint(num_classes, size=num_examples).astype(np.int32)
+    seq_lens = np.random.randint(1, config.sent_size + 1, size=num_examples)
+    return {network.inputs: inputs, network.labels: labels,
+            network.seq_lens: seq_lens, network.dropout: config.dropout}
+
+
+def time_runs(session, fetches, feed_dict, num_steps):
+    """Returns the mean wall-clock time of running `fetches`.
+
+    One untimed run precedes the timed ones, to exclude one-off setup costs.
+
+    Args:
+        session (`tf.Session`): Session to run `fetches` in.
+        fetches: Fetches accepted by `tf.Session.run`.
+        feed_dict (dict): Feed dictionary for the runs.
+        num_steps (int): Number of timed runs.
+
+    Returns:
+        float: Mean time of a run, in seconds.
+    """
+    session.run(fetches, feed_dict)
+    start_time = time.time()
+    for _ in xrange(num_steps):
+        session.run(fetches, feed_dict)
+    return (time.time() - start_time) / num_steps
+
+
+def benchmark(network_class, config, num_classes, args):
+    """Times training steps and evaluation of a network.
+
+    Args:
+        network_class (:obj:`rnn.LatentAttentionNetwork`): Class of the
+            network to be benchmarked.
+        config: A configuration class, similar to `configs.PaperConfigurations`.
+        num_classes (int): Total number of label classes.
+        args (Namespace): Namespace containing parsed arguments.
+
+    Returns:
+        float, float: Mean time of a training step on a mini-batch, and of an
+        evaluation of the whole evaluation set, in seconds.
+    """
+    with tf.Graph().as_default():
+        network = network_class(config, num_classes, TrainVariables.all)
+        with tf.Session() as session:
+            session.run(tf.initialize_all_variables())
+            train_feed = random_feed_dictionary(network, config, num_classes,
+                                                args.batch_size)
+            train_time = time_runs(session, network.optimize, train_feed,
+                                   args.num_steps)
+            eval_feed = random_feed_dictionary(network, config, num_classes,
+                                               args.eval_size)
+            eval_time = time_runs(session, network.prediction, eval_feed,
+                                  args.num_steps)
+    return train_time, eval_time
+
+
+def benchmark_input_pipeline(config, num_classes, args):
+    """Times training epochs on random inputs: with mini-batches prepared on
+    the training thread, on a background thread, and on a background thread
+    with length bucketing. The mini-batches are trimmed to their longest input,
+    as `model.Model` does.
+
+    Args:
+        config: A configuration class, similar to `configs.PaperConfigurations`.
+        num_classes (int): Total number of label classes.
+        args (Namespace): Namespace containing parsed arguments.
+    """
+    with tf.Graph().as_default():
+        network = LatentAttentionNetwork(config, num_classes,
+                                         TrainVariables.all)
+        feed = random_feed_dictionary(network, config, num_classes,
+                                      args.eval_size)
+        arrays = (feed[network.inputs], feed[network.labels],
+                  feed[network.seq_lens])
+        with tf.Session() as session:
+            session.run(tf.initialize_all_variables())
+            settings = [(0, 0), (config.num_prefetched_batches, 0),
+                        (config.num_prefetched_batches, config.bucket_window)]
+            for num_prefetched, bucket_window in settings:
+                num_examples = 0
+                start_time = time.time()
+                for inputs, labels, seq_lens in prefetched_minibatches(
+                        arrays, args.batch_size, num_prefetched,
+                        keep_partial_batch=config.keep_partial_batch,
+                        lengths=arrays[2], bucket_window=bucket_window):
+                    session.run(network.optimize,
+                                {network.inputs: inputs[:, :seq_lens.max()],
+                                 network.labels: labels,
+                                 network.seq_lens: seq_lens,
+                                 network.dropout: config.dropout})
+                    num_examples += len(inputs)
+                elapsed = time.time() - start_time
+                logging.info("Classes=%s: %s prefetched mini-batches, bucket "
+                             "window %s: %s examples in %.2f s, %.0f "
+                             "examples/s", num_classes, num_prefetched,
+                             bucket_window, num_examples, elapsed,
+                             num_examples / elapsed)
+
+
+def benchmark_preprocessing(config):
+    """Times tokenizing and stemming the synthetic recipes, with and without
+    a stem cache.
+
+    Args:
+        config: A configuration class, similar to `configs.PaperConfigurations`.
+    """
+    descriptions, _ = SyntheticDataset.dataset_from_synthetic_recipes()
+    for stem_cache in [None, LRUCache(STEM_CACHE_SIZE)]:
+        dataset = Dataset(stem=True, config=config, stem_cache=stem_cache)
+        start_time = time.time()
+        inputs = dataset.tokenize_and_stem(descriptions)
+        elapsed = time.time() - start_time
+        num_tokens = sum(len(tokens) for tokens in inputs)
+        logging.info("Stem cache %s: %s descriptions (%s tokens) in %.2f s, "
+                     "%.0f descriptions/s", stem_cache, len(descriptions),
+                     num_tokens, elapsed, len(descriptions) / elapsed)
+
+
+def main():
+    args = parse_args()
+    config = configs.PaperConfiguration
+    if args.preprocessing:
+        benchmark_preprocessing(config)
+        return
+    if args.input_pipeline:
+        for num_classes in args.num_classes:
+            benchmark_input_pipeline(config, num_classes, args)
+        return
+    for num_classes in args.num_classes:
+        scan_train, scan_eval = benchmark(ScanPredictionNetwork, config,
+                                          num_classes, args)
+        batched_train, batched_eval = benchmark(LatentAttentionNetwork, config,
+                                                num_classes, args)
+        logging.info("Classes=%s: training step: scan %.2f ms, batched %.2f "
+                     "ms, speedup %.2fx", num_classes, 1000 * scan_train,
+                     1000 * batched_train, scan_train / batched_train)
+        logging.info("Classes=%s: evaluation of %s examples: scan %.2f ms, "
+                     "batched %.2f ms, speedup %.2fx", num_classes,
+                     args.eval_size, 1000 * scan_eval, 1000 * batched_eval,
+                     scan_eval / batched_eval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Size-bounded caches shared across threads.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+_MISSING = object()
+"""object: Sentinel returned by `LRUCache._lookup` when a key has no fresh
+entry, since `None` may be a cached value."""
+
+
+class _PendingValue(object):
+    """Value being computed by one thread, which other threads looking up the
+    same key wait for instead of computing it again."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.failed = False
+
+
+class LRUCache(object):
+    """Thread-safe cache holding at most `max_size` entries, evicting the least
+    recently used entry when full.
+
+    Entries can optionally expire `ttl` seconds after they are computed.
+    Concurrent lookups of a missing key are coalesced: the first one computes
+    the value, and the others wait for it.
+
+    Args:
+        max_size (int): Maximum number of entries.
+        ttl (float, optional): Number of seconds after which an entry expires.
+            Defaults to `None`, in which case entries never expire.
+        clock (function, optional): Function returning the current time in
+            seconds. Defaults to `time.time`.
+
+    Attributes:
+        max_size (int): Maximum number of entries.
+        ttl (float): Number of seconds after which an entry expires, or `None`.
+        hits (int): Number of lookups that did not compute their value,
+            including those that waited for a concurrent lookup computing it.
+        misses (int): Number of lookups that had to compute their value.
+        coalesced (int): Number of lookups that waited for a concurrent lookup
+            computing their value.
+        evictions (int): Number of entries evicted to make room for others.
+        expirations (int): Number of entries dropped because they expired.
+    """
+
+    def __init__(self, max_size, ttl=None, clock=time.time):
+        assert (max_size > 0)
+        assert (ttl is None or ttl > 0)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        """`collections.OrderedDict`: Maps keys to their cached values and
+        expiry times, from the least to the most recently used."""
+        self._pending = {}
+        """dict: Maps keys whose values are being computed to their
+        `_PendingValue`s."""
+        self._lock = threading.Lock()
+        """`threading.Lock`: Guards `_entries`, `_pending` and the counters."""
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return ("Size={}, Max size={}, TTL={}, Hits={}, Misses={}, "
+                "Coalesced={}, Evictions={}, Expirations={}, Hit rate={:.4f}"
+                .format(len(self), self.max_size, self.ttl, self.hits,
+                        self.misses, self.coalesced, self.evictions,
+                        self.expirations, self.hit_rate()))
+
+    def get(self, key, compute):
+        """Returns the value cached for `key`, computing and caching it with
+        `compute` if it is missing.
+
+        Args:
+            key: Hashable key.
+            compute (function): Function computing the value from `key`. It is
+                called without holding the lock.
+
+        Returns:
+            The value for `key`.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+        return self.get_many([key], lambda keys: [compute(keys[0])])[0]
+
+    def get_many(self, keys, compute):
+        """Returns the values cached for `keys`, computing and caching the
+        missing ones with a single call of `compute`.
+
+        Keys whose values are being computed by another thread are waited for.
+        If that computation fails, the value is computed again by this thread.
+
+        Args:
+            keys (list): Hashable keys, possibly repeated.
+            compute (function): Function computing the list of values of a
+                list of distinct keys. It is called without holding the lock.
+
+        Returns:
+            list: The values for `keys`, in order.
+        """
+        values = [None] * len(keys)
+        claimed = OrderedDict()
+        awaited = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    self.hits += 1
+                    values[i] = value
+                    continue
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = _PendingValue()
+                    claimed[key] = pending
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    if key not in claimed:
+                        self.coalesced += 1
+                awaited.append((i, pending))
+
+        if claimed:
+            self._compute(claimed, compute)
+        for i, pending in awaited:
+            pending.done.wait()
+            if pending.failed:
+                values[i] = self.get_many([keys[i]], compute)[0]
+            else:
+                values[i] = pending.value
+        return values
+
+    def hit_rate(self):
+        """Returns the fraction of lookups that were hits, or 0 if there were
+        no lookups."""
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.
+
+    def clear(self):
+        """Removes all entries and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.coalesced = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def _lookup(self, key):
+        """Returns the fresh value cached for `key`, and marks it as the most
+        recently used. Must be called with the lock held.
+
+        Args:
+            key: Hashable key.
+
+        Returns:
+            The value for `key`, or `_MISSING` if it is not cached or expired.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return _MISSING
+        value, expiry = entry
+        if expiry is not None and expiry <= self._clock():
+            self.expirations += 1
+            return _MISSING
+        self._entries[key] = entry
+        return value
+
+    def _compute(self, claimed, compute):
+        """Computes and caches the values of the keys claimed by a lookup, and
+        hands them to the lookups waiting for them.
+
+        Args:
+            claimed (`collections.OrderedDict`): Maps the keys to compute to
+                their `_PendingValue`s.
+            compute (function): Function computing the list of values of a
+                list of keys.
+        """
+        keys = list(claimed)
+        try:
+            values = compute(keys)
+        except BaseException:
+            with self._lock:
+                for key, pending in claimed.iteritems():
+                    del self._pending[key]
+                    pending.failed = True
+                    pending.done.set()
+            raise
+
+        with self._lock:
+            expiry = None if self.ttl is None else self._clock() + self.ttl
+            for key, value in zip(keys, values):
+                self._entries[key] = (value, expiry)
+                del self._pending[key]
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        for key, value in zip(keys, values):
+            claimed[key].value = value
+            claimed[key].done.set()
@@ -0,0 +1,261 @@
+"""
+Checkpoints and plots written on a background thread, a retention policy for
+the checkpoints of a training run, and the manifest of its best checkpoint.
+"""
+
+import glob
+import json
+import logging
+import os
+import Queue
+import threading
+
+import tensorflow as tf
+
+from parser.constants import BEST_CHECKPOINT_MANIFEST
+
+_END = object()
+"""object: Marks the end of the tasks in the queue of the writer thread."""
+
+MAX_PENDING_TASKS = 4
+"""int: Maximum number of tasks waiting for the writer thread. Submitting more
+blocks the training thread until the writer catches up, which bounds the
+memory held by snapshots of the variables."""
+
+
+def best_epoch(scores):
+    """Returns the epoch with the lowest score. Ties are broken in favour of
+    the earlier epoch.
+
+    Args:
+        scores (dict): Maps epochs to scores.
+
+    Returns:
+        int: The best epoch.
+    """
+    return min(scores, key=lambda e: (scores[e], e))
+
+
+def retained_epochs(scores, keep_best=None, keep_last=None):
+    """Selects the checkpoints to be kept.
+
+    A checkpoint is kept if it is one of the `keep_best` checkpoints with the
+    lowest score, or one of the `keep_last` most recent ones. Ties in score are
+    broken in favour of the earlier epoch.
+
+    Args:
+        scores (dict): Maps the epoch of each checkpoint to the validation
+            score of the model at that epoch, such as its validation error.
+            Lower is better.
+        keep_best (int, optional): Number of checkpoints with the lowest
+            score to be kept. Defaults to `None`, i.e., all.
+        keep_last (int, optional): Number of most recent checkpoints to be
+            kept. Defaults to `None`, i.e., all.
+
+    Returns:
+        `list` of `int`: Sorted epochs of the checkpoints to be kept.
+    """
+    epochs = sorted(scores)
+    if keep_best is None or keep_last is None:
+        return epochs
+    best = sorted(epochs, key=lambda e: (scores[e], e))[:keep_best]
+    last = epochs[len(epochs) - keep_last:] if keep_last > 0 else []
+    return sorted(set(best) | set(last))
+
+
+class Checkpointer(object):
+    """Writes checkpoints of a model's variables, and runs other tasks such as
+    plotting, on a background thread.
+
+    The variables are copied out of the training session on the calling
+    thread, which is fast, and the copy is written by the writer thread into a
+    graph and session of its own, so that training proceeds while the
+    checkpoint is on its way to disk. The checkpoints are compatible with a
+    `tf.train.Saver` built over the same un-scoped variable names.
+
+    After each checkpoint is written, the checkpoints that the retention
+    policy (see `retained_epochs`) does not keep are deleted, and the manifest
+    `BEST_CHECKPOINT_MANIFEST`, next to the checkpoints, is updated to record
+    the checkpoint with the lowest score. The best checkpoint is always kept
+    as long as `keep_best` is not 0.
+
+    Errors raised on the writer thread are logged, and re-raised on the
+    calling thread by the next call to `save`, `submit`, or `close`.
+
+    Args:
+        session (`tf.Session`): Session holding the values of `variables`.
+        variables (dict): Maps un-scoped names to the `tf.Variable`s to be
+            checkpointed.
+        path_prefix (str): Prefix of the checkpoint files, such as
+            "experiment/model-checkpoints/model". The epoch is appended to it.
+        keep_best (int, optional): Same as in `retained_epochs`. Defaults to
+            `None`.
+        keep_last (int, optional): Same as in `retained_epochs`. Defaults to
+            `None`.
+        scores (dict, optional): Maps the epochs of the checkpoints written
+            before training was resumed to their scores, so that the
+            retention policy and the manifest take them into account.
+            Defaults to `None`, i.e., no earlier checkpoints.
+    """
+
+    def __init__(self, session, variables, path_prefix, keep_best=None,
+                 keep_last=None, scores=None):
+        self._session = session
+        self._names = sorted(variables)
+        self._variables = [variables[name] for name in self._names]
+        self._path_prefix = path_prefix
+        self._keep_best = keep_best
+        self._keep_last = keep_last
+
+        self._scores = {}
+        """dict: Maps the epoch of each checkpoint on disk to the validation
+        score of the model at that epoch. Only used by the writer thread."""
+        self._best = None
+        """(int, float): Epoch and score of the best checkpoint so far. Only
+        used by the writer thread."""
+        if scores:
+            epoch = best_epoch(scores)
+            self._best = epoch, scores[epoch]
+            self._scores = {e: scores[e] for e in
+                            retained_epochs(scores, keep_best, keep_last)}
+        self._error = None
+        """Exception: First error raised on the writer thread, if any."""
+
+        self._graph = tf.Graph()
+        """`tf.Graph`: Graph holding a copy of the checkpointed variables,
+        which are assigned the snapshots before being saved."""
+        with self._graph.as_default():
+            self._placeholders = []
+            assigns = []
+            copies = {}
+            for name, var in zip(self._names, self._variables):
+                dtype = var.dtype.base_dtype
+                placeholder = tf.placeholder(dtype, var.get_shape())
+                copy = tf.Variable(tf.zeros(var.get_shape(), dtype),
+                                   name=name, trainable=False)
+                self._placeholders.append(placeholder)
+                assigns.append(tf.assign(copy, placeholder))
+                copies[name] = copy
+            self._assign = tf.group(*assigns)
+            self._saver = tf.train.Saver(var_list=copies, max_to_keep=None)
+        self._writer_session = tf.Session(graph=self._graph)
+
+        self._queue = Queue.Queue(maxsize=MAX_PENDING_TASKS)
+        # The thread is a daemon, so that it cannot keep the process alive if
+        # training fails before `close` is called.
+        self._writer = threading.Thread(target=self._run,
+                                        name="checkpoint-writer")
+        self._writer.daemon = True
+        self._writer.start()
+
+    def save(self, epoch, score, metrics=None):
+        """Snapshots the variables and schedules writing them as the
+        checkpoint of `epoch`.
+
+        Args:
+            epoch (int): Epoch number, used to name the checkpoint file.
+            score (float): Validation score of the model, such as its
+                validation error, used by the retention policy and to track
+                the best checkpoint. Lower is better.
+            metrics (dict, optional): Other metrics of the model, recorded in
+                the manifest if the checkpoint is the best one. Defaults to
+                `None`.
+        """
+        values = self._session.run(self._variables)
+        self.submit(self._write, epoch, score, metrics or {}, values)
+
+    def submit(self, fn, *args):
+        """Schedules `fn(*args)` to be run on the writer thread, after the
+        tasks submitted before it.
+
+        Args:
+            fn (callable): Task to be run. The arguments must not be modified
+                by the caller afterwards.
+            *args: Arguments of `fn`.
+        """
+        self._raise_error()
+        self._queue.put((fn, args))
+
+    def wait(self):
+        """Waits for the scheduled tasks to complete."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Waits for the scheduled tasks to complete, and stops the writer
+        thread.
+        """
+        self._queue.put(_END)
+        self._writer.join()
+        self._writer_session.close()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is _END:
+                self._queue.task_done()
+                return
+            # Skip the remaining tasks once a task has failed.
+            if self._error is None:
+                fn, args = task
+                try:
+                    fn(*args)
+                except Exception as e:
+                    logging.exception("Task %s failed on the writer thread.",
+                                      getattr(fn, '__name__', fn))
+                    self._error = e
+            self._queue.task_done()
+
+    def _write(self, epoch, score, metrics, values):
+        self._writer_session.run(self._assign,
+                                 dict(zip(self._placeholders, values)))
+        # The meta graph would describe the copy graph rather than the
+        # network, so it is not written.
+        self._saver.save(self._writer_session, self._path_prefix,
+                         global_step=epoch, write_meta_graph=False,
+                         write_state=False)
+        logging.info("Epoch = %s. Checkpoint dumped.", epoch)
+
+        if self._best is None or score < self._best[1]:
+            self._best = epoch, score
+            self._write_manifest(epoch, score, metrics)
+        self._scores[epoch] = score
+        kept = retained_epochs(self._scores, self._keep_best, self._keep_last)
+        for e in sorted(set(self._scores) - set(kept)):
+            self._delete(e)
+            del self._scores[e]
+        if kept:
+            tf.train.update_checkpoint_state(
+                os.path.dirname(self._path_prefix),
+                self._checkpoint_path(kept[-1]),
+                [self._checkpoint_path(e) for e in kept])
+
+    def _write_manifest(self, epoch, score, metrics):
+        manifest = dict(metrics)
+        manifest.update(epoch=epoch, score=score,
+                        checkpoint=os.path.basename(
+                            self._checkpoint_path(epoch)))
+        path = os.path.join(os.path.dirname(self._path_prefix),
+                            BEST_CHECKPOINT_MANIFEST)
+        # The manifest is replaced atomically, so that readers never see a
+        # partially written one.
+        with open(path + ".tmp", 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.rename(path + ".tmp", path)
+        logging.info("Epoch = %s. Best checkpoint so far, recorded in %s.",
+                     epoch, path)
+
+    def _checkpoint_path(self, epoch):
+        return "{}-{}".format(self._path_prefix, epoch)
+
+    def _delete(self, epoch):
+        path = self._checkpoint_path(epoch)
+        for filename in glob.glob(path) + glob.glob(path + ".*"):
+            os.remove(filename)
+        logging.info("Epoch = %s. Checkpoint deleted by retention policy.",
+                     epoch)
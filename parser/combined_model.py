@@ -5,11 +5,15 @@ import tensorflow as tf
 from parser.action_channel_model import ActionChannelModel
 from parser.action_function_model import ActionFunctionModel
 from parser import configs
-from parser.constants import RNN_EXPT_DIRECTORY
+from parser.artifact import ModelArtifact
+from parser.constants import ARTIFACT_FILE, EnsembleMode, RNN_EXPT_DIRECTORY
 from parser.ensembled_model import EnsembledModel
+from parser.fused_ensembled_model import FusedEnsembledModel
+from parser.numpy_model import NumpyModel
 import parser.argument_parser as model_arg_parser
 from parser.trigger_function_model import TriggerFunctionModel
 from parser.trigger_channel_model import TriggerChannelModel
+from parser import utils
 
 
 class CombinedModel(object):
@@ -27,6 +31,8 @@ class CombinedModel(object):
             `ActionFunctionModel` is to be included in the cocktail of models.
         use_trigger_fn_model (bool): Set to `True` if the trained
             `TriggerFunctionModel` is to be included in the cocktail of models.
+        ensemble_mode (EnsembleMode): The way the models of each ensemble are
+            run.
     """
     # Ensemble using gold for test.
     _t_channel_arg_str = "--log-level INFO --model TriggerChannelModel --experiment-name trigger-channel-1/trigger-channel-1-0 trigger-channel-1/trigger-channel-1-6 trigger-channel-1/trigger-channel-1-7 trigger-channel-1/trigger-channel-1-4 trigger-channel-1/trigger-channel-1-1 trigger-channel-1/trigger-channel-1-3 trigger-channel-1/trigger-channel-1-8 trigger-channel-1/trigger-channel-1-5 trigger-channel-1/trigger-channel-1-9 trigger-channel-1/trigger-channel-1-2 --use-names-descriptions --use-gold --saved-model-path ./experiments/rnn/trigger-channel-1/trigger-channel-1-0/model-18 ./experiments/rnn/trigger-channel-1/trigger-channel-1-6/model-21 ./experiments/rnn/trigger-channel-1/trigger-channel-1-7/model-14 ./experiments/rnn/trigger-channel-1/trigger-channel-1-4/model-23 ./experiments/rnn/trigger-channel-1/trigger-channel-1-1/model-19 ./experiments/rnn/trigger-channel-1/trigger-channel-1-3/model-16 ./experiments/rnn/trigger-channel-1/trigger-channel-1-8/model-14 ./experiments/rnn/trigger-channel-1/trigger-channel-1-5/model-24 ./experiments/rnn/trigger-channel-1/trigger-channel-1-9/model-14 ./experiments/rnn/trigger-channel-1/trigger-channel-1-2/model-18"
@@ -86,7 +92,8 @@ class CombinedModel(object):
 
     def __init__(self, use_trigger_channel_model=True,
                  use_action_channel_model=True, use_trigger_fn_model=True,
-                 use_action_fn_model=True):
+                 use_action_fn_model=True,
+                 ensemble_mode=EnsembleMode.separate):
         """Sets which types of models to include in the cocktail of models to be
         used together.
 
@@ -103,11 +110,14 @@ class CombinedModel(object):
             use_action_fn_model (bool): Add an ensemble of
                 `ActionFunctionModel` models to the cocktail of models if
                 `True`. Defaults to `True`.:
+            ensemble_mode (EnsembleMode): The way the models of each ensemble
+                are run. Defaults to `EnsembleMode.separate`.
         """
         self.use_trigger_channel_model = use_trigger_channel_model
         self.use_action_channel_model = use_action_channel_model
         self.use_trigger_fn_model = use_trigger_fn_model
         self.use_action_fn_model = use_action_fn_model
+        self.ensemble_mode = ensemble_mode
 
     def test_models(self):
         """Evaluates the trained models on a common set of test examples.
@@ -120,7 +130,17 @@ class CombinedModel(object):
         `TriggerChannelModel` and `ActionChannelModel` on the common set of test
         examples, so as to determine their combined performance, such as the
         total error in predicting recipes' channels.
+
+        Raises:
+            ValueError: If `self.ensemble_mode` is `EnsembleMode.numpy`, since
+                the artifacts the models are then loaded from carry no test
+                set.
         """
+        if self.ensemble_mode is EnsembleMode.numpy:
+            logging.error("%s: Models run from an artifact carry no test set. "
+                          "Use the separate or fused ensemble mode.",
+                          self.test_models.__name__)
+            raise ValueError
         args, model_classes = [], []
         if self.use_trigger_channel_model:
             args.append(self.t_channel_args)
@@ -137,7 +157,8 @@ class CombinedModel(object):
 
         ensembles = []
         for arg, model_class in zip(args, model_classes):
-            ensembles.append(self.create_ensemble(arg, model_class))
+            ensembles.append(self.create_ensemble(arg, model_class,
+                                                  self.ensemble_mode))
 
         n = len(ensembles[0].test_data()[0])
         mistakes = np.array([False] * n)
@@ -151,49 +172,132 @@ class CombinedModel(object):
         logging.info("Combined Error = %s", error)
 
     @staticmethod
-    def create_ensemble(args, model_class):
+    def create_ensemble(args, model_class, mode=EnsembleMode.separate,
+                        pool=None, cache=None):
         """Creates an ensemble of models defined by the `model_class` and passed
         command-line arguments `args`.
 
         The command-line arguments are used to create and restore desired models
-        and subset of the test set.
+        and subset of the test set. Without `--saved-model-path`, each model is
+        restored from the best checkpoint of its experiment. With
+        `--use-snapshots`, every snapshot of each experiment is a model of the
+        ensemble (see `utils.ensemble_members`).
 
         Args:
             args (Namespace): Namespace containing parsed arguments.
             model_class (:obj:`Model`): One of the child classes of the `Model`
                 class.
+            mode (EnsembleMode, optional): The way the models of the ensemble
+                are run. With `EnsembleMode.separate`, each model gets its own
+                graph and session. With `EnsembleMode.fused`, all models are
+                loaded in a single graph and their averaged prediction is
+                computed with one `session.run`. With `EnsembleMode.numpy`, the
+                models are loaded from the ensemble's artifact (see
+                `artifact_path`) and run without Tensorflow; no test data is
+                loaded then. Defaults to `EnsembleMode.separate`.
+            pool (`multiprocessing.pool.ThreadPool`, optional): Pool of threads
+                onto which the models are dispatched with
+                `EnsembleMode.separate` or `EnsembleMode.numpy`. Ignored with
+                `EnsembleMode.fused`. Defaults to `None`, in which case the
+                models are run one after another.
+            cache (`cache.LRUCache`, optional): Cache of the averaged
+                predictions of the ensemble (see `EnsembledModel`). Defaults to
+                `None`, in which case predictions are not cached.
 
         Returns:
             EnsembledModel: An ensembled model.
         """
-        assert (len(args.experiment_name) == len(args.saved_model_path))
         config = configs.PaperConfiguration
         CombinedModel._log_configurations(config)
 
-        num_models = len(args.experiment_name)
-        models = []
-        for i in xrange(num_models):
+        if mode is EnsembleMode.separate:
+            members = utils.ensemble_members(args)
+            ensemble = EnsembledModel(pool, cache)
+            for i, (experiment_name, path) in enumerate(members):
+                with tf.Graph().as_default() as graph:
+                    model = CombinedModel._load_model(args, model_class,
+                                                      config, i,
+                                                      experiment_name)
+                    model.initialize_network(init_variables=False, graph=graph)
+                    model.restore(path)
+                    ensemble.add_model(model)
+        elif mode is EnsembleMode.fused:
+            members = utils.ensemble_members(args)
             with tf.Graph().as_default() as graph:
-                logging.info("Model number %s", i)
-                expt_path = RNN_EXPT_DIRECTORY + args.experiment_name[i] + "/"
-                model = model_class(config, expt_path, stem=True)
-                model.load_labels_and_vocab()
-                model.load_test_dataset(
-                    external_csv_file=args.external_test_csv,
-                    use_full_test_set=args.use_full_test_set,
-                    use_english=args.use_english,
-                    use_english_intelligible=args.use_english_intelligible,
-                    use_gold=args.use_gold,
-                    use_names_descriptions=args.use_names_descriptions)
-                model.initialize_network(init_variables=False, graph=graph)
-                model.restore(args.saved_model_path[i])
-                models.append(model)
-
-        ensemble = EnsembledModel()
-        for model in models:
-            ensemble.add_model(model)
+                session = tf.Session(graph=graph)
+                ensemble = FusedEnsembledModel(session, cache)
+                for i, (experiment_name, path) in enumerate(members):
+                    model = CombinedModel._load_model(args, model_class,
+                                                      config, i,
+                                                      experiment_name)
+                    model.initialize_network(
+                        init_variables=False, graph=graph, session=session,
+                        scope="member_{}".format(i))
+                    model.restore(path)
+                    ensemble.add_model(model)
+        elif mode is EnsembleMode.numpy:
+            artifact = ModelArtifact(CombinedModel.artifact_path(args))
+            config = artifact.configuration()
+            ensemble = EnsembledModel(pool, cache)
+            for i in xrange(artifact.num_members):
+                model = NumpyModel(config)
+                model.load(artifact, i)
+                ensemble.add_model(model)
+        else:
+            logging.error("Illegal ensemble mode: %s", mode)
+            raise TypeError
         return ensemble
 
+    @staticmethod
+    def artifact_path(args):
+        """Returns the path of the artifact packaging the ensemble defined by
+        the command-line arguments `args`.
+
+        The artifact lives in the directory containing the experiment of the
+        first model, which is shared by all models of the ensemble.
+
+        Args:
+            args (Namespace): Namespace containing parsed arguments.
+
+        Returns:
+            str: Path of the artifact.
+        """
+        ensemble_directory = args.experiment_name[0].split("/")[0]
+        return RNN_EXPT_DIRECTORY + ensemble_directory + "/" + ARTIFACT_FILE
+
+    @staticmethod
+    def _load_model(args, model_class, config, i, experiment_name):
+        """Creates the `i`-th model of an ensemble defined by `model_class`
+        and `args`, and loads its labels, vocabulary, and test data.
+
+        The network of the model is not created.
+
+        Args:
+            args (Namespace): Namespace containing parsed arguments.
+            model_class (:obj:`Model`): One of the child classes of the `Model`
+                class.
+            config: A configuration class, similar to
+                `configs.PaperConfigurations`.
+            i (int): Index of the model in the ensemble.
+            experiment_name (str): Name of the experiment the model was
+                trained in.
+
+        Returns:
+            Model: The created model.
+        """
+        logging.info("Model number %s", i)
+        expt_path = RNN_EXPT_DIRECTORY + experiment_name + "/"
+        model = model_class(config, expt_path, stem=True)
+        model.load_labels_and_vocab()
+        model.load_test_dataset(
+            external_csv_file=args.external_test_csv,
+            use_full_test_set=args.use_full_test_set,
+            use_english=args.use_english,
+            use_english_intelligible=args.use_english_intelligible,
+            use_gold=args.use_gold,
+            use_names_descriptions=args.use_names_descriptions)
+        return model
+
     def _log_args(self, args):
         """Logs command-line arguments."""
         logging.basicConfig(level=getattr(logging, args.log_level.upper()),
@@ -0,0 +1,141 @@
+"""
+Compare a snapshot ensemble, made of the snapshots of a single training run
+with a cyclic learning rate, with an ensemble of independently trained models.
+
+Both ensembles are evaluated on the same subset of the test set. For each, the
+test error, the number of members, and the total CPU-hours spent training its
+experiments are reported.
+"""
+
+import copy
+import logging
+
+import numpy as np
+
+from parser.action_channel_model import ActionChannelModel
+from parser.action_function_model import ActionFunctionModel
+from parser.argument_parser import ensemble_comparison_arguments_parser
+from parser.combined_model import CombinedModel
+from parser.trigger_function_model import TriggerFunctionModel
+from parser.trigger_channel_model import TriggerChannelModel
+from parser import utils
+
+
+def parse_args():
+    """Parses and logs command-line arguments.
+
+    Returns:
+        Namespace: Namespace containing parsed arguments.
+    """
+    args = ensemble_comparison_arguments_parser().parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format='%(levelname)s: %(asctime)s: %(message)s')
+    logging.info("Log Level: %s", args.log_level)
+    logging.info("Independent Experiment Names: %s", args.experiment_name)
+    logging.info("Snapshot Experiment Name: %s", args.snapshot_experiment_name)
+    logging.info("Model: %s", args.model[0])
+    logging.info("Saved Model Path: %s", args.saved_model_path)
+    logging.info("Use Full Test Set: %s", args.use_full_test_set)
+    logging.info("Use English Subset: %s", args.use_english)
+    logging.info("Use English and Intelligible Subset: %s",
+                 args.use_english_intelligible)
+    logging.info("Use Gold Subset: %s", args.use_gold)
+    logging.info("External CSV File: %s", args.external_test_csv)
+    logging.info("Use Names and Descriptions: %s", args.use_names_descriptions)
+
+    return args
+
+
+def training_cpu_hours(experiment_names):
+    """Returns the total CPU-hours spent training the experiments.
+
+    Args:
+        experiment_names (`list` of `str`): Names of the experiments.
+
+    Returns:
+        float: The CPU-hours, or `None` if the cost of an experiment was not
+        recorded.
+    """
+    try:
+        return sum(utils.training_cpu_hours(name) for name in experiment_names)
+    except (IOError, ValueError, KeyError):
+        return None
+
+
+def evaluate_ensemble(description, args, model_class):
+    """Evaluates an ensemble on the test set, and logs its error and cost.
+
+    Args:
+        description (str): Description of the ensemble, used in the logs.
+        args (Namespace): Command-line arguments defining the ensemble, as
+            accepted by `CombinedModel.create_ensemble`.
+        model_class (:obj:`Model`): One of the child classes of the `Model`
+            class.
+
+    Returns:
+        (int, float, float): The number of members, the test error, and the
+        training CPU-hours of the ensemble.
+    """
+    num_members = len(utils.ensemble_members(args))
+    ensemble = CombinedModel.create_ensemble(args, model_class)
+    inputs, labels, seq_lens = ensemble.test_data()
+    error = np.mean(ensemble.prediction_mistakes(inputs, labels, seq_lens))
+    cpu_hours = training_cpu_hours(args.experiment_name)
+    logging.info("%s ensemble: Members = %s, Test Error = %s, Training "
+                 "CPU-Hours = %s", description, num_members, error,
+                 "unknown" if cpu_hours is None else "%.2f" % cpu_hours)
+    return num_members, error, cpu_hours
+
+
+def compare_ensembles(args, model_class):
+    """Compares the snapshot ensemble of `args.snapshot_experiment_name` with
+    the ensemble of the independently trained `args.experiment_name`.
+
+    Args:
+        args (Namespace): Namespace containing parsed arguments.
+        model_class (:obj:`Model`): One of the child classes of the `Model`
+            class.
+    """
+    independent_args = copy.copy(args)
+    independent_args.use_snapshots = False
+    snapshot_args = copy.copy(args)
+    snapshot_args.experiment_name = args.snapshot_experiment_name
+    snapshot_args.saved_model_path = None
+    snapshot_args.use_snapshots = True
+
+    _, independent_error, independent_hours = evaluate_ensemble(
+        "Independent", independent_args, model_class)
+    _, snapshot_error, snapshot_hours = evaluate_ensemble(
+        "Snapshot", snapshot_args, model_class)
+
+    logging.info("Test Error of the snapshot ensemble minus that of the "
+                 "independent ensemble = %s",
+                 snapshot_error - independent_error)
+    if independent_hours and snapshot_hours is not None:
+        logging.info("Training CPU-Hours of the snapshot ensemble relative to "
+                     "the independent ensemble = %.3f",
+                     snapshot_hours / independent_hours)
+
+
+def main():
+    args = parse_args()
+    utils.verify_experiment_directory(args.snapshot_experiment_name[0])
+
+    if args.model[0] == "TriggerFunctionModel":
+        model_class = TriggerFunctionModel
+    elif args.model[0] == "ActionFunctionModel":
+        model_class = ActionFunctionModel
+    elif args.model[0] == "TriggerChannelModel":
+        model_class = TriggerChannelModel
+    elif args.model[0] == "ActionChannelModel":
+        model_class = ActionChannelModel
+    else:
+        logging.error("Illegal model class %s", args.model[0])
+        return
+
+    compare_ensembles(args, model_class)
+
+
+if __name__ == '__main__':
+    main()
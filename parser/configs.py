@@ -1,4 +1,5 @@
 from parser.constants import NUM_SPECIAL_TOKENS
+from parser.learning_rates import scaled_learning_rate
 
 
 class PaperConfiguration(object):
@@ -19,3 +20,78 @@ class PaperConfiguration(object):
     num_tokens_right = 13  # Number of tokens to be used from the right.
 
     num_epochs = 50
+
+    # Number of epochs over which the learning rate is increased linearly to
+    # `learning_rate` at the beginning of training. 0 disables the warmup.
+    warmup_epochs = 0
+    # Decay of the learning rate after the warmup, among "constant",
+    # "exponential", "linear" and "cosine" (see
+    # `learning_rates.scheduled_learning_rate`).
+    learning_rate_decay = "constant"
+    # Factor of the learning rate per epoch, with the "exponential" decay.
+    learning_rate_decay_rate = 0.95
+
+    # Number of mini-batches prepared on a background thread ahead of the
+    # training step. 0 prepares them on the training thread.
+    num_prefetched_batches = 2
+    # Train on the last, smaller mini-batch of each epoch too.
+    keep_partial_batch = False
+    # Number of mini-batches whose examples are sorted by length together, so
+    # that each mini-batch holds descriptions of similar lengths and is
+    # trimmed to the longest of them. 0 disables bucketing.
+    bucket_window = 20
+    # Maximum number of examples fed at once when evaluating a dataset.
+    eval_chunk_size = 1000
+    # Metric, "loss" or "error" on the validation set, whose lowest value
+    # marks the best epoch of training.
+    early_stopping_metric = "loss"
+    # Number of evaluations without improvement of `early_stopping_metric`
+    # after which training stops. `None` always trains for `num_epochs`.
+    early_stopping_patience = 5
+    # Checkpoints kept during training: those of the epochs with the lowest
+    # `early_stopping_metric`, and the most recent ones. The others are
+    # deleted. `None` for either keeps every checkpoint.
+    checkpoints_keep_best = 3
+    checkpoints_keep_last = 2
+
+
+def derived_configuration(config, **overrides):
+    """Returns a configuration derived from `config`, with some of its values
+    overridden.
+
+    Args:
+        config: A configuration class, similar to `PaperConfiguration`.
+        **overrides: Values overriding those of `config`, by name.
+
+    Returns:
+        A configuration class, derived from `config`.
+    """
+    if not overrides:
+        return config
+    return type(config.__name__, (config,), overrides)
+
+
+def large_batch_configuration(config, batch_size, scaling="sqrt"):
+    """Returns a configuration for training with larger minibatches than
+    `config`.
+
+    Larger minibatches make each training step a few large operations, which
+    use more of the cores of a CPU, and leave more examples per step to
+    split among gradient workers. The learning rate of `config` is scaled to
+    the new batch size (see `learning_rates.scaled_learning_rate`). A warmup
+    of the learning rate usually helps the first epochs of training then.
+
+    Args:
+        config: A configuration class, similar to `PaperConfiguration`.
+        batch_size (int): Size of the minibatches.
+        scaling (str, optional): Rule by which the learning rate is scaled,
+            among "linear", "sqrt", and "none". Defaults to "sqrt", which
+            suits Adam.
+
+    Returns:
+        A configuration class, derived from `config`.
+    """
+    return derived_configuration(
+        config, batch_size=batch_size,
+        learning_rate=scaled_learning_rate(config.learning_rate, batch_size,
+                                           config.batch_size, scaling))
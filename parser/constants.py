@@ -6,6 +6,9 @@ NULL = "NULL"  # The special token used to pad inputs.
 
 NUM_SPECIAL_TOKENS = 2
 
+# Maximum number of tokens whose stems are cached.
+STEM_CACHE_SIZE = 200000
+
 # Number of epochs after which a model is evaluated on validation set.
 EVALUATION_FREQ = 1
 
@@ -29,9 +32,32 @@ TRIGGER_CHANNEL_LABELS_PATH = DATA_ROOT + "label-maps/trigger-channels.csv"
 # Csv file containing mapping from Action Channels to ids.
 ACTION_CHANNEL_LABELS_PATH = DATA_ROOT + "label-maps/action-channels.csv"
 
-STOP_FILE = "./stop"  # File from which "stop" can be read for early stopping.
 RNN_EXPT_DIRECTORY = "./experiments/rnn/"  # Experiments directory.
 VOCAB_FILE = "vocab.pickle"  # Name of pickle file where vocab is dumped.
+# Directory of the on-disk cache of pre-processed datasets.
+PREPROCESSED_CACHE_DIRECTORY = "./experiments/preprocessed-cache/"
+# Maximum number of bytes of the on-disk cache of pre-processed datasets. The
+# least recently used entries are deleted beyond it.
+PREPROCESSED_CACHE_MAX_BYTES = 1 << 30
+# Name of the artifact packaging an ensemble, in the ensemble's directory.
+ARTIFACT_FILE = "ensemble.artifact"
+# Directory of the checkpoints of a model, in the model's experiment directory.
+CHECKPOINTS_DIRECTORY = "model-checkpoints/"
+# Name of the manifest recording the best checkpoint of a training run, in the
+# checkpoints directory.
+BEST_CHECKPOINT_MANIFEST = "best-checkpoint.json"
+# Directory of the snapshots saved at the end of each cycle of a cyclic learning
+# rate, in the model's experiment directory.
+SNAPSHOTS_DIRECTORY = "model-snapshots/"
+# Name of the file recording the cost of training a model, in the model's
+# experiment directory.
+TRAINING_SUMMARY = "training-summary.json"
+# Directory of the full-state checkpoints of a training run, from which it can
+# be resumed, in the model's experiment directory.
+TRAINING_STATE_DIRECTORY = "training-state/"
+# Name of the pickle dump of the state of the training loop, in the full-state
+# checkpoints directory.
+TRAINING_STATE_FILE = "training-state.pickle"
 
 
 class TurkLabels:
@@ -49,4 +75,16 @@ class TurkLabels:
 class TrainVariables(Enum):
     all = "all"
     non_attention = "non_attention"
-    attention = "attention"
\ No newline at end of file
+    attention = "attention"
+
+
+class EnsembleMode(Enum):
+    """Different ways of running the models constituting an ensemble."""
+    # Each model has its own graph and session, and is run separately.
+    separate = "separate"
+    # All models live in a single graph and session, and their averaged
+    # prediction is computed with a single `session.run`.
+    fused = "fused"
+    # Each model is run in NumPy from the ensemble's artifact, without
+    # TensorFlow.
+    numpy = "numpy"
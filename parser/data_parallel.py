@@ -0,0 +1,161 @@
+"""
+Synchronous data-parallel training on the local machine.
+
+Each minibatch is split into shards. The training process, or chief, computes
+the gradients of the first shard, while worker processes forked from it
+compute those of the others. The workers read the current values of the
+variables from, and write their gradients into, shared memory, so that only
+the shards themselves are sent to them. The chief averages the gradients,
+weighted by the sizes of the shards, which gives exactly the gradients of the
+whole minibatch, and applies them with the network's own optimizer. Training
+thus converges as it does in a single process.
+"""
+
+import ctypes
+import logging
+import multiprocessing
+
+import numpy as np
+import tensorflow as tf
+
+
+class GradientWorkers(object):
+    """Worker processes computing the gradients of a network on shards of
+    minibatches.
+
+    The workers are forked when the instance is created. They inherit the
+    graph of the network, but hold no variables: the values of the variables
+    are fed in place of the variables' reads. The instance must be created
+    after the network is constructed, and before any session is launched in
+    the process.
+
+    Args:
+        network (`rnn.LatentAttentionNetwork`): Network whose gradients are
+            computed.
+        variables (`list` of `tf.Variable`): Variables of the network, i.e.,
+            all those read by `network.gradients`.
+        num_workers (int): Number of worker processes.
+        num_threads (int, optional): Number of threads that the session of
+            each worker may use. Defaults to `None`, in which case
+            `Tensorflow` picks them.
+    """
+
+    def __init__(self, network, variables, num_workers, num_threads=None):
+        self._network = network
+        self._variables = variables
+        self._parameters = [self._shared_array(var) for var in variables]
+        """`list` of `numpy.ndarray`: Values of `variables`, in shared
+        memory."""
+        self._gradients = [
+            [self._shared_array(var) for var in network.optimized_variables]
+            for _ in xrange(num_workers)]
+        """`list` of `list` of `numpy.ndarray`: Gradients computed by each
+        worker, in shared memory."""
+
+        self._connections = []
+        self._processes = []
+        for index in xrange(num_workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=self._work, name="gradient-worker-{}".format(index),
+                args=(index, worker_connection, num_threads))
+            # The workers are daemons, so that they cannot keep the process
+            # alive if training fails before `close` is called.
+            process.daemon = True
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        logging.info("Started %s gradient workers.", num_workers)
+
+    @property
+    def num_shards(self):
+        """int: Maximum number of shards of a minibatch, i.e., one for the
+        chief and one for each worker."""
+        return len(self._processes) + 1
+
+    def gradients(self, session, feed_dicts, weights):
+        """Computes the weighted sum of the gradients of the network on
+        several shards of a minibatch.
+
+        Args:
+            session (`tf.Session`): Session of the chief, holding the current
+                values of the variables.
+            feed_dicts (`list` of dict): Feed-dictionaries of the shards, at
+                most `self.num_shards`. The first is computed by the chief.
+            weights (`list` of float): Weight of the gradients of each shard,
+                such as its share of the examples of the minibatch.
+
+        Returns:
+            `list` of `numpy.ndarray`: Weighted sum of the gradients, in the
+            order of `network.gradients`.
+        """
+        for parameter, value in zip(self._parameters,
+                                    session.run(self._variables)):
+            parameter[...] = value
+        # The feed-dictionaries are sent with the names of the tensors, which
+        # are the same in the graphs of the workers.
+        for connection, feed_dict in zip(self._connections, feed_dicts[1:]):
+            connection.send({tensor.name: value
+                             for tensor, value in feed_dict.iteritems()})
+
+        gradients = [weights[0] * gradient for gradient in session.run(
+            self._network.gradients, feed_dicts[0])]
+        for index, weight in enumerate(weights[1:]):
+            error = self._connections[index].recv()
+            if error is not None:
+                raise error
+            for gradient, worker_gradient in zip(gradients,
+                                                 self._gradients[index]):
+                gradient += weight * worker_gradient
+        return gradients
+
+    def close(self):
+        """Stops the worker processes."""
+        for connection in self._connections:
+            connection.send(None)
+        for process in self._processes:
+            process.join()
+        logging.info("Stopped %s gradient workers.", len(self._processes))
+
+    @staticmethod
+    def _shared_array(var):
+        """Returns a zero array in shared memory, of the shape of `var`."""
+        shape = var.get_shape().as_list()
+        if var.dtype.base_dtype != tf.float32:
+            logging.error("Illegal type of variable %s: %s", var.name,
+                          var.dtype)
+            raise TypeError
+        buf = multiprocessing.RawArray(ctypes.c_float,
+                                       int(np.prod(shape, dtype=np.int64)))
+        return np.frombuffer(buf, dtype=np.float32).reshape(shape)
+
+    def _work(self, index, connection, num_threads):
+        """Computes gradients on the shards received through `connection`,
+        until `None` is received. Runs in worker process `index`."""
+        session_config = None
+        if num_threads is not None:
+            session_config = tf.ConfigProto(
+                intra_op_parallelism_threads=num_threads,
+                inter_op_parallelism_threads=num_threads)
+        graph = self._network.loss.graph
+        session = tf.Session(graph=graph, config=session_config)
+        parameters_feed = {var.value(): parameter for var, parameter in
+                           zip(self._variables, self._parameters)}
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            try:
+                feed_dict = dict(parameters_feed)
+                for name, value in message.iteritems():
+                    feed_dict[graph.get_tensor_by_name(name)] = value
+                values = session.run(self._network.gradients, feed_dict)
+                for gradient, value in zip(self._gradients[index], values):
+                    gradient[...] = value
+            except Exception as e:
+                logging.exception("Gradient worker %s failed.", index)
+                connection.send(e)
+            else:
+                connection.send(None)
+        session.close()
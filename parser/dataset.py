@@ -5,20 +5,39 @@ This module contains methods needed to load and pre-process dataset or online
 inputs.
 """
 
+import copy
 import csv
+import hashlib
 import logging
 import pickle
 
+import numpy as np
 from nltk.tokenize import TweetTokenizer
 from nltk.stem import SnowballStemmer
 
+from parser.cache import LRUCache
 from parser.configs import PaperConfiguration
-from parser.constants import NULL, NUM_SPECIAL_TOKENS, UNK
+from parser.constants import NULL, NUM_SPECIAL_TOKENS, STEM_CACHE_SIZE, UNK
 from parser.constants import DATA_ROOT, VOCAB_FILE, TurkLabels
+from parser.constants import ACTIONS_PATH, TRIGGERS_PATH
+from parser.constants import ACTION_CHANNEL_LABELS_PATH, ACTION_FN_LABELS_PATH
+from parser.constants import TRIGGER_CHANNEL_LABELS_PATH, TRIGGER_FN_LABELS_PATH
+from parser.constants import PREPROCESSED_CACHE_DIRECTORY
+from parser.constants import PREPROCESSED_CACHE_MAX_BYTES
 from parser.constants import TEST_CSV, TRAIN_CSV, TURK_CSV, VALIDATE_CSV
 from parser.label import Label
+from parser.preprocessed_cache import PreprocessedCache, file_fingerprint
 from parser.synthetic_dataset import SyntheticDataset
 
+stem_cache = LRUCache(STEM_CACHE_SIZE)
+"""`cache.LRUCache`: Maps tokens to their stems. It is shared by all datasets,
+both for loading datasets and for pre-processing online inputs."""
+
+preprocessed_cache = PreprocessedCache(
+    PREPROCESSED_CACHE_DIRECTORY, max_bytes=PREPROCESSED_CACHE_MAX_BYTES)
+"""`preprocessed_cache.PreprocessedCache`: On-disk cache of pre-processed
+train, validation, and test sets. It is shared by all datasets."""
+
 
 class Dataset(object):
     """Exposes methods responsible for loading and preparing the dataset for
@@ -30,14 +49,48 @@ class Dataset(object):
         stem (bool): Set to True if the input descriptions should be stemmed.
         vocabulary (dict): Dictionary mapping tokens in the vocabulary to
             integers.
+        vocabulary_fingerprint (str): Digest of the pickle dump of
+            `vocabulary`, or `None` if the vocabulary is neither loaded nor
+            dumped yet. Datasets with equal fingerprints map tokens to the
+            same ids.
+
+    Args:
+        stem (bool): Set to True if the input descriptions should be stemmed.
+        config: A configuration class, similar to `configs.PaperConfigurations`.
+        path (str, optional): Root directory containing dataset. Defaults to
+            `constants.DATA_ROOT`.
+        stem_cache (`cache.LRUCache`, optional): Cache mapping tokens to their
+            stems. Defaults to the module-level `stem_cache`, shared by all
+            datasets. `None` disables caching.
+        preprocessed_cache (`preprocessed_cache.PreprocessedCache`, optional):
+            On-disk cache of pre-processed datasets, used by the `load_*`
+            methods. Defaults to the module-level `preprocessed_cache`. `None`
+            disables caching.
     """
 
-    def __init__(self, stem, config, path=DATA_ROOT):
+    def __init__(self, stem, config, path=DATA_ROOT, stem_cache=stem_cache,
+                 preprocessed_cache=preprocessed_cache):
         self.stem = stem
         self.path = path
         self.vocabulary = {NULL: 0, UNK: 1}
+        self.vocabulary_fingerprint = None
         self.config = config
 
+        # Since the descriptions are often in telegraphic language, a tokenizer
+        # built for Tweets should work better than one for standard English.
+        # Hopefully, the former subsumes the latter in terms of functionality.
+        self._tokenizer = TweetTokenizer()
+        """`TweetTokenizer`: Tokenizer used for all descriptions."""
+        self._stemmer = SnowballStemmer("english") if self.stem else None
+        """`SnowballStemmer`: Stemmer used for all descriptions, if `stem` is
+        `True`."""
+        self._stem_cache = stem_cache
+        """`cache.LRUCache`: Cache mapping tokens to their stems, or `None` if
+        stems are not cached."""
+        self._preprocessed_cache = preprocessed_cache
+        """`preprocessed_cache.PreprocessedCache`: Cache of pre-processed
+        datasets, or `None` if datasets are not cached."""
+
     def __repr__(self):
         return ("Stem: {}\nPath: {}\nVocabulary: {}"
                 .format(str(self.stem), str(self.path), str(self.vocabulary)))
@@ -45,7 +98,8 @@ class Dataset(object):
     def load_train(self, vocab_path, external_csv_file="", use_train_set=True,
                    use_triggers_api=False, use_actions_api=False,
                    use_synthetic_recipes=False, use_names_descriptions=False,
-                   load_vocab=False):
+                   load_vocab=False, num_synthetic_recipes=0,
+                   synthetic_recipes_seed=0):
         """Loads and pre-processes training data.
 
         Training data can, potentially, be generated from the actual train set,
@@ -66,6 +120,15 @@ class Dataset(object):
             use_synthetic_recipes (bool, optional): Use synthetic recipes
                 generated by combining all possible Triggers and Actions, if
                 set to `True`. Defaults to `False`.
+            num_synthetic_recipes (int, optional): If positive, only this many
+                synthetic recipes, drawn by
+                `SyntheticDataset.sample_synthetic_recipes`, are used instead
+                of all of them, and they are placed at the end of the train
+                set. The vocabulary is still created from the descriptions of
+                all the Trigger and Action Functions. Relevant only if
+                `use_synthetic_recipes` is `True`. Defaults to 0.
+            synthetic_recipes_seed (int, optional): Seed used to draw the
+                synthetic recipes. Defaults to 0.
             use_train_set (bool, optional): Use the train set, if set to `True`.
                 Defaults to `True`.
             use_triggers_api (bool, optional): Use the Triggers API
@@ -82,13 +145,50 @@ class Dataset(object):
                 an empty string, which means no external CSV file will be used.
 
         Returns:
-            `list` of `str`, `list` of `Label`, `list` of `int`: The first
-        entity is the list of descriptions. The second entity is the list
-        of corresponding labels. The third entity is the list of lengths
-        of descriptions before they were padded (with the maximum length
-        being `self.config.sent_len`). The lengths of descriptions which
-        were clipped is reported as `self.config.sent_len`.
+            `numpy.ndarray`, `list` of `Label`, `numpy.ndarray`: The first
+        entity is the `int32` matrix of token ids of the descriptions. The
+        second entity is the list of corresponding labels. The third entity is
+        the `int32` array of lengths of descriptions before they were padded
+        (with the maximum length being `self.config.sent_len`). The lengths of
+        descriptions which were clipped is reported as `self.config.sent_len`.
+        If the dataset is found in the cache of pre-processed datasets, the
+        descriptions and the lengths are read-only and memory-mapped.
         """
+        files = [self.path + TRAIN_CSV] if use_train_set else []
+        if use_triggers_api or use_synthetic_recipes:
+            files += [TRIGGERS_PATH, TRIGGER_CHANNEL_LABELS_PATH,
+                      TRIGGER_FN_LABELS_PATH]
+        if use_actions_api or use_synthetic_recipes:
+            files += [ACTIONS_PATH, ACTION_CHANNEL_LABELS_PATH,
+                      ACTION_FN_LABELS_PATH]
+        if external_csv_file != "":
+            files.append(external_csv_file)
+        key_parts = {
+            "method": "load_train", "use_train_set": use_train_set,
+            "use_triggers_api": use_triggers_api,
+            "use_actions_api": use_actions_api,
+            "use_synthetic_recipes": use_synthetic_recipes,
+            "use_names_descriptions": use_names_descriptions}
+        sample_synthetic_recipes = (use_synthetic_recipes and
+                                    num_synthetic_recipes > 0)
+        if sample_synthetic_recipes:
+            key_parts["num_synthetic_recipes"] = num_synthetic_recipes
+            key_parts["synthetic_recipes_seed"] = synthetic_recipes_seed
+        if load_vocab:
+            files.append(vocab_path)
+        else:
+            key_parts["vocab_size"] = self.config.vocab_size
+        key = self._cache_key(files, key_parts)
+        entry = self._load_cached(key)
+        if entry is not None:
+            inputs, labels, true_desc_lengths, vocabulary_dump = entry
+            if load_vocab:
+                self.load_vocabulary(vocab_path)
+            else:
+                self.load_vocabulary_dump(vocabulary_dump)
+                self.dump_vocabulary(vocab_path)
+            return inputs, labels, true_desc_lengths
+
         descriptions, labels = [], []
 
         if use_train_set:
@@ -106,7 +206,7 @@ class Dataset(object):
             descriptions.extend(d)
             labels.extend(l)
 
-        if use_synthetic_recipes:
+        if use_synthetic_recipes and not sample_synthetic_recipes:
             d, l = SyntheticDataset.dataset_from_synthetic_recipes()
             descriptions.extend(d)
             labels.extend(l)
@@ -116,15 +216,37 @@ class Dataset(object):
             descriptions.extend(d)
             labels.extend(l)
 
-        inputs = self._tokenize_and_stem(descriptions)
+        inputs = vocabulary_inputs = self.tokenize_and_stem(descriptions)
+        if sample_synthetic_recipes:
+            # The vocabulary covers the descriptions of all the Trigger and
+            # Action Functions, and not just those in this sample, since the
+            # samples of later epochs combine the others.
+            trigger_descs, _ = SyntheticDataset.dataset_from_triggers_api()
+            action_descs, _ = SyntheticDataset.dataset_from_actions_api()
+            vocabulary_inputs = inputs + self.tokenize_and_stem(
+                trigger_descs + action_descs)
+            # The sampled recipes go last, so that they can be replaced by a
+            # fresh sample at every epoch.
+            d, l = SyntheticDataset.sample_synthetic_recipes(
+                num_synthetic_recipes, synthetic_recipes_seed)
+            inputs = inputs + self.tokenize_and_stem(d)
+            labels.extend(l)
+
+        if self.stem and self._stem_cache is not None:
+            logging.info("Stem cache: %s", self._stem_cache)
         if load_vocab:
             self.load_vocabulary(vocab_path)
         else:
-            self._create_vocabulary(inputs)
-            self._dump_vocabulary(vocab_path)
-        self.parse_descriptions_with_vocabulary(inputs)
-        true_desc_lengths = self.description_lengths_before_padding(inputs)
-        self.pad_or_clip(inputs)
+            self._create_vocabulary(vocabulary_inputs)
+            self.dump_vocabulary(vocab_path)
+        inputs, true_desc_lengths = self.ids_and_lengths(inputs)
+        if key is not None:
+            vocabulary_dump = None
+            if not load_vocab:
+                with open(vocab_path, 'rb') as f:
+                    vocabulary_dump = f.read()
+            self._preprocessed_cache.save(key, inputs, labels,
+                                          true_desc_lengths, vocabulary_dump)
         return inputs, labels, true_desc_lengths
 
     def load_validate(self, use_names_descriptions=False):
@@ -136,17 +258,30 @@ class Dataset(object):
                 construct descriptions of recipes. Defaults to `False`.
 
         Returns:
-            `list` of `str`, `list` of `Label`, `list` of `int`: The first
-        entity is the list of descriptions. The second entity is the list
-        of corresponding labels. The third entity is the list of lengths
-        of descriptions before they were padded (with the maximum length
-        being `self.config.sent_len`). The lengths of descriptions which
-        were clipped is reported as `self.config.sent_len`.
+            `numpy.ndarray`, `list` of `Label`, `numpy.ndarray`: The first
+        entity is the `int32` matrix of token ids of the descriptions. The
+        second entity is the list of corresponding labels. The third entity is
+        the `int32` array of lengths of descriptions before they were padded
+        (with the maximum length being `self.config.sent_len`). The lengths of
+        descriptions which were clipped is reported as `self.config.sent_len`.
+        As with `load_train`, cached descriptions and lengths are
+        memory-mapped.
         """
+        key = self._cache_key(
+            [self.path + VALIDATE_CSV],
+            {"method": "load_validate",
+             "use_names_descriptions": use_names_descriptions})
+        entry = self._load_cached(key)
+        if entry is not None:
+            return entry[:3]
+
         descriptions, labels = self._load_dataset(VALIDATE_CSV,
                                                   use_names_descriptions)
 
         inputs, true_desc_lengths = self.preprocess_inputs(descriptions)
+        if key is not None:
+            self._preprocessed_cache.save(key, inputs, labels,
+                                          true_desc_lengths)
         return inputs, labels, true_desc_lengths
 
     def load_test(self, use_full_test_set=True, use_english=False,
@@ -175,12 +310,14 @@ class Dataset(object):
                 test set is to be used for testing. Defaults to `True`.
 
         Returns:
-            `list` of `str`, `list` of `Label`, `list` of `int`: The first
-        entity is the list of descriptions. The second entity is the list
-        of corresponding labels. The third entity is the list of lengths
-        of descriptions before they were padded (with the maximum length
-        being `self.config.sent_len`). The lengths of descriptions which
-        were clipped is reported as `self.config.sent_len`.
+            `numpy.ndarray`, `list` of `Label`, `numpy.ndarray`: The first
+        entity is the `int32` matrix of token ids of the descriptions. The
+        second entity is the list of corresponding labels. The third entity is
+        the `int32` array of lengths of descriptions before they were padded
+        (with the maximum length being `self.config.sent_len`). The lengths of
+        descriptions which were clipped is reported as `self.config.sent_len`.
+        As with `load_train`, cached descriptions and lengths are
+        memory-mapped.
 
         """
         # Only one of the four arguments must be True, so that the correct
@@ -188,6 +325,17 @@ class Dataset(object):
         assert (use_full_test_set + use_english + use_english_intelligible +
                 use_gold == 1)
 
+        key = self._cache_key(
+            [self.path + TEST_CSV, self.path + TURK_CSV],
+            {"method": "load_test", "use_full_test_set": use_full_test_set,
+             "use_english": use_english,
+             "use_english_intelligible": use_english_intelligible,
+             "use_gold": use_gold,
+             "use_names_descriptions": use_names_descriptions})
+        entry = self._load_cached(key)
+        if entry is not None:
+            return entry[:3]
+
         # First of all, load labels for test recipes obtained from Turk.
         recipes = []
         with open(self.path + TEST_CSV, 'rb') as f:
@@ -212,6 +360,9 @@ class Dataset(object):
                                                          use_names_descriptions)
 
         inputs, true_desc_lengths = self.preprocess_inputs(descriptions)
+        if key is not None:
+            self._preprocessed_cache.save(key, inputs, labels,
+                                          true_desc_lengths)
         return inputs, labels, true_desc_lengths
 
     def load_from_file(self, csv_file_path, use_names_descriptions=False):
@@ -228,13 +379,23 @@ class Dataset(object):
                 dataset.
 
         Returns:
-            `list` of `str`, `list` of `Label`, `list` of `int`: The first
-        entity is the list of descriptions. The second entity is the list
-        of corresponding labels. The third entity is the list of lengths
-        of descriptions before they were padded (with the maximum length
-        being `self.config.sent_len`). The lengths of descriptions which
-        were clipped is reported as `self.config.sent_len`.
+            `numpy.ndarray`, `list` of `Label`, `numpy.ndarray`: The first
+        entity is the `int32` matrix of token ids of the descriptions. The
+        second entity is the list of corresponding labels. The third entity is
+        the `int32` array of lengths of descriptions before they were padded
+        (with the maximum length being `self.config.sent_len`). The lengths of
+        descriptions which were clipped is reported as `self.config.sent_len`.
+        As with `load_train`, cached descriptions and lengths are
+        memory-mapped.
         """
+        key = self._cache_key(
+            [csv_file_path],
+            {"method": "load_from_file",
+             "use_names_descriptions": use_names_descriptions})
+        entry = self._load_cached(key)
+        if entry is not None:
+            return entry[:3]
+
         recipes = []
         with open(csv_file_path, 'rb') as f:
             reader = csv.DictReader(f)
@@ -245,6 +406,9 @@ class Dataset(object):
                                                          use_names_descriptions)
 
         inputs, true_desc_lengths = self.preprocess_inputs(descriptions)
+        if key is not None:
+            self._preprocessed_cache.save(key, inputs, labels,
+                                          true_desc_lengths)
         return inputs, labels, true_desc_lengths
 
     def load_vocabulary(self, vocab_path):
@@ -255,9 +419,32 @@ class Dataset(object):
         """
         logging.debug("Loading vocabulary.")
         with open(vocab_path, 'rb') as f:
-            self.vocabulary = pickle.load(f)
+            self.load_vocabulary_dump(f.read())
         logging.info("Vocabulary loaded.")
 
+    def load_vocabulary_dump(self, dump):
+        """Loads vocabulary from the contents of a pickle dump.
+
+        Args:
+            dump (str): Contents of the pickle dump, as written by
+                `dump_vocabulary`.
+        """
+        self.vocabulary = pickle.loads(dump)
+        self.vocabulary_fingerprint = hashlib.md5(dump).hexdigest()
+
+    def dump_vocabulary(self, vocab_path):
+        """Dumps `self.vocabulary` dictionary using pickle.
+
+        Args:
+            vocab_path (str): Path where the dump should be saved.
+        """
+        logging.debug("Dumping vocabulary.")
+        dump = pickle.dumps(self.vocabulary, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(vocab_path, 'wb') as f:
+            f.write(dump)
+        self.vocabulary_fingerprint = hashlib.md5(dump).hexdigest()
+        logging.debug("Vocabulary dumped.")
+
     def preprocess_inputs(self, inputs):
         """Pre-processes the input descriptions.
 
@@ -265,37 +452,84 @@ class Dataset(object):
             inputs(`list` of `str`): List of recipe descriptions.
 
         Returns:
-            `list` of `str`, `list` of `int`: The first entity is the list of
-        descriptions. The second entity is the list of lengths of descriptions
-        before they were padded (with the maximum length being
-        `self.config.sent_len`). The lengths of descriptions which were clipped
-        is reported as `self.config.sent_len`.
+            `numpy.ndarray`, `numpy.ndarray`: The first entity is the matrix of
+        token ids of the descriptions. The second entity is the array of
+        lengths of descriptions before they were padded (with the maximum
+        length being `self.config.sent_len`). The lengths of descriptions which
+        were clipped is reported as `self.config.sent_len`. See
+        `ids_and_lengths`.
+
+        """
+        return self.ids_and_lengths(self.tokenize_and_stem(inputs))
 
+    def preprocess_tokenized_inputs(self, inputs):
+        """Pre-processes input descriptions that are already tokenized and,
+        optionally, stemmed by `tokenize_and_stem`.
+
+        The tokenized descriptions `inputs` are left unmodified, so that they
+        can be pre-processed again using a different vocabulary.
+
+        Args:
+            inputs(`list` of `list` of `str`): List of tokenized descriptions.
+
+        Returns:
+            `numpy.ndarray`, `numpy.ndarray`: Same as `preprocess_inputs`.
         """
-        inputs = self._tokenize_and_stem(inputs)
-        self.parse_descriptions_with_vocabulary(inputs)
-        true_desc_lengths = self.description_lengths_before_padding(inputs)
-        self.pad_or_clip(inputs)
-        return inputs, true_desc_lengths
+        return self.ids_and_lengths(inputs)
+
+    def ids_and_lengths(self, descriptions):
+        """Maps tokenized descriptions to token ids, padded or clipped to
+        exactly `self.config.sent_size` tokens.
 
-    def parse_descriptions_with_vocabulary(self, descriptions):
-        """Modifies the descriptions so that it only contains tokens from the
-        vocabulary. Other tokens are replaced with the special token `UNK`.
-        All tokens are replaced by their corresponding integers.
+        Tokens that are not in the vocabulary are mapped to the special token
+        `UNK`. Descriptions shorter than `self.config.sent_size` are padded
+        with `NULL` tokens. Longer ones are clipped to their first
+        `self.config.num_tokens_left` and last `self.config.num_tokens_right`
+        tokens.
+
+        The ids of all the kept tokens are gathered into a single array in one
+        pass, and then scattered into a preallocated matrix, rather than
+        building a list per description.
 
         Args:
             descriptions (`list` of `list` of `str`): List of descriptions of
-                recipes in tokenized form.
+                recipes in tokenized form. They are left unmodified.
+
+        Returns:
+            numpy.ndarray, numpy.ndarray: The `int32` matrix of token ids, with
+            a row of `self.config.sent_size` ids per description, and the
+            `int32` lengths of the descriptions before they were padded. The
+            lengths of descriptions which were clipped are reported as
+            `self.config.sent_size`.
         """
         # Make sure that the vocabulary is built.
         assert (len(self.vocabulary) != 0)
 
-        for description in descriptions:
-            for i in xrange(len(description)):
-                if description[i] not in self.vocabulary:
-                    description[i] = self.vocabulary[UNK]
-                else:
-                    description[i] = self.vocabulary[description[i]]
+        sent_size = self.config.sent_size
+        left = self.config.num_tokens_left
+        right = self.config.num_tokens_right
+        num_descriptions = len(descriptions)
+        seq_lens = np.fromiter(
+            (min(len(description), sent_size) for description in descriptions),
+            dtype=np.int32, count=num_descriptions)
+        # Tokens kept from each description, in order.
+        kept = (description if len(description) <= sent_size else
+                (description[:left] + description[len(description) - right:] +
+                 description[left + right:sent_size])[:sent_size]
+                for description in descriptions)
+        vocabulary, unknown = self.vocabulary, self.vocabulary[UNK]
+        ids = np.fromiter((vocabulary.get(token, unknown)
+                           for description in kept for token in description),
+                          dtype=np.int32, count=int(seq_lens.sum()))
+
+        inputs = np.empty((num_descriptions, sent_size), dtype=np.int32)
+        inputs.fill(self.vocabulary[NULL])
+        # The id of token j of description i goes to column j of row i.
+        rows = np.repeat(np.arange(num_descriptions), seq_lens)
+        starts = np.cumsum(seq_lens) - seq_lens
+        columns = np.arange(len(ids)) - np.repeat(starts, seq_lens)
+        inputs[rows, columns] = ids
+        return inputs, seq_lens
 
     def description_lengths_before_padding(self, descriptions):
         """Returns lengths of descriptions before they are padded.
@@ -315,29 +549,44 @@ class Dataset(object):
         return [len(description) if len(description) < self.config.sent_size
                 else self.config.sent_size for description in descriptions]
 
-    def pad_or_clip(self, descriptions):
-        """Pads or clips descriptions so that they are exactly
-        `self.config.sent_len` characters long.
+    def _cache_key(self, files, parts):
+        """Returns the key of a pre-processed dataset in
+        `self._preprocessed_cache`.
 
-        If number of tokens is less than `self.config.sent_len`, pad `NULL`
-        tokens. If number of tokens are greater than `self.config.sent_len`
-        use the first `self.config.num_tokens_left` and last
-        `self.config.num_tokens_right` tokens.
+        Besides `parts`, the key covers the contents of `files`, the stemming
+        and padding settings, and the vocabulary in use, if any.
 
         Args:
-            descriptions (`list` of `list` of `str`): List of descriptions of
-                recipes in tokenized form.
+            files (`list` of `str`): Paths of the files and directories the
+                dataset is read from.
+            parts (dict): Arguments of the loading method that the dataset
+                depends on.
+
+        Returns:
+            str: The key, or `None` if datasets are not cached.
         """
-        for description in descriptions:
-            if len(description) < self.config.sent_size:
-                while len(description) < self.config.sent_size:
-                    description.append(self.vocabulary[NULL])
-            elif len(description) > self.config.sent_size:
-                for i in xrange(0, self.config.num_tokens_right):
-                    description[i + self.config.num_tokens_left] = \
-                        description[i - self.config.num_tokens_right]
-                while len(description) > self.config.sent_size:
-                    description.pop()
+        if self._preprocessed_cache is None:
+            return None
+        parts = dict(parts, stem=self.stem, sent_size=self.config.sent_size,
+                     num_tokens_left=self.config.num_tokens_left,
+                     num_tokens_right=self.config.num_tokens_right,
+                     vocabulary=self.vocabulary_fingerprint,
+                     files=[file_fingerprint(path) for path in files])
+        return self._preprocessed_cache.key(parts)
+
+    def _load_cached(self, key):
+        """Loads a pre-processed dataset from `self._preprocessed_cache`.
+
+        Args:
+            key (str): Key of the dataset, as returned by `_cache_key`.
+
+        Returns:
+            Same as `preprocessed_cache.PreprocessedCache.load`. `None` if the
+            dataset is not in the cache, or if datasets are not cached.
+        """
+        if key is None:
+            return None
+        return self._preprocessed_cache.load(key)
 
     def _load_dataset(self, filename, use_names_descriptions):
         """Loads description-label pairs from the dataset contained in
@@ -361,7 +610,7 @@ class Dataset(object):
 
         return descriptions, labels
 
-    def _tokenize_and_stem(self, descriptions):
+    def tokenize_and_stem(self, descriptions):
         """Tokenizes and, optionally, stems the descriptions after converting
         them to lowercase.
 
@@ -372,25 +621,26 @@ class Dataset(object):
             `list` of `str`: List of stemmed and tokenized descriptions.
         """
         inputs = []
-        # Since the descriptions are often in telegraphic language, a tokenizer
-        # built for Tweets should work better than one for standard English.
-        # Hopefully, the former subsumes the latter in terms of functionality.
-        tokenizer = TweetTokenizer()
-        if self.stem:
-            stemmer = SnowballStemmer("english")
-
         for description in descriptions:
             # Since TweetTokenizer doesn't tokenize # and @ separately -- they
             # are the special "hashtags" and "mentions" in Tweets -- remove
             # them.
             description = description.replace('#', '').replace('@', '').lower()
-            tokenized = tokenizer.tokenize(description)
-            if self.stem:
-                stemmed = [stemmer.stem(token) for token in tokenized]
-                inputs.append(stemmed)
-            else:
-                inputs.append(tokenized)
-
+            tokenized = self._tokenizer.tokenize(description)
+            if self.stem and self._stem_cache is None:
+                tokenized = [self._stemmer.stem(token) for token in tokenized]
+            inputs.append(tokenized)
+
+        if self.stem and self._stem_cache is not None:
+            # The stems of all the distinct tokens are looked up at once, which
+            # locks the shared cache once instead of once per token.
+            tokens = list(set(token for tokenized in inputs
+                              for token in tokenized))
+            stems = dict(zip(tokens, self._stem_cache.get_many(
+                tokens, lambda missing: [self._stemmer.stem(token)
+                                         for token in missing])))
+            inputs = [[stems[token] for token in tokenized]
+                      for tokenized in inputs]
         return inputs
 
     def _create_vocabulary(self, inputs):
@@ -426,17 +676,6 @@ class Dataset(object):
             self.vocabulary[sorted_tokens[i][0]] = i + 2
             i += 1
 
-    def _dump_vocabulary(self, vocab_path):
-        """Dumps `self.vocabulary` dictionary using pickle.
-
-        Args:
-            vocab_path (str): Path where the dump should be saved.
-        """
-        logging.debug("Dumping vocabulary.")
-        with open(vocab_path, 'wb') as f:
-            pickle.dump(self.vocabulary, f, protocol=pickle.HIGHEST_PROTOCOL)
-        logging.debug("Vocabulary dumped.")
-
     def _load_turk_labels(self):
         """Loads the Turk labels for certain recipes from the csv file.
 
@@ -628,6 +867,83 @@ class Dataset(object):
         return descriptions, labels
 
 
+class PreprocessedInputs(object):
+    """Input descriptions that are tokenized and stemmed only once, and mapped
+    to token ids only once per distinct vocabulary.
+
+    An instance can be passed in place of raw descriptions to the prediction
+    methods of models and ensembles, so that a description fed to several
+    models -- each with its own vocabulary -- goes through the tokenizer and
+    the stemmer only once. Models whose vocabularies have the same
+    fingerprint share a single id-mapping.
+
+    Args:
+        descriptions (`list` of `str`): List of raw descriptions.
+        dataset (`Dataset`): Dataset used to tokenize and stem `descriptions`.
+
+    Attributes:
+        tokenized (`list` of `list` of `str`): Tokenized, and optionally
+            stemmed, descriptions.
+        stem (bool): `True` if `tokenized` are stemmed.
+    """
+
+    def __init__(self, descriptions, dataset):
+        self.tokenized = dataset.tokenize_and_stem(descriptions)
+        self.stem = dataset.stem
+        self._parsed = {}
+        """dict: Maps vocabulary fingerprints, along with the padding
+        configuration, to the pre-processed descriptions and their lengths, as
+        returned by `Dataset.preprocess_tokenized_inputs`."""
+
+    def __len__(self):
+        return len(self.tokenized)
+
+    def subset(self, indices):
+        """Returns the descriptions at `indices`, without tokenizing them or
+        mapping them to token ids again.
+
+        Args:
+            indices (`list` of `int`): Indices of the descriptions.
+
+        Returns:
+            `PreprocessedInputs`: The descriptions at `indices`, in order.
+        """
+        indices = np.asarray(indices, dtype=int)
+        subset = copy.copy(self)
+        subset.tokenized = [self.tokenized[i] for i in indices]
+        subset._parsed = {key: (inputs[indices], seq_lens[indices])
+                          for key, (inputs, seq_lens)
+                          in self._parsed.iteritems()}
+        return subset
+
+    def for_dataset(self, dataset):
+        """Returns the descriptions pre-processed with the vocabulary of
+        `dataset`.
+
+        Args:
+            dataset (`Dataset`): Dataset whose vocabulary is to be used.
+
+        Returns:
+            `numpy.ndarray`, `numpy.ndarray`: Same as
+            `Dataset.preprocess_inputs`.
+        """
+        if dataset.stem != self.stem:
+            logging.error("Descriptions tokenized with stem=%s cannot be used "
+                          "with a dataset with stem=%s.", self.stem,
+                          dataset.stem)
+            raise ValueError
+        if dataset.vocabulary_fingerprint is None:
+            # The vocabulary cannot be identified, so it cannot be shared.
+            return dataset.preprocess_tokenized_inputs(self.tokenized)
+        # Padding and clipping also depend on the configuration.
+        key = (dataset.vocabulary_fingerprint, dataset.config.sent_size,
+               dataset.config.num_tokens_left, dataset.config.num_tokens_right)
+        if key not in self._parsed:
+            self._parsed[key] = dataset.preprocess_tokenized_inputs(
+                self.tokenized)
+        return self._parsed[key]
+
+
 if __name__ == '__main__':
     dataset = Dataset(stem=True, config=PaperConfiguration)
     inputs, labels = dataset.load_train("./experiments/rnn/dummy/" + VOCAB_FILE)
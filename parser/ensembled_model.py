@@ -1,13 +1,58 @@
+import hashlib
 import logging
+import threading
+import time
+
 import numpy as np
 
+from parser.dataset import PreprocessedInputs
+from parser.minibatches import evaluation_chunks
+
 
 class EnsembledModel(object):
-    """Ensemble of multiple models."""
+    """Ensemble of multiple models.
+
+    Args:
+        pool (`multiprocessing.pool.ThreadPool`, optional): Pool of threads
+            onto which the models are dispatched when computing predictions.
+            Defaults to `None`, in which case the models are run one after
+            another.
+        cache (`cache.LRUCache`, optional): Cache of the averaged predictions
+            of `predict` and `predict_batch`. It is keyed by the fingerprint
+            of the ensemble and the tokenized description, so that it can be
+            shared by several ensembles. Defaults to `None`, in which case
+            predictions are not cached.
 
-    def __init__(self):
+    Attributes:
+        cache (`cache.LRUCache`): Cache of averaged predictions, or `None`.
+    """
+
+    def __init__(self, pool=None, cache=None):
         self._models = []
         """`list` of `model.Model`: List of models to be ensembled."""
+        self._pool = pool
+        """`multiprocessing.pool.ThreadPool`: Pool of threads onto which the
+        models are dispatched. `None` if the models are run sequentially."""
+        self.cache = cache
+        self._fingerprint = None
+        """str: Digest of the fingerprints of the models. It is computed
+        lazily by `fingerprint`."""
+        self._label_names = None
+        """`numpy.ndarray`: Labels indexed by their ids. It is built lazily by
+        `_labels`."""
+        self._cascade_thresholds = None
+        """`tuple` of `float`: Confidence thresholds of the cascade, in
+        increasing order, or `None` if all the models are always evaluated."""
+        self._latency_budget = None
+        """float: Number of seconds a cascaded prediction may take, or `None`
+        if it is unbounded."""
+        self._num_cascaded_inputs = 0
+        """int: Number of inputs predicted by the cascade."""
+        self._num_models_evaluated = 0
+        """int: Total number of models evaluated by the cascade, over all the
+        inputs."""
+        self._cascade_lock = threading.Lock()
+        """`threading.Lock`: Guards the counters of the cascade."""
 
     def add_model(self, model):
         """Adds model to the list of models to be ensembled.
@@ -16,6 +61,7 @@ class EnsembledModel(object):
             model (`model.Model`): Model to be added.
         """
         self._models.append(model)
+        self._fingerprint = None
 
     def test_data(self):
         """Returns the test data loaded in the models constituting the ensemble
@@ -23,14 +69,24 @@ class EnsembledModel(object):
         Returns:
             `numpy.ndarray`, `numpy.ndarray`, `numpy.ndarray`: The test inputs,
             their true labels, and their sequence lengths.
+
+        Raises:
+            ValueError: If the models carry no test set, such as
+                `numpy_model.NumpyModel`s loaded from an artifact.
         """
         try:
-            return self._models[0].x_test, self._models[0].y_test, \
-                   self._models[0].seq_lens_test
+            model = self._models[0]
         except IndexError:
             return None, None, None
+        if model.x_test is None:
+            logging.error("%s: The models of the ensemble have no test set. "
+                          "Models run from an artifact must be evaluated "
+                          "with the separate or fused ensemble mode.",
+                          self.test_data.__name__)
+            raise ValueError
+        return model.x_test, model.y_test, model.seq_lens_test
 
-    def predict(self, input, k=1):
+    def predict(self, input, k=1, label_mask=None):
         """Calculates top-`k` predictions for the supplied `input`.
 
         The top-`k` predictions are obtained by ensembling the predictions of
@@ -40,9 +96,13 @@ class EnsembledModel(object):
         `k` = 0 returns a sorted list of all predictions.
 
         Args:
-            input (str): Description of recipe.
+            input (str or `dataset.PreprocessedInputs`): Description of recipe,
+                either raw or as returned by `preprocessed_inputs`.
             k (int, optional): Number of top predictions to be returned.
             Defaults to 1.
+            label_mask (`numpy.ndarray`, optional): Labels the caller will
+                restrict the predictions to, as accepted by `predict_batch`.
+                Defaults to `None`.
 
         Returns:
             `list` of (`str`,`float`): Sorted list of top-`k` predictions for
@@ -50,35 +110,357 @@ class EnsembledModel(object):
             Predictions are in the form of labels represented by strings
             (such as "new_photo_post" for a Trigger Function).
         """
-        prediction = self._averaged_predictions(np.array([input]),
-                                                preprocess=True).reshape((-1,))
-        logging.debug("Averaged prediction %s", prediction)
+        if not isinstance(input, PreprocessedInputs):
+            input = [input]
+        label_masks = None if label_mask is None else label_mask[np.newaxis]
+        return self.predict_batch(input, k, label_masks)[0]
+
+    def predict_batch(self, inputs, k=1, label_masks=None):
+        """Calculates top-`k` predictions for each of the supplied `inputs`.
+
+        All the inputs are fed to each model in a single forward pass, and the
+        top-`k` labels of all the averaged predictions are extracted at once.
+
+        Args:
+            inputs (`list` of `str` or `dataset.PreprocessedInputs`):
+                Descriptions of recipes, either raw or as returned by
+                `preprocessed_inputs`.
+            k (int, optional): Number of top predictions to be returned for
+                each input, as in `predict`. Defaults to 1.
+            label_masks (`numpy.ndarray`, optional): Boolean matrix of shape
+                (num_inputs, num_labels), as returned by `label_mask` for each
+                input. Each row marks the labels which the caller restricts
+                the predictions of that input to, spreading the probability of
+                the other labels evenly over them (see
+                `dialog.utterance_parser.UtteranceParser`). It is only used by
+                the cascade, which then bounds the top-1 confidence among these
+                labels. All predictions are returned regardless. Defaults to
+                `None`, in which case no restriction is assumed.
+
+        Returns:
+            `list` of `list` of (`str`,`float`): Sorted list of top-`k`
+            predictions for each input, as returned by `predict`.
+        """
+        if not isinstance(inputs, PreprocessedInputs):
+            inputs = self.preprocessed_inputs(inputs)
+        if self.cache is None:
+            predictions = self._ensembled_predictions(inputs, label_masks)
+        else:
+            predictions = self._cached_averaged_predictions(inputs,
+                                                            label_masks)
+        logging.debug("Averaged predictions %s", predictions)
 
-        ids = np.argpartition(prediction, -k)[-k:]
-        # Ids of top-k labels.
-        top_k_indices = ids[np.argsort(prediction[ids])][::-1]
+        num_labels = predictions.shape[1]
+        if k == 0 or k > num_labels:
+            k = num_labels
+        rows = np.arange(len(predictions))[:, np.newaxis]
+        # Ids of top-k labels of each input, in no particular order.
+        ids = np.argpartition(predictions, -k, axis=1)[:, -k:]
+        order = np.argsort(predictions[rows, ids], axis=1)[:, ::-1]
+        top_k_indices = ids[rows, order]
         logging.debug("Top k=%s labels' ids %s", k, top_k_indices)
 
-        # Convert label-ids to readable label-strings using
-        # `Model.label_reverse_map`.
-        labels_reverse_map = self._models[0].labels_reverse_map
-        top_k_predictions = []
-        for idx in top_k_indices:
-            tup = (labels_reverse_map[idx], prediction[idx])
-            top_k_predictions.append(tup)
-        return top_k_predictions
+        labels = self._labels()[top_k_indices]
+        confidences = predictions[rows, top_k_indices]
+        return [zip(labels[i], confidences[i]) for i in xrange(len(labels))]
+
+    def warm_up(self, inputs):
+        """Fills the cache with the averaged predictions of `inputs`, computing
+        those that are missing in chunks of at most `config.eval_chunk_size`
+        descriptions.
+
+        Args:
+            inputs (`list` of `str` or `dataset.PreprocessedInputs`):
+                Descriptions of recipes, either raw or as returned by
+                `preprocessed_inputs`, such as the utterances of earlier
+                dialogs.
+        """
+        if self.cache is None:
+            logging.error("The ensemble has no prediction cache to warm up.")
+            raise ValueError
+        if not isinstance(inputs, PreprocessedInputs):
+            inputs = self.preprocessed_inputs(inputs)
+        chunk_size = self._models[0].config.eval_chunk_size
+        for start in xrange(0, len(inputs), chunk_size):
+            self._cached_averaged_predictions(inputs.subset(
+                range(start, min(start + chunk_size, len(inputs)))))
+        logging.info("Prediction cache warmed up with %s descriptions: %s",
+                     len(inputs), self.cache)
+
+    def label_mask(self, predicate):
+        """Returns the mask of the labels satisfying `predicate`, as accepted
+        by `predict` and `predict_batch`.
+
+        Args:
+            predicate (function): Function of a `str` label returning `True`
+                if the label is to be kept.
+
+        Returns:
+            numpy.ndarray: Boolean array indexed by label-ids.
+        """
+        return np.array([predicate(label) for label in self._labels()],
+                        dtype=bool)
+
+    def enable_cascade(self, thresholds, latency_budget=None):
+        """Makes `predict` and `predict_batch` evaluate the models in a
+        cascade, and resets the counters of `average_models_evaluated`.
+
+        The models are evaluated one after another, in the order they were
+        added, and each input is pre-processed once for all of them. An input
+        leaves the cascade as soon as its top-1 confidence with the full
+        ensemble is known to lie between the same two consecutive `thresholds`
+        as that of the models evaluated so far, whatever the predictions of
+        the remaining models. The confidence is the one the caller compares
+        with the thresholds: with a label mask, that of the top-1 label among
+        the masked labels, once the probability of the other labels is spread
+        evenly over them. Its prediction is then the average of the models
+        evaluated so far. Callers, such as the dialog policy, thus make the
+        same decision as with the full ensemble, although the top-1 label may
+        differ.
+
+        The cascade runs the models one `predictions` call at a time, so it
+        only pays off when most inputs leave it early. It is not supported by
+        ensembles which run all their models with a single call (see
+        `fused_ensembled_model.FusedEnsembledModel`).
+
+        Args:
+            thresholds (`list` of `float`): Confidence thresholds, such as the
+                `alpha` and `beta` of the dialog policy.
+            latency_budget (float, optional): Number of seconds a prediction
+                may take. The cascade stops before evaluating a model that is
+                expected to exceed it, given the average time taken by the
+                models evaluated so far. At least one model is always
+                evaluated. Defaults to `None`, in which case the cascade is
+                only stopped by the thresholds.
+        """
+        self._cascade_thresholds = tuple(sorted(thresholds))
+        self._latency_budget = latency_budget
+        with self._cascade_lock:
+            self._num_cascaded_inputs = 0
+            self._num_models_evaluated = 0
+
+    def disable_cascade(self):
+        """Makes `predict` and `predict_batch` evaluate all the models."""
+        self._cascade_thresholds = None
+        self._latency_budget = None
+
+    def average_models_evaluated(self):
+        """Returns the average number of models evaluated per input by the
+        cascade since it was enabled, or `None` if it predicted no input."""
+        with self._cascade_lock:
+            if self._num_cascaded_inputs == 0:
+                return None
+            return (float(self._num_models_evaluated) /
+                    self._num_cascaded_inputs)
+
+    def fingerprint(self):
+        """Returns a digest of the fingerprints of the models of the ensemble.
+
+        It is computed once, so the models must not be trained further while
+        they are in the ensemble.
+
+        Returns:
+            str: The digest.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.md5()
+            for model in self._models:
+                digest.update(model.fingerprint())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def _cached_averaged_predictions(self, inputs, label_masks=None):
+        """Returns the averaged predictions of `inputs`, as
+        `_averaged_predictions` does, looking them up in the cache first.
+
+        The descriptions missing from the cache are fed to the models together.
+        Descriptions that only differ in case or in whitespace -- or in word
+        endings, with stemming -- share an entry, since the key is made of the
+        tokenized description.
+
+        Args:
+            inputs (`dataset.PreprocessedInputs`): The descriptions.
+            label_masks (`numpy.ndarray`, optional): Label masks of the inputs,
+                as accepted by `predict_batch`. Defaults to `None`.
+
+        Returns:
+            numpy.ndarray: Mean of softmax outputs of all the models of shape
+            (num_inputs, num_classes)
+        """
+        # Predictions of the cascade may be averaged over fewer models,
+        # depending on the label masks, so they are cached apart.
+        fingerprint = (self.fingerprint(), self._cascade_thresholds,
+                       self._latency_budget)
+        if self._cascade_thresholds is None or label_masks is None:
+            masks = [None] * len(inputs)
+        else:
+            masks = [mask.tobytes() for mask in label_masks]
+        keys = [(fingerprint, tuple(tokens), mask)
+                for tokens, mask in zip(inputs.tokenized, masks)]
+        positions = dict(zip(keys, xrange(len(keys))))
+
+        def compute(missing):
+            indices = [positions[key] for key in missing]
+            predictions = self._ensembled_predictions(
+                inputs.subset(indices),
+                None if label_masks is None else label_masks[indices])
+            # Copy the rows, so that a cached row does not keep the whole
+            # batch alive.
+            return [prediction.copy() for prediction in predictions]
+
+        return np.array(self.cache.get_many(keys, compute))
+
+    def _ensembled_predictions(self, inputs, label_masks=None):
+        """Returns the averaged predictions of `inputs`, computed by the
+        cascade if it is enabled.
+
+        Args:
+            inputs (`dataset.PreprocessedInputs`): The descriptions.
+            label_masks (`numpy.ndarray`, optional): Label masks of the inputs,
+                as accepted by `predict_batch`. Defaults to `None`.
+
+        Returns:
+            numpy.ndarray: Mean of softmax outputs of the models of shape
+            (num_inputs, num_classes)
+        """
+        if self._cascade_thresholds is None:
+            return self._averaged_predictions(inputs, preprocess=True)
+        return self._cascaded_predictions(inputs, label_masks)
+
+    def _cascaded_predictions(self, inputs, label_masks=None):
+        """Computes the average of softmax-prediction output of the models,
+        evaluating them in a cascade (see `enable_cascade`).
+
+        Only the inputs still in the cascade are fed to each model. They are
+        subsets of `inputs`, so that they are neither tokenized nor mapped to
+        token ids again.
+
+        Args:
+            inputs (`dataset.PreprocessedInputs`): The descriptions.
+            label_masks (`numpy.ndarray`, optional): Label masks of the inputs,
+                as accepted by `predict_batch`. Defaults to `None`, in which
+                case all labels are kept.
+
+        Returns:
+            numpy.ndarray: Mean of softmax outputs of the models evaluated for
+            each input, of shape (num_inputs, num_classes)
+        """
+        start_time = time.time()
+        num_models = len(self._models)
+        num_evaluated = np.zeros(len(inputs), dtype=np.int32)
+        sums = None
+        pending = np.arange(len(inputs))
+        batch = inputs
+        for i, model in enumerate(self._models):
+            predictions = model.predictions(batch, preprocess=True)
+            if sums is None:
+                sums = np.zeros((len(inputs), predictions.shape[1]))
+                if label_masks is None:
+                    label_masks = np.ones(sums.shape, dtype=bool)
+            sums[pending] += predictions
+            num_evaluated[pending] += 1
+
+            lowest, highest = self._confidence_bounds(
+                sums[pending] / num_models, label_masks[pending],
+                float(num_models - i - 1) / num_models)
+            undecided = np.zeros(len(pending), dtype=bool)
+            for threshold in self._cascade_thresholds:
+                undecided |= (lowest < threshold) & (highest >= threshold)
+            if not undecided.any():
+                break
+            if not undecided.all():
+                pending = pending[undecided]
+                batch = batch.subset(np.flatnonzero(undecided))
+            elapsed = time.time() - start_time
+            if (self._latency_budget is not None and
+                    elapsed * (i + 2) / (i + 1) > self._latency_budget):
+                logging.debug("Latency budget reached after %s models.", i + 1)
+                break
+
+        with self._cascade_lock:
+            self._num_cascaded_inputs += len(inputs)
+            self._num_models_evaluated += int(np.sum(num_evaluated))
+        logging.debug("Models evaluated by the cascade: %s", num_evaluated)
+        return sums / num_evaluated[:, np.newaxis]
+
+    @staticmethod
+    def _confidence_bounds(mass, masks, remaining):
+        """Returns bounds of the top-1 confidence of the full ensemble among
+        the masked labels, once the probability of the other labels is spread
+        evenly over them, whatever the predictions of the remaining models.
+
+        Args:
+            mass (`numpy.ndarray`): Sum of the softmax outputs of the models
+                evaluated so far, divided by the number of models of the
+                ensemble, of shape (num_inputs, num_labels).
+            masks (`numpy.ndarray`): Label masks of the inputs, as accepted by
+                `predict_batch`.
+            remaining (float): Fraction of the models of the ensemble not
+                evaluated yet, which is the probability they add in total.
+
+        Returns:
+            numpy.ndarray, numpy.ndarray: Lowest and highest top-1 confidence
+            of each input.
+        """
+        # Inputs without any masked label are not restricted.
+        masks = masks | ~masks.any(axis=1)[:, np.newaxis]
+        num_masked = masks.sum(axis=1).astype(float)
+        top = np.where(masks, mass, -np.inf).max(axis=1)
+        masked_mass = np.where(masks, mass, 0.).sum(axis=1)
+        confidence = top + (1. - masked_mass) / num_masked
+        # The remaining models lower the confidence the most by raising the
+        # other masked labels towards the top one, and raise it the most by
+        # adding all their probability to the top one.
+        lowest = confidence - np.minimum(
+            remaining, num_masked * top - masked_mass) / num_masked
+        highest = confidence + remaining * (1. - 1. / num_masked)
+        return lowest, highest
+
+    def _labels(self):
+        """Returns the labels of the ensemble, indexed by their ids.
+
+        The array is built from `Model.labels_reverse_map` on first use, so
+        that label-ids can be converted to readable label-strings by indexing
+        it.
+
+        Returns:
+            numpy.ndarray: Array of `str` labels.
+        """
+        if self._label_names is None:
+            labels_reverse_map = self._models[0].labels_reverse_map
+            labels = np.empty(len(labels_reverse_map), dtype=object)
+            for idx, label in labels_reverse_map.iteritems():
+                labels[idx] = label
+            self._label_names = labels
+        return self._label_names
+
+    def preprocessed_inputs(self, inputs):
+        """Tokenizes and, optionally, stems raw input descriptions once for all
+        the models in the ensemble.
+
+        The returned descriptions can also be shared with other ensembles whose
+        models use the same stemming setting.
+
+        Args:
+            inputs (`list` of `str`): List of raw input descriptions.
+
+        Returns:
+            `dataset.PreprocessedInputs`: The tokenized descriptions.
+        """
+        return self._models[0].preprocessed_inputs(inputs)
 
     def evaluate(self):
         """Evaluates the ensemble of models on the test set.
 
         The test set used is the one loaded in the first model. It is assumed
         that all models are loaded with the same subset of the full test set.
+
+        Raises:
+            ValueError: If the models carry no test set, as in `test_data`.
         """
         logging.debug("Starting evaluation of ensembled model on test data.")
 
-        inputs = self._models[0].x_test
-        labels = self._models[0].y_test
-        seq_lens = self._models[0].seq_lens_test
+        inputs, labels, seq_lens = self.test_data()
         mistakes = self.prediction_mistakes(inputs, labels, seq_lens)
         error = np.mean(mistakes)
         logging.info("Test Error = %s", error)
@@ -90,8 +472,8 @@ class EnsembledModel(object):
         Args:
             inputs (`numpy.ndarray`): List of input descriptions in tokenized
                 form, i.e., as a 2D numpy array of tokens
-            labels (`numpy.ndarray`): True labels in the form of a 2D numpy
-                array. Each row is a one-hot vector for the label.
+            labels (`numpy.ndarray`): True labels in the form of a 1D numpy
+                array of label ids.
             seq_lens (`list` of `int`, optional): The list of lengths of
                 descriptions as returned by
                 `dataset.Dataset.description_lengths_before_padding`.
@@ -100,12 +482,10 @@ class EnsembledModel(object):
             numpy.ndarray: An array containing `True` and `False`, `True`
             representing correct prediction by the model for that input.
         """
-        averaged_predictions = self._averaged_predictions(inputs, seq_lens,
-                                                          preprocess=False)
         # Calculate classification error.
-        p = np.argmax(averaged_predictions, axis=1)
-        l = np.argmax(labels, axis=1)
-        mistakes = np.not_equal(p, l)
+        p = np.argmax(self._chunked_averaged_predictions(inputs, seq_lens),
+                      axis=1)
+        mistakes = np.not_equal(p, labels)
         return mistakes
 
     def prediction_confidences(self, inputs, labels, seq_lens):
@@ -115,8 +495,8 @@ class EnsembledModel(object):
         Args:
             inputs (`numpy.ndarray`): List of input descriptions in tokenized
                 form, i.e., as a 2D numpy array of tokens
-            labels (`numpy.ndarray`): True labels in the form of a 2D numpy
-                array. Each row is a one-hot vector for the label.
+            labels (`numpy.ndarray`): True labels in the form of a 1D numpy
+                array of label ids.
             seq_lens (`list` of `int`, optional): The list of lengths of
                 descriptions as returned by
                 `dataset.Dataset.description_lengths_before_padding`.
@@ -125,22 +505,54 @@ class EnsembledModel(object):
             numpy.ndarray: An array containing confidence of top prediction for
             each input in `inputs`.
         """
-        averaged_predictions = self._averaged_predictions(inputs, seq_lens,
-                                                          preprocess=False)
-        return np.max(averaged_predictions, axis=1)
+        return np.max(self._chunked_averaged_predictions(inputs, seq_lens),
+                      axis=1)
+
+    def _chunked_averaged_predictions(self, inputs, seq_lens):
+        """Computes average of softmax-prediction output of all the models for
+        pre-processed inputs, feeding them in chunks of at most
+        `config.eval_chunk_size` examples of similar lengths.
+
+        Args:
+            inputs (`numpy.ndarray`): List of input descriptions in tokenized
+                form, i.e., as a 2D numpy array of tokens
+            seq_lens (`list` of `int`): The list of lengths of descriptions as
+                returned by
+                `dataset.Dataset.description_lengths_before_padding`.
+
+        Returns:
+            numpy.ndarray: Mean of softmax outputs of all the models of shape
+            (num_inputs, num_classes)
+        """
+        inputs = np.asarray(inputs)
+        seq_lens = np.asarray(seq_lens)
+        averaged_predictions = None
+        for indices in evaluation_chunks(
+                seq_lens, self._models[0].config.eval_chunk_size):
+            predictions = self._averaged_predictions(
+                inputs[indices], seq_lens[indices], preprocess=False)
+            if averaged_predictions is None:
+                averaged_predictions = np.empty(
+                    (len(seq_lens), predictions.shape[1]),
+                    dtype=predictions.dtype)
+            averaged_predictions[indices] = predictions
+        return averaged_predictions
 
     def _averaged_predictions(self, inputs, seq_lens=None, preprocess=True):
         """Computes average of softmax-prediction output of all the models.
 
         Each model is supplied with provided `inputs`, optionally we a request
         to pre-process the `inputs`. The models softmax output is then used.
+        Raw descriptions are tokenized and stemmed only once for all models.
 
         Args:
-            inputs (`list` of `str` or `numpy.ndarray`): List of input
-                descriptions. The descriptions can either be tokenized -- as a
-                2D numpy array of tokens -- in which case `preprocess` should be
-                `False` or raw strings of texts -- `list` of `str` -- in which
-                case `preprocess` should be `True`.
+            inputs (`list` of `str` or `numpy.ndarray` or
+                `dataset.PreprocessedInputs`): List of input descriptions. The
+                descriptions can either be tokenized -- as a 2D numpy array of
+                tokens -- in which case `preprocess` should be `False` or raw
+                strings of texts -- `list` of `str` or
+                `dataset.PreprocessedInputs` -- in which case `preprocess`
+                should be `True`.
             seq_lens (`list` of `int`, optional): The list of lengths of
                 descriptions as returned by
                 `dataset.Dataset.description_lengths_before_padding`. This is
@@ -153,10 +565,19 @@ class EnsembledModel(object):
             numpy.ndarray: Mean of softmax outputs of all the models of shape
             (num_inputs, num_classes)
         """
-        predictions = []
-        for model in self._models:
-            preds = model.predictions(inputs, seq_lens, preprocess)
-            predictions.append(preds)
+        if preprocess and not isinstance(inputs, PreprocessedInputs):
+            inputs = self.preprocessed_inputs(inputs)
+        if self._pool is None:
+            predictions = []
+            for model in self._models:
+                preds = model.predictions(inputs, seq_lens, preprocess)
+                predictions.append(preds)
+        else:
+            # TensorFlow releases the GIL while running a session, so the
+            # models are run concurrently.
+            predictions = self._pool.map(
+                lambda model: model.predictions(inputs, seq_lens, preprocess),
+                self._models)
 
         averaged_predictions = np.mean(predictions, axis=0)
         return averaged_predictions
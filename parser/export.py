@@ -0,0 +1,69 @@
+"""
+Package the models of an ensemble, loaded from checkpoints, into a single
+artifact (see `artifact`), so that they can be run in NumPy, without
+Tensorflow, by `numpy_model.NumpyModel`.
+
+The artifact is written to the path given by `--artifact-path`, which defaults
+to the one where `EnsembleMode.numpy` looks for it
+(`combined_model.CombinedModel.artifact_path`).
+"""
+
+import logging
+
+from parser.action_channel_model import ActionChannelModel
+from parser.action_function_model import ActionFunctionModel
+from parser.argument_parser import export_arguments_parser
+from parser.artifact import write_artifact
+from parser import configs
+from parser.combined_model import CombinedModel
+from parser.predict import prepare_models_for_predictions
+from parser.trigger_function_model import TriggerFunctionModel
+from parser.trigger_channel_model import TriggerChannelModel
+from parser import utils
+
+
+def parse_args():
+    """Parses and logs command-line arguments.
+
+    Returns:
+        Namespace: Namespace containing parsed arguments.
+    """
+    args = export_arguments_parser().parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format='%(levelname)s: %(asctime)s: %(message)s')
+    logging.info("Log Level: %s", args.log_level)
+    logging.info("Experiment Name: %s", args.experiment_name)
+    logging.info("Model: %s", args.model[0])
+    logging.info("Saved Model Path: %s", args.saved_model_path)
+    logging.info("Artifact Path: %s", args.artifact_path)
+
+    return args
+
+
+def main():
+    args = parse_args()
+    utils.verify_experiment_directory(args.experiment_name[0])
+
+    if args.model[0] == "TriggerFunctionModel":
+        model_class = TriggerFunctionModel
+    elif args.model[0] == "ActionFunctionModel":
+        model_class = ActionFunctionModel
+    elif args.model[0] == "TriggerChannelModel":
+        model_class = TriggerChannelModel
+    elif args.model[0] == "ActionChannelModel":
+        model_class = ActionChannelModel
+    else:
+        logging.error("Illegal model class %s", args.model[0])
+        return
+
+    models = prepare_models_for_predictions(args, model_class)
+    artifact_path = args.artifact_path
+    if artifact_path is None:
+        artifact_path = CombinedModel.artifact_path(args)
+    write_artifact(artifact_path, configs.PaperConfiguration,
+                   [model.artifact_member() for model in models])
+
+
+if __name__ == '__main__':
+    main()
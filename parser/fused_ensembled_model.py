@@ -0,0 +1,109 @@
+import logging
+import tensorflow as tf
+import threading
+
+from parser.dataset import PreprocessedInputs
+from parser.ensembled_model import EnsembledModel
+
+
+class FusedEnsembledModel(EnsembledModel):
+    """Ensemble of multiple models that live in a single `tf.Graph` and share
+    a single `tf.Session`.
+
+    The softmax-predictions of all the models are averaged inside the graph,
+    so that the ensembled prediction is obtained with a single `session.run`
+    instead of one per model. The models must be created in the graph of
+    `session`, each under its own variable scope (see
+    `model.Model.initialize_network`).
+
+    Args:
+        session (`tf.Session`): The session shared by all the models.
+        cache (`cache.LRUCache`, optional): Cache of averaged predictions, as
+            in `EnsembledModel`. Defaults to `None`.
+    """
+
+    def __init__(self, session, cache=None):
+        super(FusedEnsembledModel, self).__init__(cache=cache)
+        self._session = session
+        """`tf.Session`: Session shared by all the models in the ensemble."""
+        self._averaged_prediction = None
+        """`tf.Tensor`: Mean of softmax outputs of all the models. It is built
+        lazily, once all the models have been added."""
+        self._build_lock = threading.Lock()
+        """`threading.Lock`: Guards the lazy building of
+        `_averaged_prediction`, since the ensemble may be queried from several
+        threads."""
+
+    def add_model(self, model):
+        """Adds model to the list of models to be ensembled.
+
+        Args:
+            model (`model.Model`): Model to be added. Its network must live in
+                the graph of the session shared by the ensemble.
+        """
+        super(FusedEnsembledModel, self).add_model(model)
+        # The averaged prediction needs to be rebuilt to include the new model.
+        self._averaged_prediction = None
+
+    def enable_cascade(self, thresholds, latency_budget=None):
+        """Refuses to evaluate the models in a cascade.
+
+        A cascade would run the models one `session.run` at a time, which
+        costs more than the single `session.run` of the fused ensemble unless
+        almost all inputs leave it after the first model. Ensembles created
+        with `EnsembleMode.separate` support the cascade.
+
+        Raises:
+            ValueError: Always.
+        """
+        logging.error("%s: The cascade is not supported by fused ensembles.",
+                      self.enable_cascade.__name__)
+        raise ValueError
+
+    def _averaged_predictions(self, inputs, seq_lens=None, preprocess=True):
+        """Computes average of softmax-prediction output of all the models.
+
+        Raw descriptions are tokenized and stemmed only once for all models.
+
+        Args:
+            inputs (`list` of `str` or `numpy.ndarray` or
+                `dataset.PreprocessedInputs`): List of input descriptions. The
+                descriptions can either be tokenized -- as a 2D numpy array of
+                tokens -- in which case `preprocess` should be `False` or raw
+                strings of texts -- `list` of `str` or
+                `dataset.PreprocessedInputs` -- in which case `preprocess`
+                should be `True`.
+            seq_lens (`list` of `int`, optional): The list of lengths of
+                descriptions as returned by
+                `dataset.Dataset.description_lengths_before_padding`. This is
+                required if `preprocess` is `False`. Defaults to `None`, which
+                works with `preprocess` set to True.
+            preprocess (bool, optional): Set to `True` if the `inputs` needs to
+                be pre-processed. Defaults to `True`.
+
+        Returns:
+            numpy.ndarray: Mean of softmax outputs of all the models of shape
+            (num_inputs, num_classes)
+        """
+        with self._build_lock:
+            if self._averaged_prediction is None:
+                self._build_averaged_prediction()
+
+        if preprocess and not isinstance(inputs, PreprocessedInputs):
+            inputs = self.preprocessed_inputs(inputs)
+        feed_dict = {}
+        for model in self._models:
+            feed_dict.update(
+                model.prediction_feed_dictionary(inputs, seq_lens, preprocess))
+        return self._session.run(self._averaged_prediction, feed_dict)
+
+    def _build_averaged_prediction(self):
+        """Adds the operation averaging the softmax outputs of all the models
+        to the shared graph.
+        """
+        with self._session.graph.as_default():
+            softmax_predictions = [tf.nn.softmax(model.network.prediction)
+                                   for model in self._models]
+            self._averaged_prediction = tf.reduce_mean(
+                tf.pack(softmax_predictions), 0, name="averaged_prediction")
+        logging.info("Fused prediction of %s models built.", len(self._models))
@@ -0,0 +1,116 @@
+"""
+Schedules of the learning rate during training, and its scaling with the
+size of the minibatches.
+"""
+
+import logging
+import math
+
+
+def cyclic_cosine_learning_rate(base_learning_rate, step, steps_per_cycle):
+    """Returns the learning rate of a training step under a cyclic cosine
+    schedule.
+
+    Within each cycle, the learning rate is annealed from `base_learning_rate`
+    towards 0 along half a cosine, and is restarted at `base_learning_rate` at
+    the beginning of the next cycle. The model at the end of each cycle lies
+    in a different local minimum, which makes the snapshots of a single
+    training run good members of an ensemble (see Huang et al., "Snapshot
+    Ensembles: Train 1, Get M for Free", 2017).
+
+    Args:
+        base_learning_rate (float): Learning rate at the beginning of each
+            cycle.
+        step (int): Number of training steps taken so far.
+        steps_per_cycle (int): Number of training steps of a cycle.
+
+    Returns:
+        float: The learning rate.
+    """
+    position = (step % steps_per_cycle) / float(steps_per_cycle)
+    return base_learning_rate / 2. * (math.cos(math.pi * position) + 1.)
+
+
+def scheduled_learning_rate(base_learning_rate, step, steps_per_epoch,
+                            num_epochs, warmup_epochs=0, decay="constant",
+                            decay_rate=1.):
+    """Returns the learning rate of a training step under a warmup and decay
+    schedule.
+
+    During the first `warmup_epochs` epochs, the learning rate is increased
+    linearly from `base_learning_rate / warmup_steps` to `base_learning_rate`,
+    which keeps the first updates of a large-batch run, with its scaled
+    learning rate, from diverging (see Goyal et al., "Accurate, Large
+    Minibatch SGD: Training ImageNet in 1 Hour", 2017). Over the remaining
+    epochs, the learning rate is then decayed from `base_learning_rate`:
+
+        - "constant": not decayed.
+        - "exponential": multiplied by `decay_rate` at every epoch, smoothly.
+        - "linear": decreased linearly towards 0.
+        - "cosine": annealed towards 0 along half a cosine.
+
+    Args:
+        base_learning_rate (float): Learning rate at the end of the warmup.
+        step (int): Number of training steps taken so far.
+        steps_per_epoch (int): Number of training steps of an epoch.
+        num_epochs (int): Number of epochs of training.
+        warmup_epochs (int, optional): Number of epochs of warmup. Defaults
+            to 0, i.e., no warmup.
+        decay (str, optional): Decay of the learning rate after the warmup,
+            among "constant", "exponential", "linear", and "cosine". Defaults
+            to "constant".
+        decay_rate (float, optional): Factor of the learning rate per epoch,
+            with the "exponential" decay. Defaults to 1.
+
+    Returns:
+        float: The learning rate.
+    """
+    warmup_steps = warmup_epochs * steps_per_epoch
+    if step < warmup_steps:
+        return base_learning_rate * (step + 1) / float(warmup_steps)
+    decay_steps = max(1, num_epochs * steps_per_epoch - warmup_steps)
+    progress = min(1., (step - warmup_steps) / float(decay_steps))
+    if decay == "constant":
+        return base_learning_rate
+    elif decay == "exponential":
+        return base_learning_rate * decay_rate ** (
+            (step - warmup_steps) / float(steps_per_epoch))
+    elif decay == "linear":
+        return base_learning_rate * (1. - progress)
+    elif decay == "cosine":
+        return base_learning_rate / 2. * (math.cos(math.pi * progress) + 1.)
+    logging.error("Illegal decay of the learning rate: %s", decay)
+    raise ValueError
+
+
+def scaled_learning_rate(learning_rate, batch_size, base_batch_size,
+                         scaling="linear"):
+    """Returns the learning rate for training with minibatches of
+    `batch_size` examples, scaled from the `learning_rate` tuned for
+    `base_batch_size` examples.
+
+    The "linear" rule keeps the expected update per example constant, and
+    suits SGD (Goyal et al., 2017). The "sqrt" rule keeps the variance of the
+    updates constant, and usually suits adaptive optimizers like Adam better
+    (Hoffer et al., "Train longer, generalize better", 2017).
+
+    Args:
+        learning_rate (float): Learning rate tuned for `base_batch_size`.
+        batch_size (int): Size of the minibatches.
+        base_batch_size (int): Size of the minibatches `learning_rate` was
+            tuned for.
+        scaling (str, optional): Scaling rule, among "linear", "sqrt", and
+            "none". Defaults to "linear".
+
+    Returns:
+        float: The scaled learning rate.
+    """
+    ratio = batch_size / float(base_batch_size)
+    if scaling == "linear":
+        return learning_rate * ratio
+    elif scaling == "sqrt":
+        return learning_rate * math.sqrt(ratio)
+    elif scaling == "none":
+        return learning_rate
+    logging.error("Illegal scaling of the learning rate: %s", scaling)
+    raise ValueError
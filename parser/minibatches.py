@@ -0,0 +1,197 @@
+"""
+Minibatches of training examples, optionally prepared on a background thread,
+and chunks of examples for evaluation.
+"""
+
+import logging
+import Queue
+import threading
+
+import numpy as np
+
+_END = object()
+"""object: Marks the end of an epoch in the queue of prepared minibatches."""
+
+
+def minibatches(arrays, batch_size, shuffle=True, keep_partial_batch=False,
+                lengths=None, bucket_window=0):
+    """Yields the minibatches of one epoch.
+
+    The arrays are shuffled once per epoch into contiguous buffers, so that
+    every minibatch is a contiguous slice of them.
+
+    With bucketing, the shuffled examples are split into windows of
+    `bucket_window` minibatches, and the examples of each window are sorted by
+    length before being cut into minibatches. Each minibatch then holds
+    examples of similar lengths, and can be trimmed to its longest example.
+    The minibatches are yielded in random order.
+
+    If `batch_size` is greater than the number of examples, then it is set to
+    the number of examples.
+
+    Args:
+        arrays (`tuple` of `numpy.ndarray`): Arrays, such as inputs, labels,
+            and lengths, whose rows are the examples.
+        batch_size (int): Size of each minibatch.
+        shuffle (bool, optional): Set to `True` if the examples should be
+            shuffled. Defaults to `True`.
+        keep_partial_batch (bool, optional): Set to `True` if the last
+            minibatch should be yielded even if it is smaller than
+            `batch_size`. Defaults to `False`, in which case it is dropped.
+            Since the examples are shuffled at every epoch, the dropped
+            examples are used in some other epoch with high probability.
+        lengths (numpy.ndarray, optional): Lengths of the examples, used for
+            bucketing. Defaults to `None`, i.e., no bucketing.
+        bucket_window (int, optional): Number of minibatches whose examples are
+            sorted by length together. Defaults to 0, i.e., no bucketing.
+
+    Yields:
+        `tuple` of `numpy.ndarray`: The rows of `arrays` in a minibatch.
+    """
+    num_examples = arrays[0].shape[0]
+    if num_examples == 0:
+        return
+    if batch_size > num_examples:
+        batch_size = num_examples
+    bucket = lengths is not None and bucket_window > 0
+    if shuffle or bucket:
+        if shuffle:
+            permutation = np.random.permutation(num_examples)
+        else:
+            permutation = np.arange(num_examples)
+        if bucket:
+            window = bucket_window * batch_size
+            for start in xrange(0, num_examples, window):
+                indices = permutation[start:start + window]
+                permutation[start:start + window] = indices[
+                    np.argsort(lengths[indices], kind='mergesort')]
+        arrays = tuple(array[permutation] for array in arrays)
+    if keep_partial_batch:
+        end = num_examples
+    else:
+        end = num_examples - batch_size + 1
+    starts = np.arange(0, end, batch_size)
+    if shuffle and bucket:
+        np.random.shuffle(starts)
+    for start in starts:
+        yield tuple(array[start:start + batch_size] for array in arrays)
+
+
+def num_minibatches(num_examples, batch_size, keep_partial_batch=False):
+    """Returns the number of minibatches of one epoch yielded by
+    `minibatches`.
+
+    Args:
+        num_examples (int): Number of examples.
+        batch_size (int): Same as in `minibatches`.
+        keep_partial_batch (bool, optional): Same as in `minibatches`. Defaults
+            to `False`.
+
+    Returns:
+        int: Number of minibatches.
+    """
+    if num_examples == 0:
+        return 0
+    batch_size = min(batch_size, num_examples)
+    if keep_partial_batch:
+        return -(-num_examples // batch_size)
+    return num_examples // batch_size
+
+
+def prefetched_minibatches(arrays, batch_size, num_prefetched, shuffle=True,
+                           keep_partial_batch=False, lengths=None,
+                           bucket_window=0):
+    """Yields the minibatches of one epoch, as `minibatches` does, while a
+    background thread shuffles the examples and prepares the next
+    `num_prefetched` minibatches.
+
+    If the consumer stops early, such as when training is interrupted, the
+    background thread is stopped once the generator is closed.
+
+    Args:
+        arrays (`tuple` of `numpy.ndarray`): Same as in `minibatches`.
+        batch_size (int): Same as in `minibatches`.
+        num_prefetched (int): Maximum number of minibatches prepared ahead of
+            the one being consumed. If 0, the minibatches are prepared on the
+            calling thread.
+        shuffle (bool, optional): Same as in `minibatches`. Defaults to `True`.
+        keep_partial_batch (bool, optional): Same as in `minibatches`. Defaults
+            to `False`.
+        lengths (numpy.ndarray, optional): Same as in `minibatches`. Defaults
+            to `None`.
+        bucket_window (int, optional): Same as in `minibatches`. Defaults to 0.
+
+    Yields:
+        `tuple` of `numpy.ndarray`: The rows of `arrays` in a minibatch.
+    """
+    if num_prefetched == 0:
+        for minibatch in minibatches(arrays, batch_size, shuffle,
+                                     keep_partial_batch, lengths,
+                                     bucket_window):
+            yield minibatch
+        return
+
+    queue = Queue.Queue(maxsize=num_prefetched)
+    stop = threading.Event()
+
+    def put(item):
+        # Once the consumer has stopped, nothing is put, so that the producer
+        # is blocked by at most one item, which the consumer drains.
+        if stop.is_set():
+            return False
+        queue.put(item)
+        return True
+
+    def produce():
+        try:
+            for minibatch in minibatches(arrays, batch_size, shuffle,
+                                         keep_partial_batch, lengths,
+                                         bucket_window):
+                if not put(minibatch):
+                    return
+        except Exception as e:
+            logging.exception("Could not prepare minibatch.")
+            put(e)
+        else:
+            put(_END)
+
+    # The thread is a daemon, so that it cannot keep the process alive if the
+    # consumer dies without closing the generator.
+    producer = threading.Thread(target=produce, name="minibatch-producer")
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            minibatch = queue.get()
+            if minibatch is _END:
+                break
+            if isinstance(minibatch, Exception):
+                raise minibatch
+            yield minibatch
+    finally:
+        stop.set()
+        # Unblocks the producer if it is waiting to put a minibatch.
+        while True:
+            try:
+                queue.get_nowait()
+            except Queue.Empty:
+                break
+        producer.join()
+
+
+def evaluation_chunks(lengths, chunk_size):
+    """Yields the indices of the examples of a dataset in chunks.
+
+    The examples are ordered by length, so that each chunk holds examples of
+    similar lengths and can be trimmed to its longest example.
+
+    Args:
+        lengths (numpy.ndarray): Lengths of the examples.
+        chunk_size (int): Maximum number of examples in a chunk.
+
+    Yields:
+        numpy.ndarray: Indices of the examples in a chunk.
+    """
+    order = np.argsort(lengths, kind='mergesort')
+    for start in xrange(0, len(order), chunk_size):
+        yield order[start:start + chunk_size]
@@ -1,18 +1,33 @@
 import csv
+import itertools
+import json
 import logging
+import os
+import random
+import time
 
 import matplotlib
 
 matplotlib.use('Agg')
-from matplotlib import pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
 import tensorflow as tf
 
-from parser.constants import EVALUATION_FREQ, STOP_FILE, VOCAB_FILE
+from parser.checkpointer import Checkpointer
+from parser.constants import CHECKPOINTS_DIRECTORY, EVALUATION_FREQ
+from parser.constants import SNAPSHOTS_DIRECTORY, TRAINING_SUMMARY, VOCAB_FILE
+from parser.data_parallel import GradientWorkers
 from parser.constants import TrainVariables
-from parser.dataset import Dataset
-from parser.rnn import LatentAttentionNetwork
-from parser.utils import softmax
+from parser.dataset import Dataset, PreprocessedInputs
+from parser.learning_rates import cyclic_cosine_learning_rate
+from parser.learning_rates import scheduled_learning_rate
+from parser.minibatches import evaluation_chunks, num_minibatches
+from parser.minibatches import prefetched_minibatches
+from parser.rnn import LatentAttentionNetwork, StackedLatentAttentionNetwork
+from parser.synthetic_dataset import SyntheticDataset
+from parser.training_state import TrainingStateSaver
+from parser.utils import prediction_fingerprint, softmax
 
 
 class Model(object):
@@ -34,15 +49,12 @@ class Model(object):
             set. Each row is description in the form of a list of token ids.
         x_test (numpy.ndarray): Input recipes' descriptions from the test set.
             Each row is description in the form of a list of token ids.
-        y_train (numpy.ndarray): Recipes' labels from the train set. Each row is
-            a one-hot vector representing the label for the corresponding
-            recipe.
+        y_train (numpy.ndarray): Recipes' labels from the train set. Each entry
+            is the `int32` id of the label of the corresponding recipe.
         y_validate (numpy.ndarray): Recipes' labels from the validate set. Each
-            row is a one-hot vector representing the label for the corresponding
-            recipe.
-        y_test (numpy.ndarray): Recipes' labels from the test set. Each row is
-            a one-hot vector representing the label for the corresponding
-            recipe.
+            entry is the `int32` id of the label of the corresponding recipe.
+        y_test (numpy.ndarray): Recipes' labels from the test set. Each entry
+            is the `int32` id of the label of the corresponding recipe.
         seq_lens_train (numpy.ndarray): Each row represents the lengths of
             descriptions of a recipe in the train set. The lengths are those
             that are returned by `dataset.Dataset.load_train` method.
@@ -67,6 +79,27 @@ class Model(object):
         """`tf.train.Saver`: `Tensorflow` Saver instance that can be used to
         checkpoint and restore the `self._session` or a subset of
         `tf.Variables` linked to the `Model` instance."""
+        self._variables = {}
+        """dict: Maps un-scoped names of the trainable variables of the network
+        to the variables. These are the variables that are checkpointed."""
+        self._state_variables = {}
+        """dict: Maps un-scoped names of all the variables of the network,
+        including those of the optimizer, to the variables. These are the
+        variables of the full-state checkpoints of training."""
+        self._members = []
+        """`list` of (`str`, dict): Experiment directory and checkpointed
+        variables, as in `self._variables`, of each member of the network. A
+        single network has a single member, in `self._path`."""
+        self._checkpointers = []
+        """`list` of `checkpointer.Checkpointer`: Write the checkpoints and
+        plots of each member on a background thread during training."""
+        self._snapshotters = []
+        """`list` of `checkpointer.Checkpointer`: Write the snapshots of each
+        member during training with a cyclic learning rate."""
+        self._gradient_workers = None
+        """`data_parallel.GradientWorkers`: Worker processes sharing the
+        computation of the gradients of each minibatch. `None` if the
+        gradients are computed by this process alone."""
 
         self.stem = stem
         self._dataset = Dataset(stem=self.stem, config=self.config)
@@ -87,10 +120,17 @@ class Model(object):
         self._path = path
         """`str`: Path of experiment directory"""
 
+        self._num_synthetic_recipes = 0
+        """int: Number of synthetic recipes drawn afresh at every epoch, at the
+        end of the train set. 0 if the train set is fixed."""
+        self._synthetic_recipes_seed = 0
+        """int: Seed of the synthetic recipes drawn for the first epoch. Later
+        epochs use consecutive seeds."""
+
     def load_train_dataset(
             self, use_train_set, use_triggers_api, use_actions_api,
             use_synthetic_recipes, use_names_descriptions, external_csv_file="",
-            load_vocab=False):
+            load_vocab=False, num_synthetic_recipes=0, synthetic_recipes_seed=0):
         """Loads dataset for training.
 
         Args:
@@ -117,6 +157,13 @@ class Model(object):
                 dataset. This is usually done when resuming training on a stored
                 model. Defaults to `False`, in which case, vocabulary will be
                 built from the dataset loaded for training.
+            num_synthetic_recipes (int, optional): If positive, only this many
+                synthetic recipes are used, and a fresh sample of them is drawn
+                at every epoch. Relevant only if `use_synthetic_recipes` is
+                `True`. Defaults to 0, in which case all synthetic recipes are
+                used at every epoch.
+            synthetic_recipes_seed (int, optional): Seed of the synthetic
+                recipes drawn for the first epoch. Defaults to 0.
         """
         logging.debug("Loading dataset.")
         train_inputs, train_labels, train_seq_lens = self._dataset.load_train(
@@ -125,22 +172,49 @@ class Model(object):
             use_actions_api=use_actions_api,
             use_synthetic_recipes=use_synthetic_recipes,
             use_names_descriptions=use_names_descriptions,
-            external_csv_file=external_csv_file, load_vocab=load_vocab)
+            external_csv_file=external_csv_file, load_vocab=load_vocab,
+            num_synthetic_recipes=num_synthetic_recipes,
+            synthetic_recipes_seed=synthetic_recipes_seed)
         logging.info("Train set loaded. Size = %s", len(train_inputs))
+        if use_synthetic_recipes:
+            self._num_synthetic_recipes = num_synthetic_recipes
+            self._synthetic_recipes_seed = synthetic_recipes_seed
         validate_inputs, val_labels, val_seq_lens = self._dataset.load_validate(
             use_names_descriptions)
         logging.info("Validate set loaded.Size = %s", len(validate_inputs))
 
-        self.x_train = np.array(train_inputs)
-        self.x_validate = np.array(validate_inputs)
+        self.x_train = np.asarray(train_inputs)
+        self.x_validate = np.asarray(validate_inputs)
 
         self._create_label_maps()
 
-        self.y_train = self._convert_to_one_hot(train_labels)
-        self.y_validate = self._convert_to_one_hot(val_labels)
+        self.y_train = self._convert_to_ids(train_labels)
+        self.y_validate = self._convert_to_ids(val_labels)
+
+        self.seq_lens_train = np.asarray(train_seq_lens)
+        self.seq_lens_val = np.asarray(val_seq_lens)
+
+    def share_train_dataset(self, model):
+        """Uses the training and validation sets, the vocabulary, and the
+        mapping of labels already loaded in another model, without copying
+        them.
+
+        The vocabulary is also dumped into this model's experiment directory.
 
-        self.seq_lens_train = np.array(train_seq_lens)
-        self.seq_lens_val = np.array(val_seq_lens)
+        Args:
+            model (`model.Model`): Model of the same class, whose training
+                dataset is loaded.
+        """
+        self._dataset = model._dataset
+        self._dataset.dump_vocabulary(self._path + VOCAB_FILE)
+        self._num_synthetic_recipes = model._num_synthetic_recipes
+        self._synthetic_recipes_seed = model._synthetic_recipes_seed
+        self.labels_map = model.labels_map
+        self.labels_reverse_map = model.labels_reverse_map
+        self.x_train, self.y_train = model.x_train, model.y_train
+        self.x_validate, self.y_validate = model.x_validate, model.y_validate
+        self.seq_lens_train = model.seq_lens_train
+        self.seq_lens_val = model.seq_lens_val
 
     def load_labels_and_vocab(self):
         """Loads vocabulary and mapping of labels to ids.
@@ -196,12 +270,14 @@ class Model(object):
                 use_gold=use_gold,
                 use_names_descriptions=use_names_descriptions)
         logging.info("Test set loaded. Size = %s", len(test_inputs))
-        self.x_test = np.array(test_inputs)
-        self.y_test = self._convert_to_one_hot(test_labels)
-        self.seq_lens_test = np.array(test_seq_lens)
+        self.x_test = np.asarray(test_inputs)
+        self.y_test = self._convert_to_ids(test_labels)
+        self.seq_lens_test = np.asarray(test_seq_lens)
 
     def initialize_network(self, init_variables=True, graph=None,
-                           train_vars=TrainVariables.all):
+                           train_vars=TrainVariables.all, session=None,
+                           scope="", num_threads=None, member_paths=None,
+                           num_workers=0):
         """Constructs and initializes the Recurrent Neural Network.
 
         Additionally, creates the `Tensorflow` session and saver variables.
@@ -222,54 +298,330 @@ class Model(object):
                 The mode `TrainVariables.non_attention` results in only the 
                 model parameters that are not part of the attention mechanism 
                 to be learned. This includes only the variable named "p".
+            session (`tf.Session`, optional): An already launched session, on
+                `graph`, to be shared with other models living in the same
+                graph. Defaults to `None`, in which case a new session is
+                launched.
+            scope (str, optional): Variable scope under which the network is
+                created, so that several networks can live in the same graph.
+                Checkpoints are always written and read using un-scoped
+                variable names, which makes them interchangeable between scoped
+                and un-scoped networks. Defaults to "", i.e., no scope.
+            num_threads (int, optional): Number of threads that the launched
+                session may use, both within and across operations. Ignored if
+                `session` is given. Defaults to `None`, in which case
+                `Tensorflow` picks them.
+            member_paths (`list` of `str`, optional): Experiment directories
+                of the members of an ensemble to be trained together, in a
+                single `rnn.StackedLatentAttentionNetwork`. Each member is
+                checkpointed into its own directory, in the same format as a
+                single network, so that it can be restored on its own. Defaults
+                to `None`, i.e., a single network, checkpointed into the
+                model's experiment directory.
+            num_workers (int, optional): Number of worker processes among
+                which, together with this process, the gradients of each
+                training minibatch are computed (see `data_parallel`). Each
+                worker may use `num_threads` threads. Neither `session` nor
+                `member_paths` may be given then. Defaults to 0, i.e., the
+                gradients are computed by this process alone.
         """
+        if num_workers > 0 and (session is not None or
+                                member_paths is not None):
+            logging.error("Gradient workers require a single network in a "
+                          "session of its own.")
+            raise ValueError
         logging.debug("Creating network.")
-        self.network = LatentAttentionNetwork(config=self.config,
-                                              num_classes=len(self.labels_map),
-                                              train_vars=train_vars)
+        with tf.variable_scope(scope):
+            if member_paths is None:
+                self.network = LatentAttentionNetwork(
+                    config=self.config, num_classes=len(self.labels_map),
+                    train_vars=train_vars, dense_gradients=num_workers > 0)
+            else:
+                self.network = StackedLatentAttentionNetwork(
+                    config=self.config, num_classes=len(self.labels_map),
+                    train_vars=train_vars, num_members=len(member_paths))
         logging.info("Network created.")
-        self._session = tf.Session(graph=graph)
+        if num_workers > 0:
+            # The workers are forked before the session is launched.
+            self._gradient_workers = GradientWorkers(
+                self.network, self._scoped_variables(
+                    scope, tf.trainable_variables()),
+                num_workers, num_threads)
+        if session is None:
+            session_config = None
+            if num_threads is not None:
+                session_config = tf.ConfigProto(
+                    intra_op_parallelism_threads=num_threads,
+                    inter_op_parallelism_threads=num_threads)
+            session = tf.Session(graph=graph, config=session_config)
+        self._session = session
         if init_variables:
-            self._session.run(tf.initialize_all_variables())
+            self._session.run(tf.initialize_variables(
+                self._scoped_variables(scope, tf.all_variables())))
             logging.info("Variables initialized.")
-        # self._saver = tf.train.Saver(max_to_keep=None)
+        # Map un-scoped names to variables, so that the checkpoints do not
+        # depend on the scope the network is created in.
+        self._variables = {
+            self._unscoped_name(scope, var): var for var in
+            self._scoped_variables(scope, tf.trainable_variables())}
         self._saver = tf.train.Saver(max_to_keep=None,
-                                     var_list=tf.trainable_variables())
+                                     var_list=self._variables)
+        self._state_variables = {
+            self._unscoped_name(scope, var): var for var in
+            self._scoped_variables(scope, tf.all_variables())}
+        if member_paths is None:
+            self._members = [(self._path, self._variables)]
+        else:
+            # Slice k of every stacked variable is the variable of member k.
+            self._members = [
+                (path, {name: tf.gather(var, k)
+                        for name, var in self._variables.iteritems()})
+                for k, path in enumerate(member_paths)]
 
-    def train(self):
+    def train(self, snapshot_cycles=0, training_state_steps=0, resume=False):
         """Trains the network on the loaded training dataset using mini-batch
         optimization.
+
+        Training of a member stops early once its validation metric
+        `config.early_stopping_metric` has not improved for
+        `config.early_stopping_patience` evaluations. The best checkpoint of
+        each member is recorded in a manifest next to its checkpoints.
+
+        The members of a stacked network are trained until all of them have
+        stopped. A member that has stopped is still updated, but is no longer
+        evaluated or checkpointed.
+
+        With `snapshot_cycles`, the `config.num_epochs` epochs are split into
+        that many cycles of a cyclic cosine learning rate (see
+        `learning_rates.cyclic_cosine_learning_rate`), and a snapshot of each
+        member is saved in `SNAPSHOTS_DIRECTORY` at the end of every cycle.
+        The snapshots are the members of a snapshot ensemble, so training does
+        not stop early then. Otherwise, the learning rate follows the warmup
+        and decay schedule of the configuration (see
+        `learning_rates.scheduled_learning_rate`).
+
+        With `training_state_steps`, full-state checkpoints of training (see
+        `training_state`) are written in `TRAINING_STATE_DIRECTORY`, and
+        `resume` continues training from the latest of them: the optimizer,
+        the step and epoch counters, the position in the epoch's minibatches,
+        the random number generators, and the history of the validation
+        metrics are all restored, so that a single network trains on as if
+        it had not been interrupted. The trainable-only checkpoints are
+        written as usual, for predictions and fine-tuning.
+
+        The CPU and wall-clock times of training, and the throughput of the
+        training steps, are recorded in `TRAINING_SUMMARY`, in the experiment
+        directory of each member.
+
+        Args:
+            snapshot_cycles (int, optional): Number of cycles of the learning
+                rate, which must divide `config.num_epochs`. Defaults to 0,
+                i.e., a constant learning rate and no snapshots.
+            training_state_steps (int, optional): Number of training steps
+                after which a full-state checkpoint is written, in addition
+                to the one written at the end of every epoch. Defaults to 0,
+                i.e., no full-state checkpoints.
+            resume (bool, optional): Set to `True` to resume training from
+                the latest full-state checkpoint in the experiment directory,
+                instead of from the current values of the variables. Training
+                must then be configured as it was when the checkpoint was
+                written. Defaults to `False`.
         """
         logging.debug("Starting training.")
-        train_errors, validate_errors = [], []
-        train_losses, validate_losses = [], []
-
-        for epoch in xrange(1, self.config.num_epochs + 1):
+        if snapshot_cycles and self.config.num_epochs % snapshot_cycles:
+            logging.error("%s epochs cannot be split into %s cycles.",
+                          self.config.num_epochs, snapshot_cycles)
+            raise ValueError
+        start_times = os.times()
+        num_members = len(self._members)
+        steps_per_epoch = num_minibatches(
+            len(self.seq_lens_train), self.config.batch_size,
+            self.config.keep_partial_batch and not self._stacked())
+        state_saver = None
+        if training_state_steps or resume:
+            state_saver = TrainingStateSaver(self._session,
+                                             self._state_variables, self._path)
+        if resume:
+            state = state_saver.restore()
+            if (state["steps_per_epoch"], state["snapshot_cycles"]) != \
+                    (steps_per_epoch, snapshot_cycles):
+                logging.error("Training was checkpointed with %s steps per "
+                              "epoch and %s snapshot cycles, and cannot be "
+                              "resumed with %s and %s.",
+                              state["steps_per_epoch"],
+                              state["snapshot_cycles"], steps_per_epoch,
+                              snapshot_cycles)
+                raise ValueError
+            history = state["history"]
+            first_epoch, position, step = (state["epoch"], state["position"],
+                                           state["step"])
+            num_examples, step_seconds = (state["num_examples"],
+                                          state["step_seconds"])
+            np.random.set_state(state["random_states"][0])
+            random.setstate(state["random_states"][1])
+            # Training is charged the times of the interrupted run too.
+            start_times = tuple(now - elapsed for now, elapsed in
+                                zip(start_times, state["elapsed_times"]))
+            logging.info("Resuming training at epoch %s, after %s of its "
+                         "minibatches.", first_epoch, position)
+        else:
+            history = {
+                "train_errors": [[] for _ in xrange(num_members)],
+                "validate_errors": [[] for _ in xrange(num_members)],
+                "train_losses": [[] for _ in xrange(num_members)],
+                "validate_losses": [[] for _ in xrange(num_members)],
+                "best_scores": [None] * num_members,
+                "evaluations_since_best": [0] * num_members,
+                # Members that have not stopped early.
+                "active": range(num_members),
+                # Scores of the checkpoints and snapshots of each member, by
+                # epoch.
+                "checkpoint_scores": [{} for _ in xrange(num_members)],
+                "snapshot_scores": [{} for _ in xrange(num_members)]}
+            first_epoch, position, step = 1, 0, 0
+            # Examples of each member trained on, and seconds spent training
+            # on them, for the throughput of training.
+            num_examples, step_seconds = 0, 0.
+        # The lists of the history are updated in place.
+        train_errors = history["train_errors"]
+        validate_errors = history["validate_errors"]
+        train_losses = history["train_losses"]
+        validate_losses = history["validate_losses"]
+        best_scores = history["best_scores"]
+        evaluations_since_best = history["evaluations_since_best"]
+        active = history["active"]
+        checkpoint_scores = history["checkpoint_scores"]
+        snapshot_scores = history["snapshot_scores"]
+
+        self._checkpointers = []
+        for member, (path, variables) in enumerate(self._members):
+            if path != self._path:
+                self._dataset.dump_vocabulary(path + VOCAB_FILE)
+            self._checkpointers.append(Checkpointer(
+                self._session, variables,
+                path + CHECKPOINTS_DIRECTORY + "model",
+                keep_best=self.config.checkpoints_keep_best,
+                keep_last=self.config.checkpoints_keep_last,
+                scores=checkpoint_scores[member]))
+        self._snapshotters = []
+        cycle_epochs = 0
+        if snapshot_cycles:
+            for member, (path, variables) in enumerate(self._members):
+                directory = path + SNAPSHOTS_DIRECTORY
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+                self._snapshotters.append(Checkpointer(
+                    self._session, variables, directory + "snapshot",
+                    scores=snapshot_scores[member]))
+            cycle_epochs = self.config.num_epochs // snapshot_cycles
+
+        epoch = first_epoch - 1
+        for epoch in xrange(first_epoch, self.config.num_epochs + 1):
             logging.debug("Starting epoch %s", epoch)
-            for minibatch_indices in self._iterate_minibatches(
-                    self.config.batch_size):
-                feed_dict = self._feed_dictionary(
-                    self.x_train, self.y_train, self.seq_lens_train,
-                    self.config.dropout, minibatch_indices)
-                self._session.run(self.network.optimize, feed_dict)
-
-            # Evaluate and checkpoint the model at regular intervals.
-            if epoch % EVALUATION_FREQ == 0 or epoch == self.config.num_epochs:
+            if self._num_synthetic_recipes > 0 and epoch > 1:
+                self._resample_synthetic_recipes(epoch)
+            # The states of the random number generators that shuffle the
+            # minibatches of the epoch, from which they are drawn again when
+            # training resumes in the middle of the epoch.
+            epoch_random_states = np.random.get_state(), random.getstate()
+            start_time = time.time()
+            # Skip the minibatches trained on before training was resumed.
+            minibatches = itertools.islice(self._training_minibatches(),
+                                           position, None)
+            for inputs, labels, seq_lens in minibatches:
+                if snapshot_cycles:
+                    learning_rate = cyclic_cosine_learning_rate(
+                        self.config.learning_rate, step,
+                        cycle_epochs * steps_per_epoch)
+                else:
+                    learning_rate = scheduled_learning_rate(
+                        self.config.learning_rate, step, steps_per_epoch,
+                        self.config.num_epochs, self.config.warmup_epochs,
+                        self.config.learning_rate_decay,
+                        self.config.learning_rate_decay_rate)
+                self._train_step(inputs, labels, seq_lens, learning_rate)
+                step += 1
+                position += 1
+                num_examples += seq_lens.shape[-1]
+                if training_state_steps and step % training_state_steps == 0:
+                    state_saver.save(step, {
+                        "epoch": epoch, "position": position, "step": step,
+                        "random_states": epoch_random_states,
+                        "history": history, "num_examples": num_examples,
+                        "step_seconds": step_seconds +
+                                        time.time() - start_time,
+                        "elapsed_times": self._elapsed_times(start_times),
+                        "steps_per_epoch": steps_per_epoch,
+                        "snapshot_cycles": snapshot_cycles})
+            position = 0
+            step_seconds += time.time() - start_time
+
+            # Evaluate and checkpoint the model at regular intervals, and at
+            # the end of each cycle of the learning rate.
+            snapshot = snapshot_cycles and epoch % cycle_epochs == 0
+            if epoch % EVALUATION_FREQ == 0 or \
+                    epoch == self.config.num_epochs or snapshot:
                 # Log and plot errors and losses.
-                self._log_errors(epoch, train_errors, validate_errors)
-                self._log_losses(epoch, train_losses, validate_losses)
-
-                # Checkpoint the model.
-                self._checkpoint(epoch)
-
-                # Check if forced-early-stop is requested.
-                if self._stop(epoch):
-                    logging.info("Epoch = %s. Forced stop received.", epoch)
-                    break
+                self._log_errors_and_losses(epoch, active, train_errors,
+                                            validate_errors, train_losses,
+                                            validate_losses)
+
+                patience = self.config.early_stopping_patience
+                for member in list(active):
+                    # Checkpoint the member.
+                    score = self._validation_score(
+                        validate_errors[member][-1],
+                        validate_losses[member][-1])
+                    self._checkpoint(member, epoch, score,
+                                     validate_errors[member][-1],
+                                     validate_losses[member][-1])
+                    checkpoint_scores[member][epoch] = score
+                    if snapshot:
+                        self._snapshot(member, epoch, score,
+                                       validate_errors[member][-1],
+                                       validate_losses[member][-1])
+                        snapshot_scores[member][epoch] = score
+
+                    # Stop early if the member has stopped improving.
+                    if best_scores[member] is None or \
+                            score < best_scores[member]:
+                        best_scores[member] = score
+                        evaluations_since_best[member] = 0
+                    else:
+                        evaluations_since_best[member] += 1
+                    if patience is not None and not snapshot_cycles and \
+                            evaluations_since_best[member] >= patience:
+                        logging.info("%sEpoch = %s. Validation %s has not "
+                                     "improved for %s evaluations. Stopping "
+                                     "early.", self._member_prefix(member),
+                                     epoch, self.config.early_stopping_metric,
+                                     evaluations_since_best[member])
+                        active.remove(member)
             else:
                 logging.info("Epoch = %s complete.", epoch)
+            if training_state_steps:
+                # The state records the checkpoints of the epoch, so they
+                # must be on disk before it is.
+                for checkpointer in self._checkpointers + self._snapshotters:
+                    checkpointer.wait()
+                state_saver.save(step, {
+                    "epoch": epoch + 1, "position": 0, "step": step,
+                    "random_states": (np.random.get_state(),
+                                      random.getstate()),
+                    "history": history, "num_examples": num_examples,
+                    "step_seconds": step_seconds,
+                    "elapsed_times": self._elapsed_times(start_times),
+                    "steps_per_epoch": steps_per_epoch,
+                    "snapshot_cycles": snapshot_cycles})
+            if not active:
+                break
+        # Wait for the pending checkpoints and plots to be written.
+        for checkpointer in self._checkpointers + self._snapshotters:
+            checkpointer.close()
         # Training complete. Perform session cleanup before exiting.
         self._post_training_cleanup()
+        self._write_training_summary(start_times, epoch, snapshot_cycles,
+                                     num_examples / max(step_seconds, 1e-9))
 
     def restore(self, model_path):
         """Restores a saved model.
@@ -283,22 +635,59 @@ class Model(object):
         self._saver.restore(self._session, model_path)
         logging.info("Model loaded from checkpoint: %s", model_path)
 
+    def variable_values(self):
+        """Returns the current values of the trainable variables of the network.
+
+        Returns:
+            dict: Maps un-scoped names of the variables, such as "p" or
+            "BiRNN/FW/LSTMCell/W_0", to their values as `numpy.ndarray`s.
+        """
+        names = sorted(self._variables)
+        values = self._session.run([self._variables[name] for name in names])
+        return dict(zip(names, values))
+
+    def fingerprint(self):
+        """Returns a digest of the current weights, vocabulary,
+        pre-processing settings and labels of the model.
+
+        Returns:
+            str: The digest, as returned by `utils.prediction_fingerprint`.
+        """
+        return prediction_fingerprint(self.variable_values(), self._dataset,
+                                      self.labels_reverse_map)
+
+    def artifact_member(self):
+        """Returns the parts of the model that are packaged in an artifact.
+
+        Returns:
+            dict: The model, as expected by `artifact.write_artifact`.
+        """
+        with open(self._path + VOCAB_FILE, 'rb') as f:
+            vocabulary_dump = f.read()
+        return {"variables": self.variable_values(),
+                "vocabulary_dump": vocabulary_dump,
+                "labels_reverse_map": self.labels_reverse_map,
+                "stem": self.stem}
+
     def evaluate(self):
         """Evaluates a trained model on the loaded test data.
         """
         logging.info("Starting evaluation.")
-        test_error = self._test_error()
-        logging.info("Test Error = %s", test_error)
+        test_error, test_loss = self._error_and_loss(
+            self.x_test, self.y_test, self.seq_lens_test, 1.0)
+        logging.info("Test Error = %s, Test Loss = %s", test_error, test_loss)
 
     def predictions(self, inputs, seq_lens=None, preprocess=True):
         """Generates and returns predictions for given input descriptions.
 
         Args:
-            inputs (`list` of `str` or `numpy.ndarray`): List of input
-                descriptions. The descriptions can either be tokenized -- as a
-                2D numpy array of tokens -- in which case `preprocess` should be
-                `False` or raw strings of texts -- `list` of `str` -- in which
-                case `preprocess` should be `True`.
+            inputs (`list` of `str` or `numpy.ndarray` or
+                `dataset.PreprocessedInputs`): List of input descriptions. The
+                descriptions can either be tokenized -- as a 2D numpy array of
+                tokens -- in which case `preprocess` should be `False` or raw
+                strings of texts -- `list` of `str` or
+                `dataset.PreprocessedInputs` -- in which case `preprocess`
+                should be `True`.
             seq_lens (`list` of `int`, optional): The list of lengths of
                 descriptions as returned by
                 `dataset.Dataset.description_lengths_before_padding`. This is
@@ -311,23 +700,60 @@ class Model(object):
             numpy.ndarray: Softmax output of the network.
 
         """
+        feed_dict = self.prediction_feed_dictionary(inputs, seq_lens,
+                                                    preprocess)
+        predictions = self._session.run(self.network.prediction, feed_dict)
+        for i in xrange(len(predictions)):
+            predictions[i] = softmax(predictions[i])
+        return predictions
+
+    def prediction_feed_dictionary(self, inputs, seq_lens=None,
+                                   preprocess=True):
+        """Creates the feed-dictionary required to generate predictions for
+        given input descriptions.
+
+        Args:
+            inputs (`list` of `str` or `numpy.ndarray` or
+                `dataset.PreprocessedInputs`): List of input descriptions, as
+                accepted by `predictions`.
+            seq_lens (`list` of `int`, optional): The list of lengths of
+                descriptions, as accepted by `predictions`. Defaults to `None`.
+            preprocess (bool, optional): Set to `True` if the `inputs` needs to
+                be pre-processed. Defaults to `True`.
+
+        Returns:
+            dict: A dictionary that can be used as "feed-dictionary" to compute
+            `self.network.prediction`.
+        """
         # Pre-process the inputs if required. Otherwise, the inputs are assumed
         # to already be tokenized and pre-processed.
-        if preprocess:
+        if isinstance(inputs, PreprocessedInputs):
+            inputs, seq_lens = inputs.for_dataset(self._dataset)
+        elif preprocess:
             inputs, seq_lens = self._dataset.preprocess_inputs(inputs)
         # Since we are predicting the labels and not evaluating the
         # predictions against true labels, we don't care about true labels -- in
         # fact, we don't have access to the true labels. Create dummy labels
         # to feed to the `tf.placeholder` corresponding to labels in the
         # network.
-        dummy_labels = np.zeros(shape=(len(inputs), len(self.labels_map)))
-        feed_dict = self._feed_dictionary(inputs, dummy_labels, seq_lens, 1.0)
-        predictions = self._session.run(self.network.prediction, feed_dict)
-        for i in xrange(len(predictions)):
-            predictions[i] = softmax(predictions[i])
-        return predictions
+        dummy_labels = np.zeros(len(inputs), dtype=np.int32)
+        return self._feed_dictionary(inputs, dummy_labels, seq_lens, 1.0)
 
-    def _convert_to_one_hot(self, labels):
+    def preprocessed_inputs(self, inputs):
+        """Tokenizes and, optionally, stems raw input descriptions so that they
+        can be shared by several models.
+
+        Args:
+            inputs (`list` of `str`): List of raw input descriptions.
+
+        Returns:
+            `dataset.PreprocessedInputs`: Tokenized descriptions, which can be
+            passed in place of `inputs` to `predictions` of any model with the
+            same stemming setting.
+        """
+        return PreprocessedInputs(inputs, self._dataset)
+
+    def _convert_to_ids(self, labels):
         raise NotImplementedError("Abstract method")
 
     def _create_label_maps(self):
@@ -350,6 +776,122 @@ class Model(object):
 
         logging.info("Created `labels_map` and `labels_reverse_map`.")
 
+    @staticmethod
+    def _scoped_variables(scope, variables):
+        """Filters the variables created under the variable scope `scope`.
+
+        Args:
+            scope (str): Name of the variable scope. An empty string selects
+                all variables.
+            variables (`list` of `tf.Variable`): Variables to filter.
+
+        Returns:
+            `list` of `tf.Variable`: Variables created under `scope`.
+        """
+        if not scope:
+            return variables
+        return [var for var in variables
+                if var.op.name.startswith(scope + "/")]
+
+    @staticmethod
+    def _unscoped_name(scope, var):
+        """Returns the name of the variable `var` without the prefix of the
+        variable scope `scope`.
+
+        Args:
+            scope (str): Name of the variable scope `var` was created in.
+            var (`tf.Variable`): The variable.
+
+        Returns:
+            str: Name of the variable, as it would be without the scope.
+        """
+        if not scope:
+            return var.op.name
+        return var.op.name[len(scope) + 1:]
+
+    def _stacked(self):
+        """Returns `True` if the network is a
+        `rnn.StackedLatentAttentionNetwork`."""
+        return isinstance(self.network, StackedLatentAttentionNetwork)
+
+    def _member_prefix(self, member):
+        """Returns the prefix of the log messages about a member of the
+        network; empty for a single network."""
+        if not self._stacked():
+            return ""
+        return "Member {}: ".format(self._members[member][0])
+
+    def _training_minibatches(self):
+        """Yields the training minibatches of one epoch.
+
+        Each member of a stacked network draws its own shuffled minibatches,
+        and the minibatches of all the members are stacked along a leading
+        member axis. Partial minibatches are then dropped, since the members
+        must be fed minibatches of the same size.
+
+        Yields:
+            `numpy.ndarray`, `numpy.ndarray`, `numpy.ndarray`: The inputs,
+            labels, and lengths of a minibatch.
+        """
+        arrays = (self.x_train, self.y_train, self.seq_lens_train)
+        if not self._stacked():
+            for minibatch in prefetched_minibatches(
+                    arrays, self.config.batch_size,
+                    self.config.num_prefetched_batches,
+                    keep_partial_batch=self.config.keep_partial_batch,
+                    lengths=self.seq_lens_train,
+                    bucket_window=self.config.bucket_window):
+                yield minibatch
+            return
+
+        member_minibatches = [
+            prefetched_minibatches(
+                arrays, self.config.batch_size,
+                self.config.num_prefetched_batches, keep_partial_batch=False,
+                lengths=self.seq_lens_train,
+                bucket_window=self.config.bucket_window)
+            for _ in self._members]
+        for minibatches in itertools.izip(*member_minibatches):
+            yield tuple(np.stack(member_arrays)
+                        for member_arrays in zip(*minibatches))
+
+    def _train_step(self, inputs, labels, seq_lens, learning_rate=None):
+        """Updates the network with the gradients of a minibatch.
+
+        With gradient workers, the minibatch is split into shards of nearly
+        equal sizes, whose gradients are computed in parallel and averaged.
+
+        Args:
+            inputs (numpy.ndarray): Inputs of the minibatch.
+            labels (numpy.ndarray): True labels of the inputs.
+            seq_lens (numpy.ndarray): Lengths of the inputs.
+            learning_rate (float, optional): Learning rate of the update.
+                Defaults to `None`, i.e., `config.learning_rate`.
+        """
+        optimize_feed_dict = {}
+        if learning_rate is not None:
+            optimize_feed_dict[self.network.learning_rate] = learning_rate
+        if self._gradient_workers is None:
+            feed_dict = self._feed_dictionary(inputs, labels, seq_lens,
+                                              self.config.dropout)
+            feed_dict.update(optimize_feed_dict)
+            self._session.run(self.network.optimize, feed_dict)
+            return
+
+        shards = [indices for indices in np.array_split(
+            np.arange(len(seq_lens)), self._gradient_workers.num_shards)
+                  if len(indices) > 0]
+        feed_dicts = [self._feed_dictionary(inputs, labels, seq_lens,
+                                            self.config.dropout, indices)
+                      for indices in shards]
+        # The loss is a mean over the examples, so the gradients of the
+        # shards are weighted by their sizes.
+        weights = [len(indices) / float(len(seq_lens)) for indices in shards]
+        gradients = self._gradient_workers.gradients(self._session,
+                                                     feed_dicts, weights)
+        optimize_feed_dict.update(zip(self.network.gradients, gradients))
+        self._session.run(self.network.optimize, optimize_feed_dict)
+
     def _feed_dictionary(self, inputs, labels, seq_lens, dropout, indices=None):
         """Creates and returns the feed-dictionary required to run tf operations
 
@@ -371,223 +913,291 @@ class Model(object):
         Returns:
             dict: A dictionary that can be used as "feed-dictionary" to load
             values in network's `tf.placeholders` to perform desired operations.
+            The inputs are trimmed to the longest of them, which does not change
+            the outputs of the network. A stacked network is fed either one
+            minibatch per member, stacked along the first axis, or the same
+            examples for all the members.
         """
+        inputs = np.asarray(inputs)
+        seq_lens = np.asarray(seq_lens)
+        if indices is not None:
+            inputs = inputs[indices]
+            labels = labels[indices]
+            seq_lens = seq_lens[indices]
+        if seq_lens.size > 0:
+            inputs = inputs[..., :max(1, seq_lens.max())]
+        if self._stacked() and seq_lens.ndim == 1:
+            num_members = len(self._members)
+            inputs = np.tile(inputs, (num_members, 1, 1))
+            labels = np.tile(labels, (num_members, 1))
+            seq_lens = np.tile(seq_lens, (num_members, 1))
+
         feed_dict = dict()
-        if indices is None:
-            feed_dict[self.network.inputs] = inputs
-            feed_dict[self.network.labels] = labels
-            feed_dict[self.network.seq_lens] = seq_lens
-        else:
-            feed_dict[self.network.inputs] = inputs[indices]
-            feed_dict[self.network.labels] = labels[indices]
-            feed_dict[self.network.seq_lens] = seq_lens[indices]
+        feed_dict[self.network.inputs] = inputs
+        feed_dict[self.network.labels] = labels
+        feed_dict[self.network.seq_lens] = seq_lens
 
         feed_dict[self.network.dropout] = dropout
         return feed_dict
 
-    def _iterate_minibatches(self, batch_size, shuffle=True):
-        """Yields list of indices for each mini-batch.
-
-        The last mini-batch is not used because it, usually, has a different
-        size. Since training set is shuffled before creating mini-batches, the
-        training examples in the ignored mini-batches are used in  some other
-        mini-batch in, at least, one epoch with high probability.
-        
-        If `batch_size` is smaller than the size of input, then `batch_size` is
-        set to the size of input.
+    def _resample_synthetic_recipes(self, epoch):
+        """Replaces the synthetic recipes at the end of the train set with a
+        fresh sample.
 
         Args:
-            batch_size (int): Size of each mini-batch.
-            shuffle (bool, optional): Set to `True` if the training set should
-                be shuffled before each epoch. Defaults to `True`.
-
-        Yields:
-            list: List of indices corresponding to a mini-batch.
-        """
-        num_input = self.x_train.shape[0]
-        if batch_size > num_input:
-            batch_size = num_input
-        indices = np.arange(num_input)
-        if shuffle:
-            np.random.shuffle(indices)
-        for start_idx in range(0, num_input - batch_size + 1, batch_size):
-            minibatch = indices[start_idx:start_idx + batch_size]
-            yield minibatch
-
-    def _log_errors(self, epoch, train_errors, validate_errors):
-        """Logs current errors on training and validation sets.
-
-        Additionally, the current errors are added to the list of errors
-        `train_errors` and `validate_errors`.
-
-        Args:
-            epoch (int): Epoch number.
-            train_errors (`list` of `float`): Training errors.
-            validate_errors (`list` of `float`): Validation errors.
+            epoch (int): Epoch number. The sample is drawn with the seed
+                `self._synthetic_recipes_seed + epoch - 1`.
         """
-        train_error = self._training_error()
-        validate_error = self._validation_error()
-        logging.info("Epoch = %s complete. Train Error = %s, "
-                     "Validate Error = %s", epoch, train_error, validate_error)
-
-        # Add errors to the accumulated errors lists for plotting.
-        train_errors.append(train_error)
-        validate_errors.append(validate_error)
-        self._plot_errors(train_errors, validate_errors)
-        logging.info("Epoch = %s. Error plots saved.", epoch)
-
-    def _log_losses(self, epoch, train_losses, validate_losses):
-        """Logs current losses on training and validation sets.
-
-        Additionally, the current losses are added to the list of losses
-        `train_losses` and `validate_losses`.
+        descriptions, labels = SyntheticDataset.sample_synthetic_recipes(
+            self._num_synthetic_recipes,
+            self._synthetic_recipes_seed + epoch - 1)
+        inputs, seq_lens = self._dataset.preprocess_inputs(descriptions)
+        num_fixed = self.x_train.shape[0] - self._num_synthetic_recipes
+        self.x_train = np.concatenate(
+            (self.x_train[:num_fixed], inputs))
+        self.y_train = np.concatenate(
+            (self.y_train[:num_fixed], self._convert_to_ids(labels)))
+        self.seq_lens_train = np.concatenate(
+            (self.seq_lens_train[:num_fixed], seq_lens))
+        logging.debug("Epoch = %s. Drew %s synthetic recipes.", epoch,
+                      self._num_synthetic_recipes)
+
+    def _log_errors_and_losses(self, epoch, members, train_errors,
+                               validate_errors, train_losses, validate_losses):
+        """Logs current errors and losses of `members` on training and
+        validation sets.
+
+        Additionally, the current errors and losses of each member k are added
+        to the lists `train_errors[k]`, `validate_errors[k]`,
+        `train_losses[k]`, and `validate_losses[k]`.
 
         Args:
             epoch (int): Epoch number.
-            train_losses (`list` of `float`): Training losses.
-            validate_losses (`list` of `float`): Validation losses.
-        """
-        train_loss = self._training_loss()
-        validate_loss = self._validation_loss()
-        logging.info("Epoch = %s complete. Train Loss = %s, "
-                     "Validate Loss = %s", epoch, train_loss, validate_loss)
-
-        # Add losses to the accumulated losses lists for plotting.
-        train_losses.append(train_loss)
-        validate_losses.append(validate_loss)
-        self._plot_losses(train_losses, validate_losses)
-        logging.info("Epoch = %s. Loss plots saved.", epoch)
-
-    def _training_error(self):
-        """Computes model's error on the training set.
-
-        Returns:
-            float: Model's error on the training set.
+            members (`list` of `int`): Members to be logged.
+            train_errors (`list` of `list` of `float`): Training errors of
+                each member.
+            validate_errors (`list` of `list` of `float`): Validation errors
+                of each member.
+            train_losses (`list` of `list` of `float`): Training losses of
+                each member.
+            validate_losses (`list` of `list` of `float`): Validation losses
+                of each member.
         """
-        feed_dict = self._feed_dictionary(
+        train_error, train_loss = self._error_and_loss(
             self.x_train, self.y_train, self.seq_lens_train,
             self.config.dropout)
-        return self._session.run(self.network.error, feed_dict)
-
-    def _validation_error(self):
-        """Computes model's error on the validation set.
-
-        Returns:
-            float: Model's error on the validation set.
-        """
-        feed_dict = self._feed_dictionary(self.x_validate, self.y_validate,
-                                          self.seq_lens_val, 1.0)
-        return self._session.run(self.network.error, feed_dict)
+        validate_error, validate_loss = self._error_and_loss(
+            self.x_validate, self.y_validate, self.seq_lens_val, 1.0)
+        # A single network has scalar errors and losses; a stacked one has
+        # those of each member.
+        train_error, train_loss, validate_error, validate_loss = [
+            np.atleast_1d(values).tolist() for values in
+            (train_error, train_loss, validate_error, validate_loss)]
+        for member in members:
+            prefix = self._member_prefix(member)
+            logging.info("%sEpoch = %s complete. Train Error = %s, "
+                         "Validate Error = %s", prefix, epoch,
+                         train_error[member], validate_error[member])
+            logging.info("%sEpoch = %s complete. Train Loss = %s, "
+                         "Validate Loss = %s", prefix, epoch,
+                         train_loss[member], validate_loss[member])
+
+            # Add errors and losses to the accumulated lists for plotting. The
+            # plots are rendered on the writer thread, from copies of the
+            # lists.
+            path = self._members[member][0]
+            checkpointer = self._checkpointers[member]
+            train_errors[member].append(train_error[member])
+            validate_errors[member].append(validate_error[member])
+            checkpointer.submit(self._plot_errors, path,
+                                list(train_errors[member]),
+                                list(validate_errors[member]))
+            train_losses[member].append(train_loss[member])
+            validate_losses[member].append(validate_loss[member])
+            checkpointer.submit(self._plot_losses, path,
+                                list(train_losses[member]),
+                                list(validate_losses[member]))
+
+    def _error_and_loss(self, inputs, labels, seq_lens, dropout):
+        """Computes model's error and loss on a dataset.
+
+        The dataset is fed in chunks of at most `self.config.eval_chunk_size`
+        examples of similar lengths, and the error and the loss of each chunk
+        are computed in the same run.
 
-    def _test_error(self):
-        """Computes model's error on the test set.
-
-        Returns:
-            float: Model's error on the test set.
-        """
-        feed_dict = self._feed_dictionary(self.x_test, self.y_test,
-                                          self.seq_lens_test, 1.0)
-        return self._session.run(self.network.error, feed_dict)
-
-    def _training_loss(self):
-        """Computes model's loss on the training set.
-
-        Returns:
-            float: Model's loss on the training set.
-        """
-        feed_dict = self._feed_dictionary(self.x_train, self.y_train,
-                                          self.seq_lens_train,
-                                          self.config.dropout)
-        return self._session.run(self.network.loss, feed_dict)
-
-    def _validation_loss(self):
-        """Computes model's loss on the validation set.
+        Args:
+            inputs (numpy.ndarray): Inputs of the dataset.
+            labels (numpy.ndarray): True labels of the inputs.
+            seq_lens (numpy.ndarray): Lengths of the inputs.
+            dropout (float): Value of dropout to be used for RNN.
 
         Returns:
-            float: Model's loss on the validation set.
+            float, float: Model's error and loss on the dataset. For a stacked
+            network, `numpy.ndarray`s of the error and loss of each member.
         """
-        feed_dict = self._feed_dictionary(self.x_validate, self.y_validate,
-                                          self.seq_lens_val, 1.0)
-        return self._session.run(self.network.loss, feed_dict)
-
-    def _plot_errors(self, train_errors, validate_errors):
+        total_error, total_loss = 0., 0.
+        for indices in evaluation_chunks(seq_lens,
+                                         self.config.eval_chunk_size):
+            feed_dict = self._feed_dictionary(inputs, labels, seq_lens,
+                                              dropout, indices)
+            error, loss = self._session.run(
+                [self.network.error, self.network.loss], feed_dict)
+            total_error += error * len(indices)
+            total_loss += loss * len(indices)
+        return total_error / len(seq_lens), total_loss / len(seq_lens)
+
+    def _plot_errors(self, path, train_errors, validate_errors):
         """Plots training and validation errors.
 
         Args:
+            path (str): Experiment directory of the plotted member.
             train_errors (`list` of `float`): Training errors.
             validate_errors (`list` of `float`): Validation errors.
         """
-        figure_path = self._path + "plots/train-validation-error-curve"
+        figure_path = path + "plots/train-validation-error-curve"
         x = [e * EVALUATION_FREQ for e in xrange(1, len(train_errors) + 1)]
-        fig, ax = plt.subplots(1, 1)
+        # Figures are made without `pyplot`, whose global state is not
+        # thread-safe.
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
         ax.set_xlabel('Number of epochs of training')
         ax.set_ylabel('Error')
-        plt.plot(x, train_errors, 'r', label='training')
-        plt.plot(x, validate_errors, 'b', label='validation')
-        plt.legend(loc="best", framealpha=0.3)
+        ax.plot(x, train_errors, 'r', label='training')
+        ax.plot(x, validate_errors, 'b', label='validation')
+        ax.legend(loc="best", framealpha=0.3)
         fig.savefig(figure_path)
-        plt.close('all')
+        logging.info("Epoch = %s. Error plots saved.", x[-1])
 
-    def _plot_losses(self, train_losses, validate_losses):
+    def _plot_losses(self, path, train_losses, validate_losses):
         """Plots training and validation losses.
 
         Args:
+            path (str): Experiment directory of the plotted member.
             train_losses (`list` of `float`): Training losses.
             validate_losses (`list` of `float`): Validation losses.
         """
-        figure_path = self._path + "plots/train-validation-loss-curve"
+        figure_path = path + "plots/train-validation-loss-curve"
         x = [e * EVALUATION_FREQ for e in xrange(1, len(train_losses) + 1)]
-        fig, ax = plt.subplots(1, 1)
+        # Figures are made without `pyplot`, whose global state is not
+        # thread-safe.
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
         ax.set_xlabel('Number of epochs of training')
         ax.set_ylabel('Cross-entropy loss')
-        plt.plot(x, train_losses, 'r', label='training')
-        plt.plot(x, validate_losses, 'b', label='validation')
-        plt.legend(loc="best", framealpha=0.3)
+        ax.plot(x, train_losses, 'r', label='training')
+        ax.plot(x, validate_losses, 'b', label='validation')
+        ax.legend(loc="best", framealpha=0.3)
         fig.savefig(figure_path)
-        plt.close('all')
+        logging.info("Epoch = %s. Loss plots saved.", x[-1])
 
-    def _checkpoint(self, epoch):
-        """Saves a checkpoint of the model.
+    def _validation_score(self, validate_error, validate_loss):
+        """Returns the validation metric selected by
+        `config.early_stopping_metric`.
 
         Args:
+            validate_error (float): Validation error.
+            validate_loss (float): Validation loss.
+
+        Returns:
+            float: The validation error or loss.
+        """
+        if self.config.early_stopping_metric == "loss":
+            return validate_loss
+        elif self.config.early_stopping_metric == "error":
+            return validate_error
+        logging.error("Illegal early-stopping metric: %s",
+                      self.config.early_stopping_metric)
+        raise ValueError
+
+    def _checkpoint(self, member, epoch, score, validate_error, validate_loss):
+        """Saves a checkpoint of a member of the model on the writer thread.
+
+        Checkpoints that are neither among the `config.checkpoints_keep_best`
+        ones with the lowest `score` nor among the
+        `config.checkpoints_keep_last` most recent ones are deleted.
+
+        Args:
+            member (int): Index of the member, 0 for a single network.
             epoch (int): Epoch number, to be used to name the checkpoint file.
+            score (float): Validation metric of the model, as returned by
+                `_validation_score`.
+            validate_error (float): Validation error of the model.
+            validate_loss (float): Validation loss of the model.
         """
-        self._saver.save(self._session, self._path + "model-checkpoints/model",
-                         global_step=epoch)
-        logging.info("Epoch = %s. Checkpoint dumped.", epoch)
+        self._checkpointers[member].save(epoch, score,
+                                         {"validation_error": validate_error,
+                                          "validation_loss": validate_loss})
 
-    def _post_training_cleanup(self):
-        """Runs cleanup operations after training is complete.
+    def _snapshot(self, member, epoch, score, validate_error, validate_loss):
+        """Saves a snapshot of a member of the model, at the end of a cycle of
+        the learning rate, on the writer thread.
 
-        The operations performed are:
-            1. Delete the tf graph.
-            2. Close tf session.
+        Args:
+            member (int): Index of the member, 0 for a single network.
+            epoch (int): Epoch number, to be used to name the snapshot file.
+            score (float): Validation metric of the model, as returned by
+                `_validation_score`.
+            validate_error (float): Validation error of the model.
+            validate_loss (float): Validation loss of the model.
         """
-        logging.info("Performing post-training cleanup.")
-        tf.reset_default_graph()
-        self._session.close()
+        self._snapshotters[member].save(epoch, score,
+                                        {"validation_error": validate_error,
+                                         "validation_loss": validate_loss})
 
-    def _stop(self, epoch):
-        """Reads the "stop-file" to check if forced-early-stop is requested.
+    def _write_training_summary(self, start_times, num_epochs,
+                                snapshot_cycles, examples_per_second):
+        """Records the cost of training in the experiment directory of each
+        member.
 
-        The training can be prematurely -- and cleanly -- stopped by writing
-        "stop" (without quotes) in the "stop-file" located at `STOP_FILE`. This
-        method reads the file to check if such a forced-early-stop is requested.
+        The CPU time includes that of the gradient workers. The members of a
+        stacked network are charged equal shares of it.
 
         Args:
-            epoch (int): Epoch number, used only for logging purposes.
+            start_times (tuple): Value of `os.times()` when training started.
+            num_epochs (int): Number of epochs trained.
+            snapshot_cycles (int): Number of cycles of the learning rate.
+            examples_per_second (float): Number of examples of each member
+                trained on per second of training steps, i.e., excluding the
+                evaluations and checkpoints.
+        """
+        times = os.times()
+        cpu_seconds = sum(times[i] - start_times[i] for i in xrange(4))
+        summary = {"cpu_seconds": cpu_seconds / len(self._members),
+                   "wall_seconds": times[4] - start_times[4],
+                   "epochs": num_epochs,
+                   "snapshot_cycles": snapshot_cycles,
+                   "members_trained_together": len(self._members),
+                   "batch_size": self.config.batch_size,
+                   "learning_rate": self.config.learning_rate,
+                   "warmup_epochs": self.config.warmup_epochs,
+                   "learning_rate_decay": self.config.learning_rate_decay,
+                   "examples_per_second": examples_per_second}
+        for path, _ in self._members:
+            with open(path + TRAINING_SUMMARY, 'w') as f:
+                json.dump(summary, f, indent=2, sort_keys=True)
+        logging.info("Training took %.1f CPU-seconds, at %.0f examples per "
+                     "second.", cpu_seconds, examples_per_second)
+
+    @staticmethod
+    def _elapsed_times(start_times):
+        """Returns the times elapsed since `start_times`, a value of
+        `os.times()`, in the format of `os.times()`."""
+        return tuple(now - start for now, start in
+                     zip(os.times(), start_times))
 
-        Returns:
-            bool: `True` if forced-early-stop is requested.
+    def _post_training_cleanup(self):
+        """Runs cleanup operations after training is complete.
+
+        The operations performed are:
+            1. Stop the gradient workers, if any.
+            2. Delete the tf graph.
+            3. Close tf session.
         """
-        logging.info("Epoch = %s. Reading 'stop-file'", epoch)
-        text = "default"
-        try:
-            fin = open(STOP_FILE, 'r')
-            text = fin.read()
-        except Exception as e:
-            logging.warning("Epoch = %s. Unable to read 'Stop-file' at %s. "
-                            "Exception: %s", epoch, STOP_FILE, e)
-            pass
-        finally:
-            return "stop" in text
+        logging.info("Performing post-training cleanup.")
+        if self._gradient_workers is not None:
+            self._gradient_workers.close()
+            self._gradient_workers = None
+        tf.reset_default_graph()
+        self._session.close()
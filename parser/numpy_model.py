@@ -0,0 +1,262 @@
+"""
+Runs models exported from Tensorflow checkpoints using NumPy alone.
+
+The trained models of an ensemble are exported with `parser.export` into an
+artifact (see `artifact`), which contains the variables of their networks,
+their vocabularies, and their label maps. `NumpyModel` loads a model from the
+artifact and reproduces `model.Model.predictions` without importing
+Tensorflow. The softmax predictions agree with those of Tensorflow to within an
+absolute difference of `TOLERANCE`.
+"""
+
+import logging
+
+import numpy as np
+
+from parser.dataset import Dataset, PreprocessedInputs
+from parser.utils import prediction_fingerprint, softmax
+
+TOLERANCE = 1e-5
+"""float: Maximum absolute difference between the softmax predictions of
+`NumpyModel` and those of `model.Model` for the same checkpoint."""
+
+_FORGET_BIAS = 1.0
+"""float: Bias added to the forget gate of the LSTM cells, which is the default
+of `tf.nn.rnn_cell.LSTMCell`."""
+_L2_NORMALIZE_EPSILON = 1e-12
+"""float: Lower bound on the squared norm in `tf.nn.l2_normalize`."""
+
+
+def _sigmoid(x):
+    return 1. / (1. + np.exp(-x))
+
+
+def _softmax_over_time(x):
+    """Softmax over the second dimension, like `tf.nn.softmax(x, dim=1)`."""
+    e = np.exp(x - np.max(x, axis=1, keepdims=True))
+    return e / np.sum(e, axis=1, keepdims=True)
+
+
+class NumpyModel(object):
+    """Model that runs the network of an exported `model.Model` in NumPy.
+
+    The model exposes the methods of `model.Model` used by
+    `ensembled_model.EnsembledModel` to compute predictions, so that an ensemble
+    can be made of `NumpyModel`s. The artifact carries no test set, so
+    `x_test`, `y_test`, and `seq_lens_test` are `None`, and ensembles of
+    `NumpyModel`s cannot be evaluated on it.
+
+    Attributes:
+        labels_map (dict): Maps `str` label keywords to `int` ids.
+        labels_reverse_map (dict): Maps `int` ids to corresponding `str` labels.
+        config: A configuration class, similar to `configs.PaperConfigurations`.
+        stem (bool): Set to True if the input descriptions should be stemmed.
+        x_test (numpy.ndarray): `None`.
+        y_test (numpy.ndarray): `None`.
+        seq_lens_test (numpy.ndarray): `None`.
+
+    Args:
+        config: A configuration class, similar to `configs.PaperConfigurations`.
+            It must be the configuration the exported model was trained with.
+    """
+
+    def __init__(self, config):
+        self.labels_map = {}
+        self.labels_reverse_map = {}
+        self.config = config
+        self.stem = True
+
+        self.x_test = None
+        self.y_test = None
+        self.seq_lens_test = None
+
+        self._dataset = Dataset(stem=self.stem, config=self.config)
+        """`dataset.Dataset`: Instance of Dataset class to handle
+        pre-processing of inputs for the model."""
+        self._variables = {}
+        """dict: Maps un-scoped names of the network's variables to their
+        values."""
+
+    def load(self, artifact, i):
+        """Loads a model from an artifact.
+
+        The variables are not copied; they remain backed by the memory-mapped
+        artifact.
+
+        Args:
+            artifact (`artifact.ModelArtifact`): The artifact.
+            i (int): Index of the model in the artifact.
+        """
+        self.stem = artifact.stem(i)
+        self._dataset = Dataset(stem=self.stem, config=self.config)
+        self._dataset.load_vocabulary_dump(artifact.vocabulary_dump(i))
+
+        self.labels_reverse_map = artifact.labels_reverse_map(i)
+        self.labels_map = {label: label_id for label_id, label
+                           in self.labels_reverse_map.items()}
+
+        self._variables = artifact.variables(i)
+        self._check_shapes()
+        logging.info("Model %s loaded from artifact: %s", i, artifact.path)
+
+    def fingerprint(self):
+        """Returns a digest of the weights, vocabulary, pre-processing settings
+        and labels of the model, as `model.Model.fingerprint` does.
+
+        Returns:
+            str: The digest, as returned by `utils.prediction_fingerprint`.
+        """
+        return prediction_fingerprint(self._variables, self._dataset,
+                                      self.labels_reverse_map)
+
+    def predictions(self, inputs, seq_lens=None, preprocess=True):
+        """Generates and returns predictions for given input descriptions.
+
+        Args:
+            inputs (`list` of `str` or `numpy.ndarray` or
+                `dataset.PreprocessedInputs`): List of input descriptions, as
+                accepted by `model.Model.predictions`.
+            seq_lens (`list` of `int`, optional): The list of lengths of
+                descriptions, as accepted by `model.Model.predictions`.
+                Defaults to `None`.
+            preprocess (bool, optional): Set to `True` if the `inputs` needs to
+                be pre-processed. Defaults to `True`.
+
+        Returns:
+            numpy.ndarray: Softmax output of the network.
+        """
+        if isinstance(inputs, PreprocessedInputs):
+            inputs, seq_lens = inputs.for_dataset(self._dataset)
+        elif preprocess:
+            inputs, seq_lens = self._dataset.preprocess_inputs(inputs)
+        predictions = self.logits(np.array(inputs), np.array(seq_lens))
+        for i in xrange(len(predictions)):
+            predictions[i] = softmax(predictions[i])
+        return predictions
+
+    def preprocessed_inputs(self, inputs):
+        """Tokenizes and, optionally, stems raw input descriptions so that they
+        can be shared by several models.
+
+        Args:
+            inputs (`list` of `str`): List of raw input descriptions.
+
+        Returns:
+            `dataset.PreprocessedInputs`: Tokenized descriptions.
+        """
+        return PreprocessedInputs(inputs, self._dataset)
+
+    def logits(self, inputs, seq_lens):
+        """Runs the network, as built by `rnn.LatentAttentionNetwork`, without
+        dropout.
+
+        Args:
+            inputs (numpy.ndarray): Pre-processed descriptions of shape
+                (num_inputs, `config.sent_size`).
+            seq_lens (numpy.ndarray): Lengths of the descriptions.
+
+        Returns:
+            numpy.ndarray: Logit predictions of shape (num_inputs, num_classes).
+        """
+        hidden_size = self.config.hidden_size
+        sent_size = self.config.sent_size
+        dictionary_embedding = self._variables["dict_embedding_matrix"][inputs]
+
+        # Bidirectional RNN embedding.
+        rnn_output_fw = self._lstm(dictionary_embedding, seq_lens, "BiRNN/FW")
+        reverse_indices = self._reverse_indices(seq_lens, sent_size)
+        rows = np.arange(len(inputs))[:, np.newaxis]
+        rnn_output_bw = self._lstm(dictionary_embedding[rows, reverse_indices],
+                                   seq_lens, "BiRNN/BW")
+        rnn_output_bw = rnn_output_bw[rows, reverse_indices]
+        embed = np.concatenate([rnn_output_fw, rnn_output_bw], axis=2)
+
+        # Latent attention.
+        embed_2d = embed.reshape((-1, 2 * hidden_size))
+        l_pre_softmax = np.dot(embed_2d, self._variables["u"]).reshape(
+            (-1, sent_size, 1))
+        latent_attention = _softmax_over_time(l_pre_softmax)
+
+        # Active attention.
+        a_pre_softmax = np.dot(embed_2d, self._variables["v"]).reshape(
+            (-1, sent_size, sent_size))
+        a = _softmax_over_time(a_pre_softmax)
+        w = np.matmul(a, latent_attention)
+
+        # Output representation.
+        squared_norm = np.sum(np.square(w), axis=1, keepdims=True)
+        w_normalized = w / np.sqrt(
+            np.maximum(squared_norm, _L2_NORMALIZE_EPSILON))
+        o = np.matmul(embed.transpose((0, 2, 1)), w_normalized)
+
+        # Prediction.
+        return np.dot(o.reshape((-1, 2 * hidden_size)),
+                      self._variables["p"].T)
+
+    def _lstm(self, inputs, seq_lens, scope):
+        """Runs an LSTM, as `tf.nn.dynamic_rnn` with `tf.nn.rnn_cell.LSTMCell`.
+
+        The outputs past the length of each sequence are zeros.
+
+        Args:
+            inputs (numpy.ndarray): Inputs of shape (num_inputs, `sent_size`,
+                `hidden_size`).
+            seq_lens (numpy.ndarray): Lengths of the sequences.
+            scope (str): Variable scope of the cell's variables.
+
+        Returns:
+            numpy.ndarray: Outputs of shape (num_inputs, `sent_size`,
+            `hidden_size`).
+        """
+        weights = self._variables[scope + "/LSTMCell/W_0"]
+        biases = self._variables[scope + "/LSTMCell/B"]
+        num_inputs, sent_size, hidden_size = inputs.shape
+        c = np.zeros((num_inputs, hidden_size), dtype=inputs.dtype)
+        h = np.zeros((num_inputs, hidden_size), dtype=inputs.dtype)
+        outputs = np.zeros_like(inputs)
+        for t in xrange(sent_size):
+            gates = np.dot(np.concatenate([inputs[:, t], h], axis=1),
+                           weights) + biases
+            i, j, f, o = np.split(gates, 4, axis=1)
+            new_c = (c * _sigmoid(f + _FORGET_BIAS) +
+                     _sigmoid(i) * np.tanh(j))
+            new_h = np.tanh(new_c) * _sigmoid(o)
+            # Sequences that have ended keep their state and output zeros.
+            active = (t < seq_lens)[:, np.newaxis]
+            c = np.where(active, new_c, c)
+            h = np.where(active, new_h, h)
+            outputs[:, t] = np.where(active, new_h, 0)
+        return outputs
+
+    @staticmethod
+    def _reverse_indices(seq_lens, sent_size):
+        """Returns the indices that reverse each sequence within its length, as
+        `tf.reverse_sequence` does. Positions past the length are unchanged.
+
+        Args:
+            seq_lens (numpy.ndarray): Lengths of the sequences.
+            sent_size (int): Padded length of the sequences.
+
+        Returns:
+            numpy.ndarray: Indices of shape (len(`seq_lens`), `sent_size`).
+        """
+        t = np.arange(sent_size)[np.newaxis, :]
+        lengths = seq_lens[:, np.newaxis]
+        return np.where(t < lengths, lengths - 1 - t, t)
+
+    def _check_shapes(self):
+        """Verifies that the loaded variables agree with `config` and the label
+        map.
+        """
+        expected_shapes = {
+            "dict_embedding_matrix": (self.config.vocab_size,
+                                      self.config.hidden_size),
+            "u": (2 * self.config.hidden_size, 1),
+            "v": (2 * self.config.hidden_size, self.config.sent_size),
+            "p": (len(self.labels_map), 2 * self.config.hidden_size)}
+        for name, shape in expected_shapes.items():
+            if self._variables[name].shape != shape:
+                logging.error("Variable %s of shape %s does not match the "
+                              "expected shape %s.", name,
+                              self._variables[name].shape, shape)
+                raise ValueError
@@ -62,7 +62,7 @@ def prepare_models_for_predictions(args, model_class):
         `list` of `model.Model`: List of restored models.
 
     """
-    assert(len(args.experiment_name) == len(args.saved_model_path))
+    saved_model_paths = utils.saved_model_paths(args)
     config = configs.PaperConfiguration
     log_configurations(config)
 
@@ -75,7 +75,7 @@ def prepare_models_for_predictions(args, model_class):
             model = model_class(config, expt_path, stem=True)
             model.load_labels_and_vocab()
             model.initialize_network(init_variables=False, graph=graph)
-            model.restore(args.saved_model_path[i])
+            model.restore(saved_model_paths[i])
             models.append(model)
     return models
 
@@ -0,0 +1,224 @@
+"""
+On-disk cache of pre-processed datasets.
+
+Loading a dataset through `dataset.Dataset` reads the recipe CSVs, tokenizes
+and stems every description, (optionally) builds the vocabulary, and pads or
+clips the descriptions. `PreprocessedCache` stores the outcome -- the token-id
+matrix, the lengths of the descriptions, the labels, and the vocabulary built,
+if any -- as `.npy` files, keyed by everything the outcome depends on. Later
+loads with the same key memory-map the files instead.
+
+The cache can be bounded in number of entries and in bytes. Loading an entry
+touches it, and saving an entry deletes the least recently touched ones beyond
+the bounds.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from parser.label import Label
+
+FORMAT_VERSION = 2
+"""int: Version of the layout of cache entries. It is part of every key, so
+that entries written with another layout are never read."""
+
+
+def file_fingerprint(path):
+    """Returns a digest of the contents of a file, or of all the files in a
+    directory.
+
+    Args:
+        path (str): Path of a file or a directory.
+
+    Returns:
+        str: The digest.
+    """
+    digest = hashlib.md5()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                file_path = os.path.join(root, filename)
+                digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+                digest.update(file_fingerprint(file_path).encode("utf-8"))
+    else:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PreprocessedCache(object):
+    """Directory of pre-processed datasets, one sub-directory per key.
+
+    Args:
+        directory (str): Root directory of the cache. It is created when the
+            first entry is saved.
+        max_entries (int, optional): Maximum number of entries. Defaults to
+            `None`, i.e., unbounded.
+        max_bytes (int, optional): Maximum total size of the entries, in
+            bytes. Defaults to `None`, i.e., unbounded.
+
+    Attributes:
+        directory (str): Root directory of the cache.
+        max_entries (int): Maximum number of entries, or `None`.
+        max_bytes (int): Maximum total size of the entries, or `None`.
+    """
+
+    def __init__(self, directory, max_entries=None, max_bytes=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def key(self, parts):
+        """Returns the key of the entry described by `parts`.
+
+        Args:
+            parts (dict): Everything the pre-processed dataset depends on, such
+                as fingerprints of the files read, the settings of the
+                dataset, and the arguments of the loading method. The values
+                must be serializable to JSON.
+
+        Returns:
+            str: The key.
+        """
+        parts = dict(parts, format_version=FORMAT_VERSION)
+        return hashlib.sha1(json.dumps(parts, sort_keys=True)
+                            .encode("utf-8")).hexdigest()
+
+    def load(self, key):
+        """Loads the entry with key `key`.
+
+        Args:
+            key (str): Key of the entry, as returned by `key`.
+
+        Returns:
+            `numpy.ndarray`, `list` of `Label`, `numpy.ndarray`, str: The
+            token-id matrix and the lengths of the descriptions, both
+            memory-mapped read-only, the labels, and the contents of the
+            vocabulary pickle dump, or `None` if no vocabulary was saved.
+            `None` if there is no such entry.
+        """
+        path = os.path.join(self.directory, key)
+        if not os.path.isdir(path):
+            return None
+        # The entry becomes the most recently used one (see `prune`).
+        os.utime(path, None)
+        inputs = np.load(os.path.join(path, "inputs.npy"), mmap_mode='r')
+        seq_lens = np.load(os.path.join(path, "seq_lens.npy"), mmap_mode='r')
+        fields = np.load(os.path.join(path, "labels.npy")).tolist()
+        present = np.load(os.path.join(path, "labels_present.npy")).tolist()
+        labels = [Label(*[field if is_present else None
+                          for field, is_present in zip(row, row_present)])
+                  for row, row_present in zip(fields, present)]
+        vocabulary_dump = None
+        vocabulary_path = os.path.join(path, "vocabulary.pickle")
+        if os.path.exists(vocabulary_path):
+            with open(vocabulary_path, 'rb') as f:
+                vocabulary_dump = f.read()
+        logging.info("Loaded %s pre-processed descriptions from cache %s",
+                     len(inputs), path)
+        return inputs, labels, seq_lens, vocabulary_dump
+
+    def save(self, key, inputs, labels, seq_lens, vocabulary_dump=None):
+        """Saves an entry with key `key`.
+
+        The entry is written to a temporary directory which is then renamed, so
+        that concurrent runs never see a partially written entry. The cache is
+        then pruned (see `prune`).
+
+        Args:
+            key (str): Key of the entry, as returned by `key`.
+            inputs (`list` of `list` of `int`): Padded or clipped descriptions
+                in the form of token ids.
+            labels (`list` of `Label`): Labels of the descriptions. Attributes
+                that are `None` are restored as `None`.
+            seq_lens (`list` of `int`): Lengths of the descriptions before they
+                were padded.
+            vocabulary_dump (str, optional): Contents of the vocabulary pickle
+                dump, if the vocabulary was built while loading. Defaults to
+                `None`.
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        temp_path = tempfile.mkdtemp(dir=self.directory)
+        try:
+            np.save(os.path.join(temp_path, "inputs.npy"),
+                    np.array(inputs, dtype=np.int32))
+            np.save(os.path.join(temp_path, "seq_lens.npy"),
+                    np.array(seq_lens, dtype=np.int32))
+            rows = [(label.trigger_channel, label.pure_trigger_fn,
+                     label.action_channel, label.pure_action_fn)
+                    for label in labels]
+            np.save(os.path.join(temp_path, "labels.npy"),
+                    np.array([[field or "" for field in row] for row in rows],
+                             dtype=np.str_).reshape((-1, 4)))
+            # Empty strings are legal values, so the missing attributes are
+            # recorded apart.
+            np.save(os.path.join(temp_path, "labels_present.npy"),
+                    np.array([[field is not None for field in row]
+                              for row in rows], dtype=bool).reshape((-1, 4)))
+            if vocabulary_dump is not None:
+                with open(os.path.join(temp_path, "vocabulary.pickle"),
+                          'wb') as f:
+                    f.write(vocabulary_dump)
+            os.rename(temp_path, os.path.join(self.directory, key))
+        except OSError as e:
+            # Another run saved the same entry first.
+            logging.debug("Could not save cache entry %s: %s", key, e)
+            shutil.rmtree(temp_path, ignore_errors=True)
+        else:
+            logging.info("Saved %s pre-processed descriptions to cache %s",
+                         len(inputs), os.path.join(self.directory, key))
+            self.prune(keep=key)
+
+    def prune(self, keep=None):
+        """Deletes the least recently used entries until the cache is within
+        `max_entries` and `max_bytes`.
+
+        Entries are ordered by the modification times of their directories,
+        which `load` touches. Temporary directories of entries being saved are
+        left alone.
+
+        Args:
+            keep (str, optional): Key of an entry never to be deleted, such as
+                the one just saved. Defaults to `None`.
+        """
+        if self.max_entries is None and self.max_bytes is None:
+            return
+        if not os.path.isdir(self.directory):
+            return
+        entries = []
+        for key in os.listdir(self.directory):
+            path = os.path.join(self.directory, key)
+            if key.startswith(tempfile.template) or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(path, filename))
+                           for filename in os.listdir(path))
+                entries.append((os.path.getmtime(path), key, size))
+            except OSError:
+                # Another run deleted the entry meanwhile.
+                continue
+        entries.sort()
+        num_entries = len(entries)
+        num_bytes = sum(size for _, _, size in entries)
+        for _, key, size in entries:
+            if ((self.max_entries is None or num_entries <= self.max_entries)
+                    and (self.max_bytes is None or
+                         num_bytes <= self.max_bytes)):
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, key),
+                          ignore_errors=True)
+            num_entries -= 1
+            num_bytes -= size
+            logging.info("Deleted least recently used cache entry %s",
+                         os.path.join(self.directory, key))
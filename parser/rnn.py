@@ -20,33 +20,47 @@ class LatentAttentionNetwork(object):
         dropout (tensorflow.placeholder): Placeholder for probability of dropout
             to be used in the Dropout layer. A value of 1.0 results in no
             dropout being applied.
+        learning_rate (tensorflow.placeholder): Placeholder for the learning
+            rate of the optimizer, which defaults to `config.learning_rate`.
+            Feeding it lets the learning rate follow a schedule.
         inputs (tensorflow.placeholder): Placeholder for inputs to the network.
             Input should be a 2D array where the first dimension corresponds to
             batch size and the second dimension is the input dimensionality.
+            The inputs may be trimmed to T <= `self._sent_size` tokens, as long
+            as no input of the batch is longer than T. The network computes
+            the same outputs as for the inputs padded to `self._sent_size`.
         labels (tensorflow.placeholder): Placeholder for true labels
-            corresponding to inputs. Labels should be in the form of a 2D array,
-            the first dimension being the batch size, and each row being a
-            one-hot vector.
+            corresponding to inputs. Labels should be in the form of a 1D
+            `int32` array of label ids, its dimension being the batch size.
         seq_lens (tensorflow.placeholder): Placeholder for actual lenghts of
             inputs, barring the `NULL` tokens.
         dictionary_embedding (Tensor): Output of dictionary embedding layer.
-            Shape=(`self._batch_size`, `self._sent_size`, `self._hidden_size`)
+            Shape=(`self._batch_size`, T, `self._hidden_size`)
         rnn_embedding (tensorflow.Tensor): Output of RNN embedding layer.
-            Shape=(`self._batch_size`, `self._sent_size`, 2*`self._hidden_size`)
-        latent_attention (tensorflow.Tensor): Output of latent attention layer.
-            Shape=(`self._batch_size`, `self._sent_size`, 1)
-        active_attention (tensorflow.Tensor): Output of active attention layer.
-            Shape=(`self._batch_size`, `self._sent_size`, 1)
+            Shape=(`self._batch_size`, T, 2*`self._hidden_size`)
+        latent_attention (tensorflow.Tensor): Output of latent attention layer
+            for the first T tokens.
+            Shape=(`self._batch_size`, T, 1)
+        active_attention (tensorflow.Tensor): Output of active attention layer
+            for the first T tokens.
+            Shape=(`self._batch_size`, T, 1)
         output_representation (tensorflow.Tensor): The output representation.
             Shape=(`self._batch_size`, 2*`self._hidden_size`, 1)
         prediction (tensorflow.Tensor): Logit predictions.
-            Shape=(`self._batch_size`, `self._num_classes`, 1)
+            Shape=(`self._batch_size`, `self._num_classes`)
         loss (tensorflow.Tensor): Value of loss. Cross-entropy loss is used.
+        optimized_variables (`list` of `tf.Variable`): Variables modified by
+            `optimize`.
+        gradients (`list` of tensorflow.Tensor): Dense gradients of the loss
+            with respect to `optimized_variables`, before clipping. Feeding
+            them makes `optimize` apply the fed gradients instead of those of
+            the inputs, such as gradients averaged over several processes.
+            Empty unless the network is created with `dense_gradients`.
         optimize (tensorflow.op): Operation to optimize loss function.
         error (Tensor): Value of classification error.
     """
 
-    def __init__(self, config, num_classes, train_vars):
+    def __init__(self, config, num_classes, train_vars, dense_gradients=False):
         """Sets hyper-parameter values based on the passed `config`
 
         Args:
@@ -63,10 +77,16 @@ class LatentAttentionNetwork(object):
                 The mode `TrainVariables.attention` results in all the attention
                 related parameters being learned. This includes all variables 
                 except "p".
+            dense_gradients (bool, optional): Set to `True` to populate
+                `gradients`, so that gradients can be fed to `optimize`. The
+                gradient of the dictionary embedding matrix is then made dense,
+                which costs a copy of the matrix per training step. Defaults
+                to `False`.
         """
         self.dropout = tf.placeholder(tf.float32, name='dropout')
-        self._learning_rate = config.learning_rate
-        """float: Learning rate for optimizer."""
+        self.learning_rate = tf.placeholder_with_default(
+            tf.constant(config.learning_rate, tf.float32), [],
+            name='learning_rate')
         self._max_gradient_norm = config.max_gradient_norm
         """float: Maximum norm of gradients. If the norm of gradients go above
         this value, they are rescaled."""
@@ -88,12 +108,29 @@ class LatentAttentionNetwork(object):
         self._initializer = tf.random_uniform_initializer(-1, 1)
         """: Initializer to be used to initialize all tensorflow variables. This
         is same as the one proposed in the paper."""
-
-        self.inputs = tf.placeholder(tf.int32,
-                                     [None, self._sent_size], 'inputs')
-        self.labels = tf.placeholder(tf.float32,
-                                     [None, self._num_classes], 'labels')
-        self.seq_lens = tf.placeholder(tf.int32, [None], 'seq_lens')
+        self._scope = tf.get_variable_scope().name
+        """str: Name of the variable scope in which the network is created.
+        Several networks can co-exist in the same graph under different
+        scopes."""
+
+        self.inputs = None
+        self.labels = None
+        self.seq_lens = None
+        self._num_tokens = None
+        """tensorflow.Tensor: Number of tokens T in the (trimmed) inputs."""
+        self._create_placeholders()
+        self._num_padding = tf.cast(self._sent_size - self._num_tokens,
+                                    tf.float32)
+        """tensorflow.Tensor: Number of trailing `NULL` tokens trimmed from the
+        inputs. The RNN outputs, and hence the attention logits, of these
+        tokens are zeros. The attention layers account for them without
+        computing them."""
+        self._padded_latent_attention = None
+        """tensorflow.Tensor: Latent attention of each trimmed token.
+        Shape=(`self._batch_size`, 1, 1)"""
+        self._padded_active_attention = None
+        """tensorflow.Tensor: Active attention of each trimmed token.
+        Shape=(`self._batch_size`, 1, 1)"""
 
         self.dictionary_embedding = self.dictionary_embedding_layer()
         self.rnn_embedding = self.rnn_embedding_layer()
@@ -102,9 +139,51 @@ class LatentAttentionNetwork(object):
         self.output_representation = self.output_representation_layer()
         self.prediction = self.prediction_layer()
         self.loss = self.loss_layer()
-        self.optimize = self.optimize_layer(train_vars)
+        self.optimized_variables = []
+        self.gradients = []
+        self.optimize = self.optimize_layer(train_vars, dense_gradients)
         self.error = self.error_layer()
 
+    def _create_placeholders(self):
+        """Creates the placeholders of the inputs, labels, and lengths."""
+        self.inputs = tf.placeholder(tf.int32, [None, None], 'inputs')
+        self.labels = tf.placeholder(tf.int32, [None], 'labels')
+        self.seq_lens = tf.placeholder(tf.int32, [None], 'seq_lens')
+        self._num_tokens = tf.shape(self.inputs)[1]
+
+    def _variable(self, name, shape):
+        """Creates a variable of the network, initialized with
+        `self._initializer`.
+
+        Args:
+            name (str): Name of the variable.
+            shape (`list` of `int`): Shape of the variable.
+
+        Returns:
+            tensorflow.Variable: The variable.
+        """
+        return tf.get_variable(name=name, shape=shape, dtype=tf.float32,
+                               initializer=self._initializer)
+
+    def _lstm_cell(self):
+        """Creates an LSTM cell of the RNN embedding layer."""
+        return tf.nn.rnn_cell.LSTMCell(num_units=self._hidden_size,
+                                       initializer=self._initializer)
+
+    def _project_tokens(self, weights):
+        """Multiplies the RNN embedding of every token with `weights`.
+
+        Args:
+            weights (tensorflow.Variable): Weights.
+                Shape=(2*`self._hidden_size`, k)
+
+        Returns:
+            tensorflow.Tensor: The projection. Shape=(`self._batch_size` * T, k)
+        """
+        embed = tf.reshape(self.rnn_embedding,
+                           shape=[-1, 2 * self._hidden_size])
+        return tf.matmul(embed, weights)
+
     def dictionary_embedding_layer(self):
         """Constructs the dictionary embedding layer.
 
@@ -113,12 +192,10 @@ class LatentAttentionNetwork(object):
 
         Returns:
             tensorflow.Tensor: Output of dictionary embedding layer.
-            Shape=(?, `self._sent_size`, `self._hidden_size`)
+            Shape=(?, T, `self._hidden_size`)
         """
-        dict_embedding_matrix = tf.get_variable(
-            name="dict_embedding_matrix",
-            shape=[self._vocab_size, self._hidden_size],
-            dtype=tf.float32, initializer=self._initializer)
+        dict_embedding_matrix = self._variable(
+            "dict_embedding_matrix", [self._vocab_size, self._hidden_size])
         return tf.nn.embedding_lookup(dict_embedding_matrix, self.inputs)
 
     def rnn_embedding_layer(self):
@@ -132,19 +209,17 @@ class LatentAttentionNetwork(object):
 
         Returns:
             tensorflow.Tensor: Output of RNN embedding layer.
-            Shape=(?, `self._sent_size`, 2*`self._hidden_size`)
+            Shape=(?, T, 2*`self._hidden_size`)
         """
         # The forward LSTM cell.
-        cell_fw = tf.nn.rnn_cell.LSTMCell(
-            num_units=self._hidden_size, initializer=self._initializer)
+        cell_fw = self._lstm_cell()
         # Add dropout wrapper to the cell.
         cell_fw = tf.nn.rnn_cell.DropoutWrapper(cell=cell_fw,
                                                 input_keep_prob=self.dropout,
                                                 output_keep_prob=self.dropout)
 
         # The backward LSTM cell.
-        cell_bw = tf.nn.rnn_cell.LSTMCell(
-            num_units=self._hidden_size, initializer=self._initializer)
+        cell_bw = self._lstm_cell()
         # Add dropout wrapper to the cell.
         cell_bw = tf.nn.rnn_cell.DropoutWrapper(cell=cell_bw,
                                                 input_keep_prob=self.dropout,
@@ -153,7 +228,7 @@ class LatentAttentionNetwork(object):
         # Construct Bidirectional LSTM using the two cells.
         outputs, states = tf.nn.bidirectional_dynamic_rnn(
             cell_fw=cell_fw, cell_bw=cell_bw, inputs=self.dictionary_embedding,
-            sequence_length=self.seq_lens, dtype=tf.float32)
+            sequence_length=tf.reshape(self.seq_lens, [-1]), dtype=tf.float32)
 
         rnn_output_fw, rnn_output_bw = outputs[0], outputs[1]
         # Concatenate the output of the two LSTMs.
@@ -169,19 +244,16 @@ class LatentAttentionNetwork(object):
 
         Returns:
             tensorflow.Tensor: Output of latent attention layer.
-            Shape=(`self._batch_size`, `self._sent_size`, 1)
+            Shape=(`self._batch_size`, T, 1)
         """
-        u = tf.get_variable(name="u", shape=[2 * self._hidden_size, 1],
-                            dtype=tf.float32,
-                            initializer=self._initializer)
-        # Convert `rnn_embedding` to 2D tensor
-        embed = tf.reshape(self.rnn_embedding,
-                           shape=[-1, 2 * self._hidden_size])
-        l_pre_softmax = tf.matmul(embed, u)
-        l_pre_softmax = tf.reshape(l_pre_softmax,
-                                   shape=[-1, self._sent_size, 1],
-                                   name="l_pre_softmax")
-        return tf.nn.softmax(l_pre_softmax, dim=1, name="l")
+        u = self._variable("u", [2 * self._hidden_size, 1])
+        l_pre_softmax = self._project_tokens(u)
+        l_pre_softmax = tf.reshape(
+            l_pre_softmax, shape=tf.pack([-1, self._num_tokens, 1]),
+            name="l_pre_softmax")
+        l, self._padded_latent_attention = self._softmax_with_padding(
+            l_pre_softmax)
+        return tf.identity(l, name="l")
 
     def active_attention_layer(self):
         """Constructs the Active Attention layer.
@@ -192,21 +264,19 @@ class LatentAttentionNetwork(object):
 
         Returns:
             tensorflow.Tensor: Output of active attention layer.
-            Shape=(`self._batch_size`, `self._sent_size`, 1)
+            Shape=(`self._batch_size`, T, 1)
         """
-        v = tf.get_variable(name="v",
-                            shape=[2 * self._hidden_size, self._sent_size],
-                            dtype=tf.float32, initializer=self._initializer)
-        # Convert rnn_embedding to 2D tensor
-        embed = tf.reshape(self.rnn_embedding,
-                           shape=[-1, 2 * self._hidden_size])
-        a_pre_softmax = tf.matmul(embed, v)
-        a_pre_softmax = tf.reshape(a_pre_softmax,
-                                   shape=[-1, self._sent_size, self._sent_size],
-                                   name="a_pre_softmax")
-        a = tf.nn.softmax(a_pre_softmax, dim=1, name="a")
-        w = tf.batch_matmul(a, self.latent_attention, name="w")
-        return w
+        v = self._variable("v", [2 * self._hidden_size, self._sent_size])
+        a_pre_softmax = self._project_tokens(v)
+        a_pre_softmax = tf.reshape(
+            a_pre_softmax,
+            shape=tf.pack([-1, self._num_tokens, self._sent_size]),
+            name="a_pre_softmax")
+        a, padded_a = self._softmax_with_padding(a_pre_softmax)
+        a = tf.identity(a, name="a")
+        self._padded_active_attention = self._weighted_latent_attention(
+            padded_a)
+        return self._weighted_latent_attention(a, name="w")
 
     def output_representation_layer(self):
         """Constructs the Output Representation layer.
@@ -218,38 +288,93 @@ class LatentAttentionNetwork(object):
             tensorflow.Tensor: The output representation.
             Shape=(`self._batch_size`, 2*`self._hidden_size`, 1)
         """
-        w_normalized = tf.nn.l2_normalize(self.active_attention, dim=1,
-                                          name="w_normalized")
+        # Same as `tf.nn.l2_normalize` over all `self._sent_size` tokens.
+        squared_norm = (
+            tf.reduce_sum(tf.square(self.active_attention), 1,
+                          keep_dims=True) +
+            self._num_padding * tf.square(self._padded_active_attention))
+        w_normalized = tf.mul(self.active_attention,
+                              tf.rsqrt(tf.maximum(squared_norm, 1e-12)),
+                              name="w_normalized")
         embed = tf.transpose(self.rnn_embedding, [0, 2, 1])
         return tf.batch_matmul(embed, w_normalized, name="o")
 
+    def _softmax_with_padding(self, logits):
+        """Computes the softmax over the tokens (dimension 1) of `logits`, as if
+        they were followed by the `self._num_padding` trimmed tokens, whose
+        logits are zeros.
+
+        Args:
+            logits (tensorflow.Tensor): Logits of the first T tokens.
+                Shape=(`self._batch_size`, T, k)
+
+        Returns:
+            tensorflow.Tensor, tensorflow.Tensor: Softmax of the first T
+            tokens, of the same shape as `logits`, and softmax of each trimmed
+            token. Shape=(`self._batch_size`, 1, k)
+        """
+        max_logits = tf.reduce_max(logits, 1, keep_dims=True)
+
+        def with_padding():
+            padding_max_logits = tf.maximum(max_logits, 0.)
+            return padding_max_logits, tf.exp(-padding_max_logits)
+
+        # The zero logits of the trimmed tokens only bound the maximum if
+        # there are some. Otherwise, all the exponentials of a row of logits
+        # below about -88 would underflow to zeros.
+        max_logits, exp_padding = tf.cond(
+            self._num_padding > 0., with_padding,
+            lambda: (max_logits, tf.zeros_like(max_logits)))
+        exp_logits = tf.exp(logits - max_logits)
+        denominator = (tf.reduce_sum(exp_logits, 1, keep_dims=True) +
+                       self._num_padding * exp_padding)
+        return exp_logits / denominator, exp_padding / denominator
+
+    def _weighted_latent_attention(self, a, name=None):
+        """Weighs the latent attention of all `self._sent_size` tokens.
+
+        Args:
+            a (tensorflow.Tensor): Weights of the latent attention of each
+                token. Shape=(`self._batch_size`, n, `self._sent_size`)
+            name (str, optional): Name of the result. Defaults to `None`.
+
+        Returns:
+            tensorflow.Tensor: The weighted latent attention.
+            Shape=(`self._batch_size`, n, 1)
+        """
+        # The trimmed tokens share the same latent attention.
+        a_tokens = tf.slice(a, [0, 0, 0], tf.pack([-1, -1, self._num_tokens]))
+        a_padding = tf.reduce_sum(
+            tf.slice(a, tf.pack([0, 0, self._num_tokens]), [-1, -1, -1]), 2,
+            keep_dims=True)
+        return tf.add(tf.batch_matmul(a_tokens, self.latent_attention),
+                      a_padding * self._padded_latent_attention, name=name)
+
     def prediction_layer(self):
         """Constructs the final Prediction layer.
 
         The output of this layer can be interpreted as unscaled probabilities of
         the input belonging to each class.
 
+        The whole batch is multiplied with the weights in a single matmul.
+
         Returns:
             Logit predictions.
-            Shape=(`self._batch_size`, `self._num_classes`, 1)
+            Shape=(`self._batch_size`, `self._num_classes`)
         """
-        p = tf.get_variable(name="p",
-                            shape=[self._num_classes, 2 * self._hidden_size],
-                            dtype=tf.float32, initializer=self._initializer)
-        initializer = tf.zeros([self._num_classes, 1])
-        pred = tf.scan(lambda a, o: tf.matmul(p, o), self.output_representation,
-                       initializer=initializer)
-        return tf.reshape(pred, shape=[-1, self._num_classes],
-                          name="log_predictions")
+        p = self._variable("p", [self._num_classes, 2 * self._hidden_size])
+        o = tf.reshape(self.output_representation,
+                       shape=[-1, 2 * self._hidden_size])
+        return tf.matmul(o, p, transpose_b=True, name="log_predictions")
 
     def loss_layer(self):
-        """Calculates the cross-entropy loss."""
+        """Calculates the cross-entropy loss of the label ids."""
         return tf.reduce_mean(
-            tf.nn.softmax_cross_entropy_with_logits(self.prediction,
-                                                    self.labels),
+            tf.nn.sparse_softmax_cross_entropy_with_logits(self.prediction,
+                                                           self.labels),
             name="loss")
 
-    def optimize_layer(self, train_vars):
+    def optimize_layer(self, train_vars, dense_gradients=False):
         """Sets up the optimizer to be used for minimizing the loss function.
 
         Adam Optimizer is used.
@@ -265,19 +390,29 @@ class LatentAttentionNetwork(object):
                 The mode `TrainVariables.attention` results in all the attention
                 related parameters being learned. This includes all variables 
                 except "p".
+            dense_gradients (bool, optional): Set to `True` to populate
+                `self.gradients` with dense gradients that can be fed. Defaults
+                to `False`, in which case the gradient of the dictionary
+                embedding matrix stays sparse.
 
         Returns:
             tensorflow.Operation: Operation to be executed to perform
-            optimization.
+            optimization. `self.optimized_variables` and, with
+            `dense_gradients`, `self.gradients` are populated.
         """
         var_list = []
+        # Only the variables created in this network's scope are optimized, so
+        # that other networks in the same graph are left untouched.
+        prefix = self._scope + "/" if self._scope else ""
         if train_vars is TrainVariables.all:
-            var_list = tf.trainable_variables()
+            var_list = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                         scope=prefix)
         elif train_vars is TrainVariables.non_attention:
             var_list = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
-                                        scope='p')
+                                         scope=prefix + 'p')
         elif train_vars is TrainVariables.attention:
-            all_vars = tf.trainable_variables()
+            all_vars = tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES,
+                                         scope=prefix)
             for var in all_vars:
                 if "p:" not in var.name:
                     var_list.append(var)
@@ -287,16 +422,204 @@ class LatentAttentionNetwork(object):
 
         logging.info("Optimizing these variables: %s",
                      [var.name for var in var_list])
-        optimizer = tf.train.AdamOptimizer(self._learning_rate)
-        grads_and_vars = optimizer.compute_gradients(self.loss,
+        optimizer = tf.train.AdamOptimizer(self.learning_rate)
+        grads_and_vars = optimizer.compute_gradients(self._total_loss(),
                                                      var_list=var_list)
-        capped_grads_and_vars = [
-            (tf.clip_by_norm(grad, self._max_gradient_norm), var)
-            for grad, var in grads_and_vars]
+        self.optimized_variables = [var for _, var in grads_and_vars]
+        if dense_gradients:
+            # Sparse gradients cannot be fed, so they are made dense.
+            self.gradients = [tf.convert_to_tensor(grad)
+                              for grad, _ in grads_and_vars]
+            grads_and_vars = zip(self.gradients, self.optimized_variables)
+        capped_grads_and_vars = [(self._clip_gradient(grad), var)
+                                 for grad, var in grads_and_vars]
         return optimizer.apply_gradients(capped_grads_and_vars)
 
+    def _total_loss(self):
+        """Returns the loss minimized by the optimizer."""
+        return self.loss
+
+    def _clip_gradient(self, grad):
+        """Rescales `grad` so that its norm is at most
+        `self._max_gradient_norm`.
+
+        Sparse gradients, such as that of the dictionary embedding matrix, stay
+        sparse. Their slices of the same row are summed first, so that the norm
+        is that of the dense gradient."""
+        if isinstance(grad, tf.IndexedSlices):
+            indices, positions = tf.unique(grad.indices)
+            values = tf.unsorted_segment_sum(grad.values, positions,
+                                             tf.shape(indices)[0])
+            return tf.IndexedSlices(
+                tf.clip_by_norm(values, self._max_gradient_norm), indices,
+                grad.dense_shape)
+        return tf.clip_by_norm(grad, self._max_gradient_norm)
+
     def error_layer(self):
         """Calculates the classification error."""
-        mistakes = tf.not_equal(tf.argmax(self.labels, 1),
+        mistakes = tf.not_equal(tf.to_int64(self.labels),
                                 tf.argmax(self.prediction, 1))
         return tf.reduce_mean(tf.cast(mistakes, tf.float32), name="error")
+
+
+class StackedLSTMCell(tf.nn.rnn_cell.RNNCell):
+    """LSTM cells of the members of a `StackedLatentAttentionNetwork`.
+
+    For each member, the cell computes the same as `tf.nn.rnn_cell.LSTMCell`
+    with its default settings. The batch is made of the mini-batches of all
+    the members, one after another, and is multiplied with the weights of the
+    members in a single `batch_matmul`. The variables are named like those of
+    `tf.nn.rnn_cell.LSTMCell`, with a leading member axis.
+
+    Args:
+        num_units (int): Number of units of the cell.
+        num_members (int): Number of members.
+        initializer: Initializer of the weights.
+        forget_bias (float, optional): Bias added to the forget gate. Defaults
+            to 1.0, like `tf.nn.rnn_cell.LSTMCell`.
+    """
+
+    def __init__(self, num_units, num_members, initializer, forget_bias=1.0):
+        self._num_units = num_units
+        self._num_members = num_members
+        self._initializer = initializer
+        self._forget_bias = forget_bias
+
+    @property
+    def state_size(self):
+        return tf.nn.rnn_cell.LSTMStateTuple(self._num_units, self._num_units)
+
+    @property
+    def output_size(self):
+        return self._num_units
+
+    def __call__(self, inputs, state, scope=None):
+        c_prev, m_prev = state
+        input_size = inputs.get_shape().with_rank(2)[1].value
+        with tf.variable_scope(scope or "LSTMCell",
+                               initializer=self._initializer):
+            w = tf.get_variable(
+                "W_0", [self._num_members, input_size + self._num_units,
+                        4 * self._num_units], dtype=inputs.dtype)
+            b = tf.get_variable(
+                "B", [self._num_members, 4 * self._num_units],
+                initializer=tf.zeros_initializer, dtype=inputs.dtype)
+            cell_inputs = tf.reshape(
+                tf.concat(1, [inputs, m_prev]),
+                [self._num_members, -1, input_size + self._num_units])
+            lstm_matrix = tf.reshape(
+                tf.batch_matmul(cell_inputs, w) + tf.expand_dims(b, 1),
+                [-1, 4 * self._num_units])
+            # i = input_gate, j = new_input, f = forget_gate, o = output_gate
+            i, j, f, o = tf.split(1, 4, lstm_matrix)
+            c = (tf.sigmoid(f + self._forget_bias) * c_prev +
+                 tf.sigmoid(i) * tf.tanh(j))
+            m = tf.sigmoid(o) * tf.tanh(c)
+        return m, tf.nn.rnn_cell.LSTMStateTuple(c, m)
+
+
+class StackedLatentAttentionNetwork(LatentAttentionNetwork):
+    """`LatentAttentionNetwork`s of several independently initialized members
+    of an ensemble, trained together in a single graph.
+
+    The weights of the members are stacked along a leading member axis, and
+    keep the names of the weights of `LatentAttentionNetwork`. Slice k of
+    every variable is thus the variable of member k, which can be checkpointed
+    and restored into a `LatentAttentionNetwork`. Each member is fed its own
+    mini-batch; the mini-batches of all members have the same size and are
+    trimmed to the same number of tokens T.
+
+    Since the members share no variables, minimizing the sum of their losses
+    trains each of them as if it was trained alone. Gradients are clipped per
+    member.
+
+    Attributes:
+        num_members (int): Number of members K.
+        inputs (tensorflow.placeholder): Placeholder for the inputs of each
+            member. Shape=(K, `self._batch_size`, T)
+        labels (tensorflow.placeholder): Placeholder for the true labels of
+            each member, as label ids. Shape=(K, `self._batch_size`)
+        seq_lens (tensorflow.placeholder): Placeholder for the lengths of the
+            inputs of each member. Shape=(K, `self._batch_size`)
+        prediction (tensorflow.Tensor): Logit predictions of each member.
+            Shape=(K, `self._batch_size`, `self._num_classes`)
+        loss (tensorflow.Tensor): Cross-entropy loss of each member.
+            Shape=(K,)
+        error (Tensor): Classification error of each member. Shape=(K,)
+
+    The intermediate layers hold the outputs of all the members, one after
+    another, along their first dimension.
+
+    Args:
+        config: A configuration class, similar to `configs.PaperConfigurations`.
+        num_classes (int): Total number of label classes.
+        train_vars (TrainVariables): Same as in `LatentAttentionNetwork`.
+        num_members (int): Number of members K.
+    """
+
+    def __init__(self, config, num_classes, train_vars, num_members):
+        self.num_members = num_members
+        super(StackedLatentAttentionNetwork, self).__init__(
+            config, num_classes, train_vars)
+
+    def _create_placeholders(self):
+        self.inputs = tf.placeholder(tf.int32, [self.num_members, None, None],
+                                     'inputs')
+        self.labels = tf.placeholder(tf.int32, [self.num_members, None],
+                                     'labels')
+        self.seq_lens = tf.placeholder(tf.int32, [self.num_members, None],
+                                       'seq_lens')
+        self._num_tokens = tf.shape(self.inputs)[2]
+
+    def _variable(self, name, shape):
+        return super(StackedLatentAttentionNetwork, self)._variable(
+            name, [self.num_members] + shape)
+
+    def _lstm_cell(self):
+        return StackedLSTMCell(self._hidden_size, self.num_members,
+                               self._initializer)
+
+    def _project_tokens(self, weights):
+        embed = tf.reshape(self.rnn_embedding,
+                           shape=[self.num_members, -1, 2 * self._hidden_size])
+        return tf.reshape(tf.batch_matmul(embed, weights),
+                          [-1, weights.get_shape()[2].value])
+
+    def dictionary_embedding_layer(self):
+        dict_embedding_matrix = self._variable(
+            "dict_embedding_matrix", [self._vocab_size, self._hidden_size])
+        # The tokens of member k are looked up in slice k of the matrix.
+        offsets = tf.reshape(tf.range(self.num_members) * self._vocab_size,
+                             [-1, 1, 1])
+        embedding = tf.nn.embedding_lookup(
+            tf.reshape(dict_embedding_matrix, [-1, self._hidden_size]),
+            self.inputs + offsets)
+        embedding = tf.reshape(
+            embedding, tf.pack([-1, self._num_tokens, self._hidden_size]))
+        embedding.set_shape([None, None, self._hidden_size])
+        return embedding
+
+    def prediction_layer(self):
+        p = self._variable("p", [self._num_classes, 2 * self._hidden_size])
+        o = tf.reshape(self.output_representation,
+                       shape=[self.num_members, -1, 2 * self._hidden_size])
+        return tf.batch_matmul(o, p, adj_y=True, name="log_predictions")
+
+    def loss_layer(self):
+        cross_entropy = tf.nn.sparse_softmax_cross_entropy_with_logits(
+            tf.reshape(self.prediction, [-1, self._num_classes]),
+            tf.reshape(self.labels, [-1]))
+        return tf.reduce_mean(
+            tf.reshape(cross_entropy, [self.num_members, -1]), 1, name="loss")
+
+    def _total_loss(self):
+        return tf.reduce_sum(self.loss)
+
+    def _clip_gradient(self, grad):
+        return tf.clip_by_norm(grad, self._max_gradient_norm,
+                               axes=range(1, grad.get_shape().ndims))
+
+    def error_layer(self):
+        mistakes = tf.not_equal(tf.to_int64(self.labels),
+                                tf.argmax(self.prediction, 2))
+        return tf.reduce_mean(tf.cast(mistakes, tf.float32), 1, name="error")
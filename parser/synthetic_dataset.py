@@ -1,4 +1,5 @@
 import csv
+import random
 
 from parser.constants import ACTIONS_PATH, TRIGGERS_PATH
 from parser.constants import TRIGGER_CHANNEL_LABELS_PATH, TRIGGER_FN_LABELS_PATH
@@ -9,13 +10,55 @@ from parser.label import Label
 class SyntheticDataset(object):
     """Exposes methods to generate synthetic dataset from API documentation of
     Trigger Functions and Action Functions.
+
+    The descriptions parsed from the API documentation are cached, so that the
+    per-channel CSV files are read only once per process.
     """
+    _triggers_api = None
+    """`tuple`: Descriptions and labels parsed from the Triggers API
+    documentation, or `None` if it is not parsed yet."""
+    _actions_api = None
+    """`tuple`: Descriptions and labels parsed from the Actions API
+    documentation, or `None` if it is not parsed yet."""
 
-    @staticmethod
-    def dataset_from_triggers_api():
+    @classmethod
+    def dataset_from_triggers_api(cls):
         """Generates a synthetic training dataset from the API documentation
         for Trigger Functions.
 
+        The documentation is parsed on the first call only.
+
+        Returns:
+            `list` of `str`, `list` of `Label`: The first entity is the list
+            of descriptions. The second entity is the list of corresponding
+            labels.
+        """
+        if cls._triggers_api is None:
+            cls._triggers_api = cls._parse_triggers_api()
+        descriptions, labels = cls._triggers_api
+        return list(descriptions), list(labels)
+
+    @classmethod
+    def dataset_from_actions_api(cls):
+        """Generates a synthetic training dataset from the API documentation
+        for Action Functions.
+
+        The documentation is parsed on the first call only.
+
+        Returns:
+            `list` of `str`, `list` of `Label`: The first entity is the list
+            of descriptions. The second entity is the list of corresponding
+            labels.
+        """
+        if cls._actions_api is None:
+            cls._actions_api = cls._parse_actions_api()
+        descriptions, labels = cls._actions_api
+        return list(descriptions), list(labels)
+
+    @staticmethod
+    def _parse_triggers_api():
+        """Parses the API documentation for Trigger Functions.
+
         The dataset is creating by parsing and tweaking the natural language
         description of Trigger functions. The descriptions are tweaked using
         hand-built rules so that they conform to a template, form a meaningful
@@ -131,9 +174,8 @@ class SyntheticDataset(object):
         return trigger_descs, labels
 
     @staticmethod
-    def dataset_from_actions_api():
-        """Generates a synthetic training dataset from the API documentation
-        for Action Functions.
+    def _parse_actions_api():
+        """Parses the API documentation for Action Functions.
 
         The dataset is creating by parsing and tweaking the natural language
         description of Action functions. The descriptions are tweaked using
@@ -215,8 +257,8 @@ class SyntheticDataset(object):
 
         return action_descs, labels
 
-    @staticmethod
-    def dataset_from_synthetic_recipes(use_comma=False):
+    @classmethod
+    def dataset_from_synthetic_recipes(cls, use_comma=False):
         """Generates a synthetic training recipes by combining the natural
         language descriptions of Trigger Functions and Action Functions given
         in from the API documentation.
@@ -227,6 +269,11 @@ class SyntheticDataset(object):
         generated by combining such incompatible Triggers and Actions should
         not hurt the model -- if anything, it should aid its training.
 
+        The size of the dataset grows with the product of the numbers of
+        Trigger Functions and Action Functions. Use `iterate_synthetic_recipes`
+        to stream the recipes instead, or `sample_synthetic_recipes` to draw a
+        subset of them.
+
         Args:
             use_comma (`bool`, optional): Set of `True` if you want to create
                 synthetic recipes whose descriptions are joined by a comma. Note
@@ -238,38 +285,127 @@ class SyntheticDataset(object):
             of descriptions. The second entity is the list of corresponding
             labels.
         """
-        trigger_descs, trigger_labels = \
-            SyntheticDataset.dataset_from_triggers_api()
-        action_descs, action_labels = \
-            SyntheticDataset.dataset_from_actions_api()
-
         descriptions = []
         labels = []
+        for description, label in cls.iterate_synthetic_recipes(use_comma):
+            descriptions.append(description)
+            labels.append(label)
+        return descriptions, labels
 
-        for trigger_desc, trigger_label in zip(trigger_descs, trigger_labels):
-            for action_desc, action_label in zip(action_descs, action_labels):
-                label = Label(action_channel=action_label.action_channel,
-                              action_fn=action_label.pure_action_fn,
-                              trigger_channel=trigger_label.trigger_channel,
-                              trigger_fn=trigger_label.pure_trigger_fn)
-                # The two descriptions can be directly combined with a space, or
-                # with a comma, either with the trigger description first or the
-                # action description first.
-                description_1 = trigger_desc + " " + action_desc
-                descriptions.append(description_1)
-                labels.append(label)
-
-                description_2 = action_desc + " " + trigger_desc
-                descriptions.append(description_2)
-                labels.append(label)
-
-                if use_comma:
-                    description_3 = trigger_desc + ", " + action_desc
-                    descriptions.append(description_3)
-                    labels.append(label)
+    @classmethod
+    def iterate_synthetic_recipes(cls, use_comma=False):
+        """Yields the synthetic recipes of `dataset_from_synthetic_recipes`,
+        in the same order, one at a time.
 
-                    description_4 = action_desc + ", " + trigger_desc
-                    descriptions.append(description_4)
-                    labels.append(label)
+        Args:
+            use_comma (`bool`, optional): Same as in
+                `dataset_from_synthetic_recipes`. Defaults to `False`.
+
+        Yields:
+            `str`, `Label`: Description of a synthetic recipe and its label.
+        """
+        trigger_descs, trigger_labels = cls.dataset_from_triggers_api()
+        action_descs, action_labels = cls.dataset_from_actions_api()
+        num_orderings = cls._num_orderings(use_comma)
+        for i in xrange(len(trigger_descs)):
+            for j in xrange(len(action_descs)):
+                for k in xrange(num_orderings):
+                    yield cls._synthetic_recipe(
+                        trigger_descs[i], trigger_labels[i], action_descs[j],
+                        action_labels[j], k)
+
+    @classmethod
+    def num_synthetic_recipes(cls, use_comma=False):
+        """Returns the number of synthetic recipes.
+
+        Args:
+            use_comma (`bool`, optional): Same as in
+                `dataset_from_synthetic_recipes`. Defaults to `False`.
+
+        Returns:
+            int: Number of recipes yielded by `iterate_synthetic_recipes`.
+        """
+        trigger_descs, _ = cls.dataset_from_triggers_api()
+        action_descs, _ = cls.dataset_from_actions_api()
+        return (len(trigger_descs) * len(action_descs) *
+                cls._num_orderings(use_comma))
+
+    @classmethod
+    def sample_synthetic_recipes(cls, num_recipes, seed, use_comma=False):
+        """Draws synthetic recipes uniformly at random, with replacement.
 
+        Only the drawn recipes are created, so that memory does not grow with
+        the number of all possible recipes.
+
+        Args:
+            num_recipes (int): Number of recipes to draw.
+            seed (int): Seed of the random draws. Equal seeds draw equal
+                recipes.
+            use_comma (`bool`, optional): Same as in
+                `dataset_from_synthetic_recipes`. Defaults to `False`.
+
+        Returns:
+            `list` of `str`, `list` of `Label`: The first entity is the list
+            of descriptions. The second entity is the list of corresponding
+            labels.
+        """
+        trigger_descs, trigger_labels = cls.dataset_from_triggers_api()
+        action_descs, action_labels = cls.dataset_from_actions_api()
+        num_orderings = cls._num_orderings(use_comma)
+        num_all = len(trigger_descs) * len(action_descs) * num_orderings
+
+        rng = random.Random(seed)
+        descriptions, labels = [], []
+        for _ in xrange(num_recipes):
+            index = rng.randrange(num_all)
+            pair, k = divmod(index, num_orderings)
+            i, j = divmod(pair, len(action_descs))
+            description, label = cls._synthetic_recipe(
+                trigger_descs[i], trigger_labels[i], action_descs[j],
+                action_labels[j], k)
+            descriptions.append(description)
+            labels.append(label)
         return descriptions, labels
+
+    @staticmethod
+    def _num_orderings(use_comma):
+        """Returns the number of ways in which a Trigger Function description
+        and an Action Function description are combined.
+
+        Args:
+            use_comma (bool): Same as in `dataset_from_synthetic_recipes`.
+
+        Returns:
+            int: Number of synthetic recipes per pair of functions.
+        """
+        return 4 if use_comma else 2
+
+    @staticmethod
+    def _synthetic_recipe(trigger_desc, trigger_label, action_desc,
+                          action_label, ordering):
+        """Combines a Trigger Function description and an Action Function
+        description into a synthetic recipe.
+
+        Args:
+            trigger_desc (str): Description of the Trigger Function.
+            trigger_label (`Label`): Label of the Trigger Function.
+            action_desc (str): Description of the Action Function.
+            action_label (`Label`): Label of the Action Function.
+            ordering (int): How the descriptions are combined: 0 and 1 join
+                them with a space, 2 and 3 with a comma; 0 and 2 put the
+                trigger description first, 1 and 3 the action description.
+
+        Returns:
+            `str`, `Label`: Description of the synthetic recipe and its label.
+        """
+        label = Label(action_channel=action_label.action_channel,
+                      action_fn=action_label.pure_action_fn,
+                      trigger_channel=trigger_label.trigger_channel,
+                      trigger_fn=trigger_label.pure_trigger_fn)
+        # The two descriptions can be directly combined with a space, or
+        # with a comma, either with the trigger description first or the
+        # action description first.
+        separator = " " if ordering < 2 else ", "
+        if ordering % 2 == 0:
+            return trigger_desc + separator + action_desc, label
+        return action_desc + separator + trigger_desc, label
@@ -37,6 +37,7 @@ def parse_args():
     logging.info("Use Gold Subset: %s", args.use_gold)
     logging.info("External CSV File: %s", args.external_test_csv)
     logging.info("Use Names and Descriptions: %s", args.use_names_descriptions)
+    logging.info("Use Snapshots: %s", args.use_snapshots)
 
     return args
 
@@ -86,16 +87,15 @@ def test_models(args, model_class):
         model_class (:obj:`Model`): One of the child classes of the `Model`
             class.
     """
-    assert(len(args.experiment_name) == len(args.saved_model_path))
+    members = utils.ensemble_members(args)
     config = configs.PaperConfiguration
     log_configurations(config)
 
-    num_models = len(args.experiment_name)
     models = []
-    for i in xrange(num_models):
+    for i, (experiment_name, path) in enumerate(members):
         with tf.Graph().as_default() as graph:
             logging.info("Model number %s", i)
-            expt_path = RNN_EXPT_DIRECTORY + args.experiment_name[i] + "/"
+            expt_path = RNN_EXPT_DIRECTORY + experiment_name + "/"
             model = model_class(config, expt_path, stem=True)
             model.load_labels_and_vocab()
             model.load_test_dataset(
@@ -106,7 +106,7 @@ def test_models(args, model_class):
                 use_gold=args.use_gold,
                 use_names_descriptions=args.use_names_descriptions)
             model.initialize_network(init_variables=False, graph=graph)
-            model.restore(args.saved_model_path[i])
+            model.restore(path)
             model.evaluate()
             models.append(model)
 
@@ -31,10 +31,21 @@ def parse_args():
     logging.info("Use Triggers API: %s", args.use_triggers_api)
     logging.info("Use Actions API: %s", args.use_actions_api)
     logging.info("Use Synthetic Recipes: %s", args.use_synthetic_recipes)
+    logging.info("Synthetic Recipes per Epoch: %s",
+                 args.synthetic_recipes_per_epoch)
+    logging.info("Synthetic Recipes Seed: %s", args.synthetic_recipes_seed)
     logging.info("External CSV File: %s", args.external_train_csv)
     logging.info("Use Names and Descriptions: %s", args.use_names_descriptions)
     logging.info("Load and Train: %s", args.load_and_train)
     logging.info("Retrain: %s", args.retrain)
+    logging.info("Number of Workers: %s", args.num_workers)
+    logging.info("Snapshot Cycles: %s", args.snapshot_cycles)
+    logging.info("Training State Steps: %s", args.training_state_steps)
+    logging.info("Resume: %s", args.resume)
+    logging.info("Batch Size: %s", args.batch_size)
+    logging.info("Learning Rate Scaling: %s", args.learning_rate_scaling)
+    logging.info("Warmup Epochs: %s", args.warmup_epochs)
+    logging.info("Learning Rate Decay: %s", args.learning_rate_decay)
 
     return args
 
@@ -57,6 +68,36 @@ def log_configurations(config):
     logging.info("vocab_size (N) = %s", config.vocab_size)
     logging.info("sent_size (j) = %s", config.sent_size)
     logging.info("num_epochs = %s", config.num_epochs)
+    logging.info("warmup_epochs = %s", config.warmup_epochs)
+    logging.info("learning_rate_decay = %s", config.learning_rate_decay)
+    if config.learning_rate_decay == "exponential":
+        logging.info("learning_rate_decay_rate = %s",
+                     config.learning_rate_decay_rate)
+
+
+def training_configuration(args):
+    """Returns the configuration selected by the command-line arguments.
+
+    With `--batch-size`, the configuration is that of large-batch mode (see
+    `configs.large_batch_configuration`). `--warmup-epochs` and
+    `--learning-rate-decay` override the schedule of the learning rate.
+
+    Args:
+        args (Namespace): Namespace containing parsed arguments.
+
+    Returns:
+        A configuration class, derived from `configs.PaperConfiguration`.
+    """
+    config = configs.PaperConfiguration
+    if args.batch_size and args.batch_size != config.batch_size:
+        config = configs.large_batch_configuration(
+            config, args.batch_size, args.learning_rate_scaling)
+    overrides = {}
+    if args.warmup_epochs is not None:
+        overrides["warmup_epochs"] = args.warmup_epochs
+    if args.learning_rate_decay is not None:
+        overrides["learning_rate_decay"] = args.learning_rate_decay
+    return configs.derived_configuration(config, **overrides)
 
 
 def train_model(args, model_class, expt_path):
@@ -68,21 +109,30 @@ def train_model(args, model_class, expt_path):
         model_class (:obj:`Model`): One of the child classes of the `Model`
             class.
     """
-    config = configs.PaperConfiguration
+    config = training_configuration(args)
     log_configurations(config)
     model = model_class(config, expt_path, stem=True)
-    model.load_train_dataset(use_train_set=args.use_train_set,
-                             use_triggers_api=args.use_triggers_api,
-                             use_actions_api=args.use_actions_api,
-                             use_synthetic_recipes=args.use_synthetic_recipes,
-                             use_names_descriptions=args.use_names_descriptions)
-    model.initialize_network()
-    model.train()
+    model.load_train_dataset(
+        use_train_set=args.use_train_set,
+        use_triggers_api=args.use_triggers_api,
+        use_actions_api=args.use_actions_api,
+        use_synthetic_recipes=args.use_synthetic_recipes,
+        use_names_descriptions=args.use_names_descriptions,
+        num_synthetic_recipes=args.synthetic_recipes_per_epoch,
+        synthetic_recipes_seed=args.synthetic_recipes_seed)
+    model.initialize_network(num_workers=args.num_workers)
+    model.train(snapshot_cycles=args.snapshot_cycles,
+                training_state_steps=args.training_state_steps)
 
 
 def load_and_train(args, model_class, expt_path):
     """Loads a pre-trained model and resumes training.
 
+    With `--resume`, training continues from the latest full-state checkpoint
+    of the experiment, exactly where it stopped. Otherwise, only the trainable
+    variables are loaded from the saved model, and optimization starts afresh,
+    e.g., to fine-tune some of them.
+
     Args:
         expt_path (str): Path of experiment directory.
         args (Namespace): Namespace containing parsed arguments
@@ -90,12 +140,13 @@ def load_and_train(args, model_class, expt_path):
             class.
     """
     try:
-        train_vars = TrainVariables[args.retrain]
+        train_vars = TrainVariables.all if args.resume else \
+            TrainVariables[args.retrain]
     except KeyError:
         logging.error("Illegal mode for re-training: %s", args.retrain)
         raise
 
-    config = configs.PaperConfiguration
+    config = training_configuration(args)
     log_configurations(config)
     model = model_class(config, expt_path, stem=True)
     model.load_train_dataset(
@@ -104,10 +155,17 @@ def load_and_train(args, model_class, expt_path):
         use_actions_api=args.use_actions_api,
         use_synthetic_recipes=args.use_synthetic_recipes,
         use_names_descriptions=args.use_names_descriptions,
-        external_csv_file=args.external_train_csv, load_vocab=True)
-    model.initialize_network(init_variables=False, train_vars=train_vars)
-    model.restore(args.saved_model_path)
-    model.train()
+        external_csv_file=args.external_train_csv, load_vocab=True,
+        num_synthetic_recipes=args.synthetic_recipes_per_epoch,
+        synthetic_recipes_seed=args.synthetic_recipes_seed)
+    model.initialize_network(init_variables=False, train_vars=train_vars,
+                             num_workers=args.num_workers)
+    if not args.resume:
+        model.restore(args.saved_model_path or
+                      utils.best_checkpoint_path(args.experiment_name[0]))
+    model.train(snapshot_cycles=args.snapshot_cycles,
+                training_state_steps=args.training_state_steps,
+                resume=args.resume)
 
 
 def main():
@@ -0,0 +1,228 @@
+"""
+Train the members of an ensemble concurrently on the local machine.
+
+The training dataset is loaded and pre-processed once, in the parent process.
+The members are then trained in a pool of forked worker processes, which share
+the parent's arrays copy-on-write instead of each loading the dataset again.
+Each member gets its own experiment directory, named like those of the cluster
+jobs: member `i` of experiment `name` lives in "name/name-i".
+
+The members are trained in groups of `--members-per-graph`. The members of a
+group are trained together in one process, in a single Tensorflow graph in
+which their weights are stacked (see `rnn.StackedLatentAttentionNetwork`), so
+that each training step runs a few large operations rather than many small
+ones. Each group gets its own seed and its own Tensorflow thread budget.
+"""
+
+import logging
+import multiprocessing
+import random
+
+import numpy as np
+import tensorflow as tf
+
+from parser.action_channel_model import ActionChannelModel
+from parser.action_function_model import ActionFunctionModel
+from parser.argument_parser import ensemble_training_arguments_parser
+from parser.constants import RNN_EXPT_DIRECTORY
+from parser.train import log_configurations, training_configuration
+from parser.trigger_function_model import TriggerFunctionModel
+from parser.trigger_channel_model import TriggerChannelModel
+from parser import utils
+
+_template = None
+"""`model.Model`: Model holding the loaded training dataset, inherited by the
+worker processes."""
+
+
+def parse_args():
+    """Parses and logs command-line arguments.
+
+    Returns:
+        Namespace: Namespace containing parsed arguments.
+    """
+    args = ensemble_training_arguments_parser().parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper()),
+        format='%(levelname)s: %(asctime)s: %(processName)s: %(message)s')
+    if args.num_processes is None:
+        args.num_processes = multiprocessing.cpu_count()
+    if args.threads_per_member is None:
+        args.threads_per_member = max(
+            1, multiprocessing.cpu_count() // args.num_processes)
+    logging.info("Log Level: %s", args.log_level)
+    logging.info("Experiment Name: %s", args.experiment_name[0])
+    logging.info("Model: %s", args.model[0])
+    logging.info("Number of Members: %s", args.num_members)
+    logging.info("Number of Processes: %s", args.num_processes)
+    logging.info("Threads per Member: %s", args.threads_per_member)
+    logging.info("Members per Graph: %s", args.members_per_graph)
+    logging.info("Seed: %s", args.seed)
+    logging.info("Use Train Set: %s", args.use_train_set)
+    logging.info("Use Triggers API: %s", args.use_triggers_api)
+    logging.info("Use Actions API: %s", args.use_actions_api)
+    logging.info("Use Synthetic Recipes: %s", args.use_synthetic_recipes)
+    logging.info("Synthetic Recipes per Epoch: %s",
+                 args.synthetic_recipes_per_epoch)
+    logging.info("Synthetic Recipes Seed: %s", args.synthetic_recipes_seed)
+    logging.info("External CSV File: %s", args.external_train_csv)
+    logging.info("Use Names and Descriptions: %s", args.use_names_descriptions)
+    logging.info("Batch Size: %s", args.batch_size)
+    logging.info("Learning Rate Scaling: %s", args.learning_rate_scaling)
+    logging.info("Warmup Epochs: %s", args.warmup_epochs)
+    logging.info("Learning Rate Decay: %s", args.learning_rate_decay)
+
+    return args
+
+
+def member_experiment_name(experiment_name, i):
+    """Returns the name of the experiment of the `i`-th member of an ensemble.
+
+    Args:
+        experiment_name (str): Name of the ensemble's experiment.
+        i (int): Index of the member.
+
+    Returns:
+        str: Name of the member's experiment.
+    """
+    return "{0}/{0}-{1}".format(experiment_name, i)
+
+
+def train_members(task):
+    """Trains a group of members of the ensemble on the dataset loaded in
+    `_template`.
+
+    Runs in a worker process. A group of several members is trained in a
+    single stacked network.
+
+    Args:
+        task (tuple): The name of the ensemble's experiment, the indices of
+            the members, the names of their experiments, the seed of the
+            group, and the number of threads Tensorflow may use.
+
+    Returns:
+        `list` of (int, str): The index of each member and the path of its best
+        checkpoint.
+    """
+    ensemble_name, indices, experiment_names, seed, num_threads = task
+    logging.info("Training members %s with seed %s.", indices, seed)
+    random.seed(seed)
+    np.random.seed(seed)
+    # The worker process is fresh, so the default graph is empty.
+    tf.set_random_seed(seed)
+
+    expt_paths = [RNN_EXPT_DIRECTORY + name + "/" for name in experiment_names]
+    if len(expt_paths) == 1:
+        model = _template.__class__(_template.config, expt_paths[0],
+                                    stem=_template.stem)
+        model.share_train_dataset(_template)
+        model.initialize_network(num_threads=num_threads)
+    else:
+        # The stacked model lives in the directory of the ensemble, and
+        # checkpoints each member into the member's directory.
+        model = _template.__class__(
+            _template.config, RNN_EXPT_DIRECTORY + ensemble_name + "/",
+            stem=_template.stem)
+        model.share_train_dataset(_template)
+        model.initialize_network(num_threads=num_threads,
+                                 member_paths=expt_paths)
+    model.train()
+    return [(i, utils.best_checkpoint_path(name))
+            for i, name in zip(indices, experiment_names)]
+
+
+def train_ensemble(args, model_class):
+    """Trains the members of an ensemble defined by the `model_class` and
+    `args` in a pool of processes.
+
+    Args:
+        args (Namespace): Namespace containing parsed arguments.
+        model_class (:obj:`Model`): One of the child classes of the `Model`
+            class.
+    """
+    global _template
+
+    config = training_configuration(args)
+    log_configurations(config)
+    experiment_name = args.experiment_name[0]
+    names = [member_experiment_name(experiment_name, i)
+             for i in xrange(args.num_members)]
+    for name in names:
+        utils.create_experiment_directory(name)
+
+    # The dataset is loaded before the workers are forked, so that they share
+    # it. No Tensorflow session may exist in the parent before forking.
+    _template = model_class(config, RNN_EXPT_DIRECTORY + experiment_name + "/",
+                            stem=True)
+    _template.load_train_dataset(
+        use_train_set=args.use_train_set,
+        use_triggers_api=args.use_triggers_api,
+        use_actions_api=args.use_actions_api,
+        use_synthetic_recipes=args.use_synthetic_recipes,
+        use_names_descriptions=args.use_names_descriptions,
+        external_csv_file=args.external_train_csv,
+        num_synthetic_recipes=args.synthetic_recipes_per_epoch,
+        synthetic_recipes_seed=args.synthetic_recipes_seed)
+
+    group_size = max(1, args.members_per_graph)
+    tasks = []
+    for first in xrange(0, args.num_members, group_size):
+        indices = range(first, min(first + group_size, args.num_members))
+        tasks.append((experiment_name, indices, [names[i] for i in indices],
+                      args.seed + first,
+                      args.threads_per_member * len(indices)))
+    # Each worker trains a single group, so that every group starts in a fresh
+    # process with an empty default graph.
+    pool = multiprocessing.Pool(args.num_processes, maxtasksperchild=1)
+    try:
+        best_paths = [None] * args.num_members
+        for members in pool.imap_unordered(train_members, tasks):
+            for i, path in members:
+                logging.info("Member %s trained. Best checkpoint: %s", i,
+                             path)
+                best_paths[i] = path
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    logging.info("Ensemble trained. Best checkpoints: %s",
+                 " ".join(best_paths))
+
+
+def main():
+    args = parse_args()
+    if args.load_and_train:
+        logging.error("--load-and-train is not supported for ensembles.")
+        return
+    if args.num_workers > 0:
+        logging.error("--num-workers is not supported for ensembles.")
+        return
+    if args.training_state_steps > 0:
+        logging.error("--training-state-steps is not supported for "
+                      "ensembles.")
+        return
+    if args.snapshot_cycles > 0:
+        logging.error("--snapshot-cycles is not supported for ensembles. "
+                      "Train a snapshot ensemble with parser.train.")
+        return
+
+    if args.model[0] == "TriggerFunctionModel":
+        model_class = TriggerFunctionModel
+    elif args.model[0] == "ActionFunctionModel":
+        model_class = ActionFunctionModel
+    elif args.model[0] == "TriggerChannelModel":
+        model_class = TriggerChannelModel
+    elif args.model[0] == "ActionChannelModel":
+        model_class = ActionChannelModel
+    else:
+        logging.error("Illegal model class %s", args.model[0])
+        return
+
+    train_ensemble(args, model_class)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Full-state checkpoints of a training run, from which training resumes exactly
+where it stopped.
+
+Unlike the checkpoints of `checkpointer.Checkpointer`, which hold only the
+trainable variables of a model and serve to restore it for predictions or
+fine-tuning, a full-state checkpoint holds every variable of the network,
+including the moment slots and the power accumulators of the Adam optimizer.
+Next to it, a pickle dump records the state of the training loop that lives
+outside the graph: the epoch and step counters, the position in the epoch's
+minibatches, the states of the random number generators that shuffle them,
+and the history of the validation metrics.
+"""
+
+import glob
+import logging
+import os
+import pickle
+import re
+
+import tensorflow as tf
+
+from parser.constants import TRAINING_STATE_DIRECTORY, TRAINING_STATE_FILE
+
+_CHECKPOINT_PATTERN = re.compile(r"^state-(\d+)(\.|$)")
+"""`re.RegexObject`: Matches the names of the files of a full-state
+checkpoint, capturing its step."""
+
+
+class TrainingStateSaver(object):
+    """Writes and restores the full-state checkpoints of a training run.
+
+    The checkpoint is written synchronously, so that the variables and the
+    state of the training loop it records belong to the same step. The state
+    file is replaced atomically after the variables are saved, and the
+    variables of the previous checkpoint are kept until then, so that the
+    state file always refers to a complete checkpoint. The files of older
+    checkpoints, including those left by the runs before a resumption, are
+    then deleted.
+
+    Args:
+        session (`tf.Session`): Session holding the values of `variables`.
+        variables (dict): Maps un-scoped names to all the `tf.Variable`s of
+            the network, trainable or not.
+        path (str): Experiment directory of the model. The checkpoints are
+            written in its `TRAINING_STATE_DIRECTORY`.
+    """
+
+    def __init__(self, session, variables, path):
+        self._session = session
+        self._directory = path + TRAINING_STATE_DIRECTORY
+        # Old checkpoints are deleted by `_delete_old_checkpoints`.
+        self._saver = tf.train.Saver(var_list=variables, max_to_keep=None)
+
+    def save(self, step, state):
+        """Writes a full-state checkpoint.
+
+        Args:
+            step (int): Number of training steps taken so far, used to name
+                the checkpoint files.
+            state (dict): State of the training loop, which must be
+                picklable.
+        """
+        if not os.path.isdir(self._directory):
+            os.makedirs(self._directory)
+        checkpoint = self._saver.save(
+            self._session, self._directory + "state", global_step=step,
+            write_meta_graph=False, write_state=False)
+        state = dict(state, checkpoint=os.path.basename(checkpoint))
+        path = self._directory + TRAINING_STATE_FILE
+        with open(path + ".tmp", 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(path + ".tmp", path)
+        logging.info("Step = %s. Full-state checkpoint dumped.", step)
+        self._delete_old_checkpoints(step)
+
+    def _delete_old_checkpoints(self, step):
+        """Deletes the files of the full-state checkpoints other than that of
+        `step` and the latest one before it.
+
+        The saver only deletes old checkpoints when it writes its own state
+        file, which it does not, so they are found on disk instead.
+
+        Args:
+            step (int): Step of the checkpoint the state file refers to.
+        """
+        steps = {}
+        for filename in glob.glob(self._directory + "state-*"):
+            match = _CHECKPOINT_PATTERN.match(os.path.basename(filename))
+            if match:
+                steps.setdefault(int(match.group(1)), []).append(filename)
+        previous = [other for other in steps if other < step]
+        kept = {step, max(previous)} if previous else {step}
+        for old_step in sorted(set(steps) - kept):
+            for filename in steps[old_step]:
+                os.remove(filename)
+            logging.debug("Step = %s. Full-state checkpoint deleted.",
+                          old_step)
+
+    def restore(self):
+        """Restores the variables from the latest full-state checkpoint.
+
+        Returns:
+            dict: State of the training loop recorded with the checkpoint.
+        """
+        path = self._directory + TRAINING_STATE_FILE
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except (IOError, EOFError, pickle.UnpicklingError) as e:
+            logging.error("Unable to read the training state %s: %s", path, e)
+            raise
+        self._saver.restore(self._session,
+                            self._directory + state["checkpoint"])
+        logging.info("Training state restored from checkpoint: %s",
+                     self._directory + state["checkpoint"])
+        return state
@@ -1,15 +1,20 @@
+import glob
+import hashlib
+import json
 import logging
 import numpy as np
 import os
 
-from parser.constants import RNN_EXPT_DIRECTORY
+from parser.constants import BEST_CHECKPOINT_MANIFEST, CHECKPOINTS_DIRECTORY
+from parser.constants import RNN_EXPT_DIRECTORY, SNAPSHOTS_DIRECTORY
+from parser.constants import TRAINING_SUMMARY
 
 def create_experiment_directory(experiment_name):
     try:
         path = RNN_EXPT_DIRECTORY + experiment_name
         logging.info("Creating experiment directories at %s", path)
         os.makedirs(path)
-        os.makedirs(path + "/model-checkpoints")
+        os.makedirs(path + "/" + CHECKPOINTS_DIRECTORY)
         os.makedirs(path + "/plots")
     except OSError as e:
         logging.error("Error creating directories: %s", e)
@@ -22,6 +27,138 @@ def verify_experiment_directory(experiment_name):
         logging.error("Directory %s does not exist.", path)
         raise OSError
 
+def best_checkpoint_path(experiment_name):
+    """Returns the path of the best checkpoint of an experiment, as recorded
+    in its manifest during training.
+
+    Args:
+        experiment_name (str): Name of the experiment.
+
+    Returns:
+        str: Path of the checkpoint.
+    """
+    directory = RNN_EXPT_DIRECTORY + experiment_name + "/" + \
+        CHECKPOINTS_DIRECTORY
+    try:
+        with open(directory + BEST_CHECKPOINT_MANIFEST, 'r') as f:
+            manifest = json.load(f)
+    except (IOError, ValueError) as e:
+        logging.error("Unable to read the best checkpoint of %s: %s",
+                      experiment_name, e)
+        raise
+    logging.info("Best checkpoint of %s is that of epoch %s.",
+                 experiment_name, manifest["epoch"])
+    return directory + manifest["checkpoint"]
+
+
+def saved_model_paths(args):
+    """Returns the paths of the checkpoints to be restored for the experiments
+    in `args.experiment_name`.
+
+    Args:
+        args (Namespace): Namespace containing parsed arguments.
+
+    Returns:
+        `list` of `str`: The paths given with `--saved-model-path`, if any,
+        else the best checkpoint of each experiment.
+    """
+    if args.saved_model_path:
+        assert (len(args.experiment_name) == len(args.saved_model_path))
+        return args.saved_model_path
+    return [best_checkpoint_path(name) for name in args.experiment_name]
+
+
+def snapshot_paths(experiment_name):
+    """Returns the paths of the snapshots saved while training an experiment
+    with a cyclic learning rate.
+
+    Args:
+        experiment_name (str): Name of the experiment.
+
+    Returns:
+        `list` of `str`: Paths of the snapshots, in the order they were saved.
+    """
+    directory = RNN_EXPT_DIRECTORY + experiment_name + "/" + \
+        SNAPSHOTS_DIRECTORY
+    paths = [filename[:-len(".index")] for filename in
+             glob.glob(directory + "snapshot-*.index")]
+    if not paths:
+        logging.error("No snapshots found in %s", directory)
+        raise IOError
+    return sorted(paths, key=lambda path: int(path.rsplit("-", 1)[1]))
+
+
+def ensemble_members(args):
+    """Returns the experiments and checkpoints of the members of the ensemble
+    defined by the command-line arguments `args`.
+
+    With `--use-snapshots`, every snapshot of each experiment is a member.
+    Otherwise, each experiment contributes the checkpoint returned by
+    `saved_model_paths`.
+
+    Args:
+        args (Namespace): Namespace containing parsed arguments.
+
+    Returns:
+        `list` of (`str`, `str`): The name of the experiment and the path of
+        the checkpoint of each member.
+    """
+    if getattr(args, 'use_snapshots', False):
+        return [(name, path) for name in args.experiment_name
+                for path in snapshot_paths(name)]
+    return zip(args.experiment_name, saved_model_paths(args))
+
+
+def training_cpu_hours(experiment_name):
+    """Returns the CPU time spent training an experiment, as recorded in its
+    training summary.
+
+    Args:
+        experiment_name (str): Name of the experiment.
+
+    Returns:
+        float: CPU-hours of training.
+    """
+    path = RNN_EXPT_DIRECTORY + experiment_name + "/" + TRAINING_SUMMARY
+    try:
+        with open(path, 'r') as f:
+            summary = json.load(f)
+    except (IOError, ValueError) as e:
+        logging.error("Unable to read the training summary of %s: %s",
+                      experiment_name, e)
+        raise
+    return summary["cpu_seconds"] / 3600.
+
+
+def prediction_fingerprint(variables, dataset, labels_reverse_map):
+    """Returns a digest of everything the predictions of a model depend on:
+    the values of its variables, its vocabulary, the way it pre-processes
+    descriptions, and its labels.
+
+    Args:
+        variables (dict): Maps un-scoped names of the variables of the network
+            to their values as `numpy.ndarray`s.
+        dataset (`dataset.Dataset`): Dataset pre-processing the descriptions
+            fed to the model.
+        labels_reverse_map (dict): Maps `int` ids to corresponding `str`
+            labels.
+
+    Returns:
+        str: The digest.
+    """
+    digest = hashlib.md5()
+    for name in sorted(variables):
+        value = np.ascontiguousarray(variables[name])
+        digest.update("{} {} {}".format(name, value.dtype, value.shape))
+        digest.update(value.tobytes())
+    config = dataset.config
+    digest.update(repr((dataset.vocabulary_fingerprint, dataset.stem,
+                        config.sent_size, config.num_tokens_left,
+                        config.num_tokens_right,
+                        sorted(labels_reverse_map.items()))))
+    return digest.hexdigest()
+
+
 def softmax(w, t = 1.0):
     e = np.exp(np.array(w) / t)
     dist = e / np.sum(e)
@@ -28,10 +28,7 @@ def parse_arguments():
     args = dialog_arguments_parser().parse_args()
     logging.basicConfig(level=getattr(logging, args.log_level.upper()),
                         format='%(levelname)s: %(asctime)s: %(message)s')
-
-    assert (args.alpha >= args.beta)
-    DialogConfiguration.alpha = args.alpha
-    DialogConfiguration.beta = args.beta
+    dialog.run_pipeline.configure_dialog(args)
 
     logging.info("Log Level: %s", args.log_level)
     logging.info("Use Full Test Set: %s", args.use_full_test_set)
@@ -41,6 +38,14 @@ def parse_arguments():
     logging.info("Use Gold Subset: %s", args.use_gold)
     logging.info("Alpha: %s", args.alpha)
     logging.info("Beta: %s", args.beta)
+    logging.info("Ensemble Mode: %s", args.ensemble_mode)
+    logging.info("Slot Pool Size: %s", args.slot_pool_size)
+    logging.info("Member Pool Size: %s", args.member_pool_size)
+    logging.info("Prediction Cache Size: %s", args.prediction_cache_size)
+    logging.info("Prediction Cache TTL: %s", args.prediction_cache_ttl)
+    logging.info("Warm-up Log Directory: %s", args.warm_up_log_directory)
+    logging.info("Cascade: %s", args.cascade)
+    logging.info("Latency Budget: %s", args.latency_budget)
 
     return args
 
@@ -78,7 +83,8 @@ def load_validation_recipes():
 
 
 def start_session(recipe, trigger_channel_parser, action_channel_parser,
-                  trigger_fn_parser, action_fn_parser, keyword_parser):
+                  trigger_fn_parser, action_fn_parser, keyword_parser,
+                  pool=None):
     """Runs a dialog-session between the dialog agent and a simulated user.
 
     The simulated user engages in the dialog to describe the recipe described in
@@ -96,6 +102,10 @@ def start_session(recipe, trigger_channel_parser, action_channel_parser,
             Model to parse Action Function descriptions.
         keyword_parser (`parser.keyword_model.KeywordModel`): Model to parse
             Channels based on keywords.
+        pool (`multiprocessing.pool.ThreadPool`, optional): Pool of threads
+            onto which the parsers are dispatched when parsing free-form
+            utterances. Defaults to `None`, in which case they are run one
+            after another.
 
     Returns:
         tracker.dialog_tracker.DialogTracker: The `DialogTracker` instance
@@ -115,7 +125,7 @@ def start_session(recipe, trigger_channel_parser, action_channel_parser,
         trigger_fn_parser=trigger_fn_parser,
         action_channel_parser=action_channel_parser,
         action_fn_parser=action_fn_parser, keyword_parser=keyword_parser,
-        istream=simulated_user, ostream=simulated_user)
+        istream=simulated_user, ostream=simulated_user, pool=pool)
     dialog_agent.start_session()
     return dialog_agent.tracker
 
@@ -167,23 +177,101 @@ def print_statistics(pixel):
         percent_terminated
 
 
+def run_sessions(recipes, trigger_channel_parser, action_channel_parser,
+                 trigger_fn_parser, action_fn_parser, keyword_parser,
+                 pool=None):
+    """Runs a dialog-session for each recipe, and prints the statistics of all
+    the sessions.
+
+    Args:
+        recipes (`list` of `dict`): The recipes which the simulated user wants
+            to convey.
+        trigger_channel_parser (`parser.ensembled_model.EnsembledModel`):
+            Model to parse Trigger Channel descriptions.
+        action_channel_parser (`parser.ensembled_model.EnsembledModel`):
+            Model to parse Action Channel descriptions.
+        trigger_fn_parser (`parser.ensembled_model.EnsembledModel`):
+            Model to parse Trigger Function descriptions.
+        action_fn_parser (`parser.ensembled_model.EnsembledModel`):
+            Model to parse Action Function descriptions.
+        keyword_parser (`parser.keyword_model.KeywordModel`): Model to parse
+            Channels based on keywords.
+        pool (`multiprocessing.pool.ThreadPool`, optional): Pool of threads
+            onto which the parsers are dispatched, as in `start_session`.
+            Defaults to `None`.
+
+    Returns:
+        (float, float, float, float): The statistics, as returned by
+        `print_statistics`.
+    """
+    pixel = Pixel()
+    for recipe in recipes:
+        tracker = start_session(
+            recipe=recipe, trigger_channel_parser=trigger_channel_parser,
+            action_channel_parser=action_channel_parser,
+            action_fn_parser=action_fn_parser,
+            trigger_fn_parser=trigger_fn_parser,
+            keyword_parser=keyword_parser, pool=pool)
+        update_statistics(pixel, tracker)
+    return print_statistics(pixel)
+
+
+def print_cascade_report(ensembles, full_statistics, cascade_statistics):
+    """Logs the average number of models the cascade of each ensemble
+    evaluated per utterance, and the change in the dialog statistics from the
+    full ensembles to the cascades.
+
+    Args:
+        ensembles (dict): Maps names of the ensembles to the ensembles
+            (`parser.ensembled_model.EnsembledModel`).
+        full_statistics (tuple): Statistics of the sessions with the full
+            ensembles, as returned by `print_statistics`.
+        cascade_statistics (tuple): Statistics of the sessions with the
+            cascades, as returned by `print_statistics`.
+    """
+    for name, ensemble in sorted(ensembles.items()):
+        logging.info("%s: Average models evaluated per utterance = %s",
+                     name, ensemble.average_models_evaluated())
+    for name, full, cascade in zip(
+            ["Average dialog length", "Percentage of successful dialogs",
+             "Percentage of failed dialogs",
+             "Percentage of terminated dialogs"],
+            full_statistics, cascade_statistics):
+        logging.info("%s: Full ensembles = %s, Cascades = %s, Change = %s",
+                     name, full, cascade, cascade - full)
+
+
 def main():
     args = parse_arguments()
     # recipes = load_test_recipes(args)
     recipes = load_validation_recipes()
     t_channel_parser, a_channel_parser, t_fn_parser, a_fn_parser, \
         keyword_parser = dialog.run_pipeline.load_parsers()
+    slot_pool = dialog.run_pipeline.create_thread_pool(
+        DialogConfiguration.slot_pool_size)
+    parsers = [t_channel_parser, a_channel_parser, t_fn_parser, a_fn_parser,
+               keyword_parser, slot_pool]
+
+    if DialogConfiguration.cascade:
+        # The sessions are first run with the full ensembles, so that the
+        # outcomes of the cascades can be compared with theirs.
+        ensembles = {"Trigger Channel": t_channel_parser,
+                     "Action Channel": a_channel_parser,
+                     "Trigger Function": t_fn_parser,
+                     "Action Function": a_fn_parser}
+        DialogConfiguration.cascade = False
+        dialog.run_pipeline.configure_cascade(ensembles.values())
+        full_statistics = run_sessions(recipes, *parsers)
+        DialogConfiguration.cascade = True
+        dialog.run_pipeline.configure_cascade(ensembles.values())
+        statistics = run_sessions(recipes, *parsers)
+        print_cascade_report(ensembles, full_statistics, statistics)
+    else:
+        statistics = run_sessions(recipes, *parsers)
 
-    pixel = Pixel()
-    for recipe in recipes:
-        tracker = start_session(
-            recipe=recipe, trigger_channel_parser=t_channel_parser,
-            action_channel_parser=a_channel_parser,
-            action_fn_parser=a_fn_parser, trigger_fn_parser=t_fn_parser,
-            keyword_parser=keyword_parser)
-        update_statistics(pixel, tracker)
-
-    return print_statistics(pixel)
+    if t_channel_parser.cache is not None:
+        logging.info("Prediction cache: %s", t_channel_parser.cache)
+    return statistics
 
 
 if __name__ == '__main__':
@@ -0,0 +1,91 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from parser.artifact import ALIGNMENT, MAGIC, ModelArtifact, write_artifact
+from parser.artifact import _PREAMBLE
+
+
+class Configuration(object):
+    hidden_size = 3
+    learning_rate = 0.5
+    learning_rate_decay = "constant"
+
+
+class TestArtifact(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "ensemble.artifact")
+        self.members = [
+            {"variables": {"dict_embedding_matrix":
+                               np.arange(12, dtype=np.float32).reshape(4, 3),
+                           "p": np.array([[1.5, -2.]])},
+             "vocabulary_dump": pickle.dumps({"<NULL>": 0, "rain": 1}),
+             "labels_reverse_map": {0: "weather.rain", 1: "email.send"},
+             "stem": True},
+            {"variables": {"p": np.arange(5, dtype=np.int32)},
+             "vocabulary_dump": pickle.dumps({"<NULL>": 0}),
+             "labels_reverse_map": {0: "twitter.post"},
+             "stem": False}]
+        write_artifact(self.path, Configuration, self.members)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _corrupt(self, offset):
+        with open(self.path, 'r+b') as f:
+            f.seek(offset)
+            byte = f.read(1)
+            f.seek(offset)
+            f.write(chr(ord(byte) ^ 0xff))
+
+    def test_round_trip(self):
+        artifact = ModelArtifact(self.path)
+        self.assertEqual(artifact.num_members, 2)
+        config = artifact.configuration()
+        self.assertEqual(config.hidden_size, 3)
+        self.assertEqual(config.learning_rate, 0.5)
+        self.assertEqual(config.learning_rate_decay, "constant")
+        for i, member in enumerate(self.members):
+            self.assertEqual(artifact.stem(i), member["stem"])
+            self.assertEqual(artifact.labels_reverse_map(i),
+                             member["labels_reverse_map"])
+            self.assertEqual(artifact.vocabulary_dump(i),
+                             member["vocabulary_dump"])
+            variables = artifact.variables(i)
+            self.assertEqual(sorted(variables), sorted(member["variables"]))
+            for name, value in member["variables"].items():
+                self.assertEqual(variables[name].dtype, value.dtype)
+                np.testing.assert_array_equal(variables[name], value)
+                self.assertFalse(variables[name].flags.writeable)
+                self.assertEqual(
+                    (variables[name].ctypes.data -
+                     artifact._mmap.ctypes.data) % ALIGNMENT, 0)
+
+    def test_rejects_bad_magic(self):
+        self._corrupt(0)
+        self.assertRaises(ValueError, ModelArtifact, self.path)
+
+    def test_rejects_bad_header_crc(self):
+        self._corrupt(_PREAMBLE.size + 1)
+        self.assertRaises(ValueError, ModelArtifact, self.path)
+
+    def test_rejects_bad_data_sha256(self):
+        self._corrupt(os.path.getsize(self.path) - 1)
+        self.assertRaises(ValueError, ModelArtifact, self.path)
+        # The data is only checked on request.
+        ModelArtifact(self.path, verify=False)
+
+    def test_rejects_truncated_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC)
+        self.assertRaises(ValueError, ModelArtifact, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import threading
+import time
+import unittest
+
+from parser.cache import LRUCache
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def wait_until(condition, timeout=5.):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out.")
+        time.sleep(0.001)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = LRUCache(10, ttl=5., clock=clock)
+        computed = []
+        compute = lambda key: computed.append(key) or key * 2
+
+        self.assertEqual(cache.get(1, compute), 2)
+        clock.now = 4.9
+        self.assertEqual(cache.get(1, compute), 2)
+        self.assertEqual(computed, [1])
+        clock.now = 5.
+        self.assertEqual(cache.get(1, compute), 2)
+        self.assertEqual(computed, [1, 1])
+        self.assertEqual((cache.hits, cache.misses, cache.expirations),
+                         (1, 2, 1))
+        # The recomputed entry expires `ttl` seconds after it was computed.
+        clock.now = 9.9
+        cache.get(1, compute)
+        self.assertEqual(computed, [1, 1])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(2)
+        computed = []
+        compute = lambda key: computed.append(key) or key
+
+        cache.get("a", compute)
+        cache.get("b", compute)
+        # Looking up "a" makes "b" the least recently used entry.
+        cache.get("a", compute)
+        cache.get("c", compute)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        cache.get("a", compute)
+        cache.get("c", compute)
+        self.assertEqual(computed, ["a", "b", "c"])
+        cache.get("b", compute)
+        self.assertEqual(computed, ["a", "b", "c", "b"])
+
+    def test_get_many_computes_missing_keys_once(self):
+        cache = LRUCache(10)
+        cache.get(1, lambda key: "one")
+        calls = []
+
+        def compute(keys):
+            calls.append(keys)
+            return [str(key) for key in keys]
+
+        values = cache.get_many([2, 1, 3, 2], compute)
+        self.assertEqual(values, ["2", "one", "3", "2"])
+        self.assertEqual(calls, [[2, 3]])
+
+    def test_concurrent_lookups_are_coalesced(self):
+        cache = LRUCache(10)
+        release = threading.Event()
+        calls = []
+
+        def compute(key):
+            calls.append(key)
+            release.wait()
+            return key + 1
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(cache.get(1, compute)))
+            for _ in xrange(2)]
+        threads[0].start()
+        wait_until(lambda: calls)
+        threads[1].start()
+        wait_until(lambda: cache.coalesced == 1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [2, 2])
+        self.assertEqual(calls, [1])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_waiting_lookup_computes_again_after_failure(self):
+        cache = LRUCache(10)
+        release = threading.Event()
+        calls = []
+
+        def failing_compute(key):
+            calls.append("failing")
+            release.wait()
+            raise RuntimeError
+
+        def compute(key):
+            calls.append("retry")
+            return key + 1
+
+        errors = []
+        results = []
+
+        def fail():
+            try:
+                cache.get(1, failing_compute)
+            except RuntimeError:
+                errors.append(True)
+
+        failing = threading.Thread(target=fail)
+        waiting = threading.Thread(
+            target=lambda: results.append(cache.get(1, compute)))
+        failing.start()
+        wait_until(lambda: calls)
+        waiting.start()
+        wait_until(lambda: cache.coalesced == 1)
+        release.set()
+        failing.join()
+        waiting.join()
+
+        self.assertEqual(errors, [True])
+        self.assertEqual(results, [2])
+        self.assertEqual(calls, ["failing", "retry"])
+        self.assertEqual(cache.get(1, failing_compute), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from parser.checkpointer import best_epoch, retained_epochs
+
+
+class TestRetentionPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.scores = {1: 0.5, 2: 0.3, 3: 0.4, 4: 0.3, 5: 0.6, 6: 0.45}
+
+    def test_best_epoch_breaks_ties_in_favour_of_earlier_epoch(self):
+        self.assertEqual(best_epoch(self.scores), 2)
+        self.assertEqual(best_epoch({7: 0.1}), 7)
+
+    def test_all_checkpoints_are_kept_by_default(self):
+        self.assertEqual(retained_epochs(self.scores), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(retained_epochs(self.scores, keep_best=1),
+                         [1, 2, 3, 4, 5, 6])
+        self.assertEqual(retained_epochs(self.scores, keep_last=1),
+                         [1, 2, 3, 4, 5, 6])
+
+    def test_best_and_last_checkpoints_are_kept(self):
+        self.assertEqual(retained_epochs(self.scores, 2, 1), [2, 4, 6])
+        self.assertEqual(retained_epochs(self.scores, 3, 2), [2, 3, 4, 5, 6])
+        # Ties in score are broken in favour of the earlier epoch.
+        self.assertEqual(retained_epochs(self.scores, 1, 0), [2])
+
+    def test_zero_keeps_nothing(self):
+        self.assertEqual(retained_epochs(self.scores, 0, 2), [5, 6])
+        self.assertEqual(retained_epochs(self.scores, 0, 0), [])
+
+    def test_bounds_larger_than_checkpoints_keep_all(self):
+        self.assertEqual(retained_epochs(self.scores, 10, 10),
+                         [1, 2, 3, 4, 5, 6])
+        self.assertEqual(retained_epochs({}, 2, 2), [])
+
+    def test_best_epoch_is_retained(self):
+        for keep_best in xrange(1, 4):
+            for keep_last in xrange(4):
+                self.assertIn(best_epoch(self.scores),
+                              retained_epochs(self.scores, keep_best,
+                                              keep_last))
+
+
+if __name__ == '__main__':
+    unittest.main()
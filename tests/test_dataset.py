@@ -0,0 +1,153 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from parser.cache import LRUCache
+from parser.configs import PaperConfiguration
+from parser.constants import NULL, UNK
+from parser.dataset import Dataset
+from parser.label import Label
+from parser.synthetic_dataset import SyntheticDataset
+
+
+def baseline_ids_and_lengths(dataset, descriptions):
+    """Maps descriptions to token ids as `Dataset` did before
+    `Dataset.ids_and_lengths`, with `parse_descriptions_with_vocabulary`,
+    `description_lengths_before_padding` and `pad_or_clip`."""
+    descriptions = copy.deepcopy(descriptions)
+    config = dataset.config
+    for description in descriptions:
+        for i in xrange(len(description)):
+            if description[i] not in dataset.vocabulary:
+                description[i] = dataset.vocabulary[UNK]
+            else:
+                description[i] = dataset.vocabulary[description[i]]
+    seq_lens = dataset.description_lengths_before_padding(descriptions)
+    for description in descriptions:
+        if len(description) < config.sent_size:
+            while len(description) < config.sent_size:
+                description.append(dataset.vocabulary[NULL])
+        elif len(description) > config.sent_size:
+            for i in xrange(0, config.num_tokens_right):
+                description[i + config.num_tokens_left] = \
+                    description[i - config.num_tokens_right]
+            while len(description) > config.sent_size:
+                description.pop()
+    return descriptions, seq_lens
+
+
+class TestIdsAndLengths(unittest.TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(0)
+        self.vocabulary = {NULL: 0, UNK: 1}
+        for i in xrange(30):
+            self.vocabulary["token{}".format(i)] = i + 2
+        # Some tokens are not in the vocabulary.
+        self.descriptions = [
+            ["token{}".format(i) for i in random.randint(40, size=length)]
+            for length in range(12) + list(random.randint(30, size=50))]
+
+    def _assert_matches_baseline(self, sent_size, left, right):
+        config = type("Configuration", (PaperConfiguration,),
+                      {"sent_size": sent_size, "num_tokens_left": left,
+                       "num_tokens_right": right})
+        dataset = Dataset(stem=False, config=config)
+        dataset.vocabulary = self.vocabulary
+        descriptions = copy.deepcopy(self.descriptions)
+
+        inputs, seq_lens = dataset.ids_and_lengths(descriptions)
+        expected_inputs, expected_seq_lens = baseline_ids_and_lengths(
+            dataset, self.descriptions)
+        self.assertEqual(inputs.dtype, np.int32)
+        self.assertEqual(seq_lens.dtype, np.int32)
+        self.assertEqual(inputs.tolist(), expected_inputs)
+        self.assertEqual(seq_lens.tolist(), expected_seq_lens)
+        self.assertEqual(descriptions, self.descriptions)
+
+    def test_left_and_right_fill_sentence(self):
+        self._assert_matches_baseline(6, 3, 3)
+
+    def test_left_and_right_shorter_than_sentence(self):
+        self._assert_matches_baseline(7, 2, 3)
+
+    def test_only_right_tokens(self):
+        self._assert_matches_baseline(5, 0, 5)
+
+    def test_only_left_tokens(self):
+        self._assert_matches_baseline(5, 5, 0)
+
+    def test_paper_configuration(self):
+        self._assert_matches_baseline(PaperConfiguration.sent_size,
+                                      PaperConfiguration.num_tokens_left,
+                                      PaperConfiguration.num_tokens_right)
+
+    def test_no_descriptions(self):
+        dataset = Dataset(stem=False, config=PaperConfiguration)
+        dataset.vocabulary = self.vocabulary
+        inputs, seq_lens = dataset.ids_and_lengths([])
+        self.assertEqual(inputs.shape, (0, PaperConfiguration.sent_size))
+        self.assertEqual(seq_lens.shape, (0,))
+
+
+class TestTokenizeAndStem(unittest.TestCase):
+
+    def test_stem_cache_gives_same_stems(self):
+        descriptions = ["Post #photos to @Facebook when it's raining",
+                        "raining photos posted", ""]
+        expected = Dataset(stem=True, config=PaperConfiguration,
+                           stem_cache=None).tokenize_and_stem(descriptions)
+        cache = LRUCache(100)
+        dataset = Dataset(stem=True, config=PaperConfiguration,
+                          stem_cache=cache)
+        self.assertEqual(dataset.tokenize_and_stem(descriptions), expected)
+        self.assertEqual(expected[1], ["rain", "photo", "post"])
+        # Each distinct token is stemmed once, and then found in the cache.
+        self.assertEqual(cache.misses, len(cache))
+        self.assertEqual(dataset.tokenize_and_stem(descriptions), expected)
+        self.assertEqual(cache.hits, len(cache))
+
+
+class TestLoadTrainWithSampledSyntheticRecipes(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.api = (SyntheticDataset._triggers_api,
+                    SyntheticDataset._actions_api)
+        SyntheticDataset._triggers_api = (
+            ["rain starts", "snow falls", "sun rises"],
+            [Label(trigger_channel="weather", trigger_fn=fn)
+             for fn in ["rain", "snow", "sun"]])
+        SyntheticDataset._actions_api = (
+            ["send email", "post tweet", "call phone"],
+            [Label(action_channel=channel, action_fn="act")
+             for channel in ["email", "twitter", "phone"]])
+
+    def tearDown(self):
+        SyntheticDataset._triggers_api, SyntheticDataset._actions_api = \
+            self.api
+        shutil.rmtree(self.directory)
+
+    def test_vocabulary_covers_all_functions(self):
+        dataset = Dataset(stem=False, config=PaperConfiguration,
+                          preprocessed_cache=None)
+        inputs, labels, _ = dataset.load_train(
+            os.path.join(self.directory, "vocab.pickle"),
+            use_train_set=False, use_synthetic_recipes=True,
+            num_synthetic_recipes=1, synthetic_recipes_seed=0)
+        self.assertEqual(len(inputs), 1)
+        self.assertEqual(len(labels), 1)
+        # One recipe holds 4 of the tokens, but all 12 are in the vocabulary.
+        self.assertEqual(
+            sorted(dataset.vocabulary),
+            sorted([NULL, UNK, "rain", "starts", "snow", "falls", "sun",
+                    "rises", "send", "email", "post", "tweet", "call",
+                    "phone"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
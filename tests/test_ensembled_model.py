@@ -0,0 +1,200 @@
+import hashlib
+import pickle
+import unittest
+
+import numpy as np
+
+from dialog.configs import DialogConfiguration
+from dialog.constants import ID
+from dialog.dialog_state import DialogState
+from dialog.intention import IntentionType
+from dialog.utterance_parser import UtteranceParser
+from parser.configs import PaperConfiguration
+from parser.constants import NULL, UNK
+from parser.dataset import Dataset, PreprocessedInputs
+from parser.ensembled_model import EnsembledModel
+from parser.numpy_model import NumpyModel
+
+CHANNELS = ["weather", "email", "twitter"]
+LABELS = ["{}.fn{}".format(channel, i) for channel in CHANNELS
+          for i in xrange(6)]
+NUM_MODELS = 8
+VOCABULARY_DUMP = pickle.dumps({NULL: 0, UNK: 1, "utterance": 2, "number": 3})
+
+
+class FakeModel(object):
+    """Model predicting random but deterministic distributions, confident
+    for some descriptions and not for others.
+
+    For a third of the descriptions, all the models but the last one are
+    confident of an email Function, whereas the last one is confident of a
+    weather Function. The raw top-1 confidence is then known before the last
+    model is evaluated, but not the confidence among weather Functions.
+    """
+    config = PaperConfiguration
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.labels_reverse_map = dict(enumerate(LABELS))
+        self._dataset = Dataset(stem=False, config=PaperConfiguration)
+        self._dataset.load_vocabulary_dump(VOCABULARY_DUMP)
+
+    def fingerprint(self):
+        return "fake-{}".format(self.seed)
+
+    def preprocessed_inputs(self, inputs):
+        return PreprocessedInputs(inputs, self._dataset)
+
+    def predictions(self, inputs, seq_lens=None, preprocess=True):
+        inputs.for_dataset(self._dataset)
+        predictions = []
+        for tokens in inputs.tokenized:
+            digest = int(hashlib.md5(" ".join(tokens)).hexdigest()[:8], 16)
+            random = np.random.RandomState(digest + self.seed)
+            if digest % 3 == 0:
+                probabilities = random.dirichlet(np.ones(len(LABELS))) * 0.01
+                if self.seed < NUM_MODELS - 1:
+                    probabilities[LABELS.index("email.fn0")] += 0.99
+                else:
+                    probabilities[LABELS.index("weather.fn1")] += 0.99
+            else:
+                sharpness = digest % 6
+                logits = random.randn(len(LABELS)) * (1 + sharpness)
+                logits[digest % len(LABELS)] += sharpness
+                probabilities = np.exp(logits - logits.max())
+            predictions.append(probabilities / probabilities.sum())
+        return np.array(predictions)
+
+
+class FakeLabelDescription(object):
+
+    def trigger_channel_description(self, channel):
+        return channel
+
+    def action_channel_description(self, channel):
+        return channel
+
+
+def create_ensemble():
+    ensemble = EnsembledModel()
+    for seed in xrange(NUM_MODELS):
+        ensemble.add_model(FakeModel(seed))
+    return ensemble
+
+
+def create_utterance_parser():
+    return UtteranceParser(create_ensemble(), create_ensemble(),
+                           create_ensemble(), create_ensemble(), None,
+                           FakeLabelDescription())
+
+
+def decision(confidence):
+    """Returns how the dialog policy treats a slot parsed with
+    `confidence`."""
+    if confidence < DialogConfiguration.beta:
+        return "reject"
+    elif confidence < DialogConfiguration.alpha:
+        return "confirm"
+    return "accept"
+
+
+class TestCascade(unittest.TestCase):
+
+    def setUp(self):
+        self.full = create_utterance_parser()
+        self.cascade = create_utterance_parser()
+        for model in [self.cascade.trigger_channel_model,
+                      self.cascade.action_channel_model,
+                      self.cascade.trigger_fn_model,
+                      self.cascade.action_fn_model]:
+            model.enable_cascade([DialogConfiguration.beta,
+                                  DialogConfiguration.alpha])
+        self.utterances = ["utterance number {}".format(i)
+                           for i in xrange(200)]
+
+    def _requests(self, intention_type):
+        requests = []
+        for i, utterance in enumerate(self.utterances):
+            state = DialogState()
+            state.trigger[ID] = CHANNELS[i % len(CHANNELS)]
+            state.action[ID] = CHANNELS[(i + 1) % len(CHANNELS)]
+            requests.append((utterance, intention_type, state))
+        return requests
+
+    def _assert_same_decisions(self, full_parses, cascade_parses):
+        for full_parse, cascade_parse in zip(full_parses, cascade_parses):
+            self.assertEqual(set(full_parse), set(cascade_parse))
+            for slot in full_parse:
+                self.assertEqual(decision(full_parse[slot][1]),
+                                 decision(cascade_parse[slot][1]))
+
+    def test_free_form_decisions_match_full_ensemble(self):
+        requests = self._requests(IntentionType.free_form)
+        self._assert_same_decisions(self.full.parse_many(requests),
+                                    self.cascade.parse_many(requests))
+        self.assertLess(
+            self.cascade.trigger_channel_model.average_models_evaluated(),
+            NUM_MODELS)
+
+    def test_channel_conditioned_decisions_match_full_ensemble(self):
+        for intention_type in [IntentionType.trigger_fn,
+                               IntentionType.action_fn]:
+            requests = self._requests(intention_type)
+            self._assert_same_decisions(self.full.parse_many(requests),
+                                        self.cascade.parse_many(requests))
+            # The one-by-one path masks the labels the same way.
+            self._assert_same_decisions(
+                [self.full.parse_utterance(*request)
+                 for request in requests[:20]],
+                [self.cascade.parse_utterance(*request)
+                 for request in requests[:20]])
+        self.assertLess(
+            self.cascade.trigger_fn_model.average_models_evaluated(),
+            NUM_MODELS)
+
+    def test_cascade_maps_token_ids_once(self):
+        ensemble = self.cascade.trigger_channel_model
+        mapped = []
+        for model in ensemble._models:
+            preprocess = model._dataset.preprocess_tokenized_inputs
+            model._dataset.preprocess_tokenized_inputs = (
+                lambda tokenized, preprocess=preprocess:
+                mapped.append(len(tokenized)) or preprocess(tokenized))
+        ensemble.predict_batch(self.utterances)
+        self.assertEqual(mapped, [len(self.utterances)])
+        self.assertGreater(ensemble.average_models_evaluated(), 1)
+
+    def test_confidence_bounds_contain_renormalized_confidence(self):
+        random = np.random.RandomState(0)
+        num_labels = len(LABELS)
+        for _ in xrange(200):
+            evaluated = random.randint(1, NUM_MODELS)
+            predictions = random.dirichlet(np.ones(num_labels) * 0.3,
+                                           NUM_MODELS)
+            mask = random.rand(num_labels) < 0.4
+            mask[random.randint(num_labels)] = True
+            lowest, highest = EnsembledModel._confidence_bounds(
+                predictions[:evaluated].sum(axis=0)[np.newaxis] / NUM_MODELS,
+                mask[np.newaxis],
+                float(NUM_MODELS - evaluated) / NUM_MODELS)
+            average = predictions.mean(axis=0)
+            confidence = (average[mask].max() +
+                          (1. - average[mask].sum()) / mask.sum())
+            self.assertLessEqual(lowest[0], confidence + 1e-9)
+            self.assertGreaterEqual(highest[0], confidence - 1e-9)
+
+
+class TestTestData(unittest.TestCase):
+
+    def test_models_without_test_set_are_rejected(self):
+        ensemble = EnsembledModel()
+        ensemble.add_model(NumpyModel(PaperConfiguration))
+        self.assertRaises(ValueError, ensemble.test_data)
+        self.assertRaises(ValueError, ensemble.evaluate)
+
+    def test_empty_ensemble_has_no_test_data(self):
+        self.assertEqual(EnsembledModel().test_data(), (None, None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
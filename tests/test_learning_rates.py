@@ -0,0 +1,59 @@
+import unittest
+
+from parser.learning_rates import scheduled_learning_rate
+
+STEPS_PER_EPOCH = 10
+NUM_EPOCHS = 5
+WARMUP_EPOCHS = 1
+
+
+def rate(step, decay="constant", decay_rate=1.):
+    return scheduled_learning_rate(1., step, STEPS_PER_EPOCH, NUM_EPOCHS,
+                                   WARMUP_EPOCHS, decay, decay_rate)
+
+
+class TestScheduledLearningRate(unittest.TestCase):
+
+    def test_warmup_increases_linearly_to_base_rate(self):
+        self.assertAlmostEqual(rate(0), 0.1)
+        self.assertAlmostEqual(rate(4), 0.5)
+        # The last warmup step and the first decay step both use the base
+        # rate.
+        self.assertAlmostEqual(rate(9), 1.)
+        self.assertAlmostEqual(rate(10), 1.)
+
+    def test_no_warmup_starts_at_base_rate(self):
+        self.assertAlmostEqual(
+            scheduled_learning_rate(0.3, 0, STEPS_PER_EPOCH, NUM_EPOCHS,
+                                    decay="linear"), 0.3)
+
+    def test_constant_decay(self):
+        for step in [10, 25, 49, 60]:
+            self.assertAlmostEqual(rate(step), 1.)
+
+    def test_exponential_decay_per_epoch(self):
+        self.assertAlmostEqual(rate(10, "exponential", 0.5), 1.)
+        self.assertAlmostEqual(rate(15, "exponential", 0.5), 0.5 ** 0.5)
+        self.assertAlmostEqual(rate(20, "exponential", 0.5), 0.5)
+        self.assertAlmostEqual(rate(40, "exponential", 0.5), 0.125)
+
+    def test_linear_decay_reaches_zero_at_last_step(self):
+        self.assertAlmostEqual(rate(10, "linear"), 1.)
+        self.assertAlmostEqual(rate(30, "linear"), 0.5)
+        self.assertAlmostEqual(rate(49, "linear"), 1. / 40)
+        self.assertAlmostEqual(rate(50, "linear"), 0.)
+        # Steps past the end of training do not go below 0.
+        self.assertAlmostEqual(rate(70, "linear"), 0.)
+
+    def test_cosine_decay_reaches_zero_at_last_step(self):
+        self.assertAlmostEqual(rate(10, "cosine"), 1.)
+        self.assertAlmostEqual(rate(30, "cosine"), 0.5)
+        self.assertAlmostEqual(rate(50, "cosine"), 0.)
+        self.assertAlmostEqual(rate(70, "cosine"), 0.)
+
+    def test_illegal_decay_is_rejected(self):
+        self.assertRaises(ValueError, rate, 10, "step")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import threading
+import unittest
+
+import numpy as np
+
+from parser.minibatches import minibatches, num_minibatches
+from parser.minibatches import prefetched_minibatches
+
+
+def producers():
+    return [thread for thread in threading.enumerate()
+            if thread.name == "minibatch-producer"]
+
+
+class TestMinibatches(unittest.TestCase):
+
+    def _examples(self, num_examples):
+        lengths = np.random.RandomState(num_examples).randint(
+            1, 26, size=num_examples)
+        return (np.arange(num_examples), lengths), lengths
+
+    def test_number_of_minibatches_agrees_with_num_minibatches(self):
+        for num_examples in [1, 7, 32, 33, 100]:
+            arrays, lengths = self._examples(num_examples)
+            for batch_size in [1, 5, 32, 200]:
+                for keep_partial_batch in [False, True]:
+                    for bucket_window in [0, 3]:
+                        batches = list(minibatches(
+                            arrays, batch_size,
+                            keep_partial_batch=keep_partial_batch,
+                            lengths=lengths, bucket_window=bucket_window))
+                        self.assertEqual(
+                            len(batches),
+                            num_minibatches(num_examples, batch_size,
+                                            keep_partial_batch))
+
+    def test_partial_batch_is_kept_or_dropped(self):
+        arrays, _ = self._examples(10)
+        kept = list(minibatches(arrays, 4, keep_partial_batch=True))
+        self.assertEqual([len(batch[0]) for batch in kept], [4, 4, 2])
+        dropped = list(minibatches(arrays, 4, keep_partial_batch=False))
+        self.assertEqual([len(batch[0]) for batch in dropped], [4, 4])
+
+    def test_bucketing_keeps_examples_and_groups_lengths(self):
+        arrays, lengths = self._examples(100)
+        batches = list(minibatches(arrays, 10, keep_partial_batch=True,
+                                   lengths=lengths, bucket_window=5))
+        ids = np.concatenate([batch[0] for batch in batches])
+        self.assertEqual(sorted(ids.tolist()), range(100))
+        for batch_ids, batch_lengths in batches:
+            # The rows of the arrays stay aligned.
+            np.testing.assert_array_equal(batch_lengths, lengths[batch_ids])
+            self.assertTrue(np.all(np.diff(batch_lengths) >= 0))
+
+    def test_without_shuffling_examples_keep_their_order(self):
+        arrays, _ = self._examples(10)
+        batches = list(minibatches(arrays, 3, shuffle=False,
+                                   keep_partial_batch=True))
+        self.assertEqual([batch[0].tolist() for batch in batches],
+                         [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]])
+
+
+class TestPrefetchedMinibatches(unittest.TestCase):
+
+    def setUp(self):
+        self.arrays = (np.arange(100).reshape(50, 2), np.arange(50))
+
+    def test_yields_same_minibatches_as_minibatches(self):
+        np.random.seed(0)
+        expected = list(minibatches(self.arrays, 8, keep_partial_batch=True))
+        np.random.seed(0)
+        prefetched = list(prefetched_minibatches(self.arrays, 8, 2,
+                                                 keep_partial_batch=True))
+        self.assertEqual(len(prefetched), len(expected))
+        for minibatch, expected_minibatch in zip(prefetched, expected):
+            for array, expected_array in zip(minibatch, expected_minibatch):
+                np.testing.assert_array_equal(array, expected_array)
+        self.assertEqual(producers(), [])
+
+    def test_producer_stops_when_consumer_stops_early(self):
+        generator = prefetched_minibatches(self.arrays, 2, 1)
+        next(generator)
+        self.assertEqual(len(producers()), 1)
+        # The producer is now blocked on the full queue.
+        generator.close()
+        self.assertEqual(producers(), [])
+
+    def test_producer_stops_when_consumer_fails(self):
+        try:
+            for _ in prefetched_minibatches(self.arrays, 2, 1):
+                raise KeyboardInterrupt
+        except KeyboardInterrupt:
+            pass
+        self.assertEqual(producers(), [])
+
+    def test_no_examples(self):
+        arrays = (np.zeros((0, 3)), np.zeros(0))
+        for keep_partial_batch in [False, True]:
+            self.assertEqual(
+                list(minibatches(arrays, 4,
+                                 keep_partial_batch=keep_partial_batch)), [])
+            self.assertEqual(
+                list(prefetched_minibatches(arrays, 4, 2)), [])
+            self.assertEqual(num_minibatches(0, 4, keep_partial_batch), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from parser.label import Label
+from parser.preprocessed_cache import PreprocessedCache
+
+
+def fields(label):
+    return (label.trigger_channel, label.pure_trigger_fn,
+            label.action_channel, label.pure_action_fn)
+
+
+class TestPreprocessedCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.inputs = np.arange(12, dtype=np.int32).reshape(3, 4)
+        self.seq_lens = np.array([4, 2, 3], dtype=np.int32)
+        self.labels = [Label("weather", "rain", "email", "send"),
+                       Label(trigger_channel="weather", trigger_fn="rain"),
+                       Label(action_channel="", action_fn="post")]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _save(self, cache, key, num_rows=3):
+        cache.save(key, self.inputs[:num_rows], self.labels[:num_rows],
+                   self.seq_lens[:num_rows])
+
+    def _set_last_use(self, key, seconds_ago):
+        timestamp = time.time() - seconds_ago
+        os.utime(os.path.join(self.directory, key), (timestamp, timestamp))
+
+    def test_round_trip(self):
+        cache = PreprocessedCache(self.directory)
+        key = cache.key({"file": "train.csv", "stem": True})
+        cache.save(key, self.inputs, self.labels, self.seq_lens, "vocabulary")
+
+        inputs, labels, seq_lens, vocabulary_dump = cache.load(key)
+        np.testing.assert_array_equal(inputs, self.inputs)
+        np.testing.assert_array_equal(seq_lens, self.seq_lens)
+        self.assertFalse(inputs.flags.writeable)
+        self.assertEqual(vocabulary_dump, "vocabulary")
+        # Missing attributes come back as `None`, and empty ones as empty
+        # strings.
+        self.assertEqual([fields(label) for label in labels],
+                         [("weather", "rain", "email", "send"),
+                          ("weather", "rain", None, None),
+                          (None, None, "", "post")])
+
+    def test_round_trip_without_vocabulary_or_descriptions(self):
+        cache = PreprocessedCache(self.directory)
+        cache.save("empty", np.zeros((0, 4), dtype=np.int32), [],
+                   np.zeros(0, dtype=np.int32))
+        inputs, labels, seq_lens, vocabulary_dump = cache.load("empty")
+        self.assertEqual(inputs.shape, (0, 4))
+        self.assertEqual(labels, [])
+        self.assertEqual(len(seq_lens), 0)
+        self.assertIsNone(vocabulary_dump)
+
+    def test_missing_entry(self):
+        cache = PreprocessedCache(self.directory)
+        self.assertIsNone(cache.load(cache.key({})))
+
+    def test_key_depends_on_parts(self):
+        cache = PreprocessedCache(self.directory)
+        self.assertEqual(cache.key({"a": 1, "b": [2]}),
+                         cache.key({"b": [2], "a": 1}))
+        self.assertNotEqual(cache.key({"a": 1}), cache.key({"a": 2}))
+
+    def test_least_recently_used_entries_are_pruned(self):
+        cache = PreprocessedCache(self.directory, max_entries=2)
+        self._save(cache, "first")
+        self._save(cache, "second")
+        self._set_last_use("first", 20)
+        self._set_last_use("second", 10)
+        # Loading "first" makes "second" the least recently used entry.
+        cache.load("first")
+        self._save(cache, "third")
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ["first", "third"])
+
+    def test_entries_are_pruned_to_max_bytes(self):
+        cache = PreprocessedCache(self.directory)
+        self._save(cache, "first")
+        entry_size = sum(
+            os.path.getsize(os.path.join(self.directory, "first", filename))
+            for filename in os.listdir(os.path.join(self.directory, "first")))
+        cache.max_bytes = 2 * entry_size
+        self._save(cache, "second")
+        self._set_last_use("first", 20)
+        self._set_last_use("second", 10)
+        self._save(cache, "third")
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ["second", "third"])
+        # The entry just saved is kept even if it exceeds the bound alone.
+        cache.max_bytes = 1
+        self._save(cache, "fourth")
+        self.assertEqual(os.listdir(self.directory), ["fourth"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+import tensorflow as tf
+
+from parser.configs import PaperConfiguration
+from parser.rnn import LatentAttentionNetwork, TrainVariables
+
+
+class SmallConfiguration(PaperConfiguration):
+    hidden_size = 4
+    vocab_size = 20
+    sent_size = 6
+    num_tokens_left = 3
+    num_tokens_right = 3
+    learning_rate = 0.1
+    max_gradient_norm = 0.05
+
+
+class TestOptimize(unittest.TestCase):
+
+    def _trained_variables(self, dense_gradients):
+        graph = tf.Graph()
+        with graph.as_default():
+            tf.set_random_seed(1)
+            network = LatentAttentionNetwork(SmallConfiguration, 5,
+                                             TrainVariables.all,
+                                             dense_gradients=dense_gradients)
+            with tf.Session(graph=graph) as session:
+                session.run(tf.initialize_all_variables())
+                feed_dicts = [{network.inputs: [[2, 3, 3, 4, 0, 0],
+                                                [5, 2, 2, 2, 2, 6]],
+                               network.labels: [1, 3],
+                               network.seq_lens: [4, 6],
+                               network.dropout: 1.0},
+                              {network.inputs: [[7, 8, 0, 0, 0, 0]],
+                               network.labels: [0],
+                               network.seq_lens: [2],
+                               network.dropout: 1.0}]
+                for feed_dict in feed_dicts * 3:
+                    session.run(network.optimize, feed_dict)
+                op_types = set(op.type for op in graph.get_operations())
+                return (network, op_types,
+                        session.run(network.optimized_variables))
+
+    def test_sparse_gradients_are_clipped_as_dense_ones(self):
+        sparse_network, sparse_ops, sparse = self._trained_variables(False)
+        dense_network, dense_ops, dense = self._trained_variables(True)
+        # Only the sparse embedding gradient has its slices summed per row.
+        self.assertIn("Unique", sparse_ops)
+        self.assertNotIn("Unique", dense_ops)
+        self.assertEqual(sparse_network.gradients, [])
+        self.assertEqual(len(dense_network.gradients), len(dense))
+        for sparse_variable, dense_variable in zip(sparse, dense):
+            np.testing.assert_allclose(sparse_variable, dense_variable,
+                                       rtol=1e-5, atol=1e-6)
+
+
+class TestSoftmaxWithPadding(unittest.TestCase):
+
+    def _softmax(self, logits, num_tokens):
+        graph = tf.Graph()
+        with graph.as_default():
+            network = LatentAttentionNetwork(SmallConfiguration, 5,
+                                             TrainVariables.all)
+            softmax = network._softmax_with_padding(tf.constant(logits))
+            with tf.Session(graph=graph) as session:
+                return session.run(softmax, {
+                    network.inputs: np.zeros((1, num_tokens), np.int32)})
+
+    def test_very_negative_logits_without_padding(self):
+        logits = np.array([[[-200.], [-201.], [-200.], [-300.], [-200.],
+                            [-202.]]], np.float32)
+        softmax, _ = self._softmax(logits, 6)
+        expected = np.exp(logits - logits.max())
+        np.testing.assert_allclose(softmax, expected / expected.sum(),
+                                   rtol=1e-5, atol=1e-7)
+
+    def test_padding_tokens_have_zero_logits(self):
+        logits = np.array([[[1.], [-200.], [0.5]]], np.float32)
+        softmax, padding_softmax = self._softmax(logits, 3)
+        expected = np.exp(np.concatenate([logits, np.zeros((1, 3, 1))], 1))
+        expected /= expected.sum()
+        np.testing.assert_allclose(softmax, expected[:, :3], rtol=1e-5,
+                                   atol=1e-7)
+        np.testing.assert_allclose(padding_softmax, expected[:, 3:4],
+                                   rtol=1e-5, atol=1e-7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import tensorflow as tf
+
+from parser.constants import TRAINING_STATE_DIRECTORY
+from parser.training_state import TrainingStateSaver
+
+
+class TestTrainingStateSaver(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp() + "/"
+        self.directory = self.path + TRAINING_STATE_DIRECTORY
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.variable = tf.Variable(0., name="v")
+            self.session = tf.Session(graph=self.graph)
+            self.session.run(tf.initialize_variables([self.variable]))
+            self.saver = TrainingStateSaver(self.session,
+                                            {"v": self.variable}, self.path)
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.path)
+
+    def _checkpoint_steps(self):
+        return sorted(set(int(filename.split(".")[0].split("-")[1])
+                          for filename in os.listdir(self.directory)
+                          if filename.startswith("state-")))
+
+    def _save(self, step):
+        with self.graph.as_default():
+            self.session.run(self.variable.assign(float(step)))
+            self.saver.save(step, {"step": step})
+
+    def test_only_latest_two_checkpoints_are_kept(self):
+        for step in [4, 8, 12, 16, 20]:
+            self._save(step)
+        self.assertEqual(self._checkpoint_steps(), [16, 20])
+        with self.graph.as_default():
+            self.session.run(self.variable.assign(0.))
+            self.assertEqual(self.saver.restore()["step"], 20)
+            self.assertEqual(self.session.run(self.variable), 20.)
+
+    def test_checkpoints_of_earlier_runs_are_deleted(self):
+        for step in [4, 8, 12]:
+            self._save(step)
+        # A resumed run has its own saver, which does not know the files of
+        # the run before it.
+        with self.graph.as_default():
+            self.saver = TrainingStateSaver(self.session,
+                                            {"v": self.variable}, self.path)
+        self._save(16)
+        self.assertEqual(self._checkpoint_steps(), [12, 16])
+
+
+if __name__ == '__main__':
+    unittest.main()